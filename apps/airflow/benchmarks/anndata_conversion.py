@@ -0,0 +1,104 @@
+"""Benchmark Arrow -> AnnData conversion on a synthetic single-cell dataset.
+
+Compares helical's ``get_anndata_from_hf_dataset`` with the vectorised converter used
+by the inference DAG (``dags/helical_inference/conversion.py``). Each converter runs in
+its own process so that peak RSS is measured independently.
+
+    uv run python benchmarks/anndata_conversion.py --cells 1000000 --genes 30000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+
+def make_synthetic_table(n_cells: int, n_genes: int, mean_nnz: int, seed: int = 0) -> pa.Table:
+    """Random counts in the layout of helical's HuggingFace datasets, built without a
+    per-row loop"""
+    rng = np.random.default_rng(seed)
+    nnz_per_cell = rng.poisson(mean_nnz, n_cells).clip(1, n_genes).astype(np.int32)
+    offsets = np.zeros(n_cells + 1, dtype=np.int32)
+    np.cumsum(nnz_per_cell, out=offsets[1:])
+    indices = rng.integers(0, n_genes, offsets[-1], dtype=np.int32)
+    values = rng.integers(1, 50, offsets[-1]).astype(np.float32)
+    return pa.table(
+        {
+            "raw_counts": pa.ListArray.from_arrays(pa.array(offsets), pa.array(values)),
+            "rows": pa.ListArray.from_arrays(pa.array(offsets), pa.array(indices)),
+            "size": pa.array(np.full(n_cells, n_genes, dtype=np.int32)),
+            "cell_type": pa.array(rng.choice(["B cell", "T cell", "erythrocyte", "macrophage"], n_cells)),
+        }
+    )
+
+
+def _features(n_genes: int):
+    import datasets
+
+    return datasets.Features(
+        {
+            "raw_counts": datasets.Sequence(
+                datasets.Value("float32"), id=",".join(f"GENE{i}" for i in range(n_genes))
+            ),
+            "rows": datasets.Sequence(datasets.Value("int32")),
+            "size": datasets.Value("int32"),
+            "cell_type": datasets.Value("string"),
+        }
+    )
+
+
+def _run(method: str, args: argparse.Namespace, results: "multiprocessing.Queue") -> None:
+    table = make_synthetic_table(args.cells, args.genes, args.mean_nnz)
+    features = _features(args.genes)
+    if method == "helical":
+        from datasets import Dataset, DatasetInfo
+        from helical.utils import get_anndata_from_hf_dataset
+
+        dataset = Dataset(table, info=DatasetInfo(features=features))
+        convert = lambda: get_anndata_from_hf_dataset(dataset)  # noqa: E731
+    else:
+        from helical_inference.conversion import ArrowAnnDataConverter
+
+        convert = lambda: ArrowAnnDataConverter(features)(table)  # noqa: E731
+    import anndata  # noqa: F401 - keep import time out of the measurement
+    import scipy.sparse  # noqa: F401
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    ann_data = convert()
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((method, elapsed, (rss_after - rss_before) * 1024, ann_data.shape, ann_data.X.nnz))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=1_000_000)
+    parser.add_argument("--genes", type=int, default=30_000)
+    parser.add_argument("--mean-nnz", type=int, default=200, help="mean non-zero genes per cell")
+    parser.add_argument("--methods", nargs="+", default=["vectorized", "helical"], choices=["vectorized", "helical"])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    print(f"{args.cells} cells x {args.genes} genes, ~{args.mean_nnz} non-zeros per cell")
+    print(f"{'method':<12}{'seconds':>10}{'peak RSS growth (MiB)':>24}  shape / nnz")
+    for method in args.methods:
+        process = context.Process(target=_run, args=(method, args, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{method:<12}failed with exit code {process.exitcode}")
+            continue
+        _, elapsed, rss_growth, shape, nnz = results.get()
+        print(f"{method:<12}{elapsed:>10.2f}{rss_growth / 2**20:>24.0f}  {shape} / {nnz}")
+
+
+if __name__ == "__main__":
+    main()
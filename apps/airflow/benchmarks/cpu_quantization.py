@@ -0,0 +1,108 @@
+"""Benchmark CPU inference modes on a Geneformer/scGPT-sized transformer encoder.
+
+Runs a BERT-style encoder (512 wide, 12 layers by default) in fp32 and dynamic int8,
+eager and TorchScript, the modes ``inference_precision``/``runtime`` select in the
+inference DAG (``dags/helical_inference/optimization.py``). Reports throughput and the
+cosine similarity of mean-pooled embeddings against fp32 eager.
+
+    uv run python benchmarks/cpu_quantization.py --seq-len 2048 --batch-size 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+import torch.nn.functional as F
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+from helical_inference.optimization import compare_embeddings, quantize_linear_int8  # noqa: E402
+
+
+class EncoderLayer(torch.nn.Module):
+    """BERT layer: separate query/key/value/output projections, as in HuggingFace"""
+
+    def __init__(self, hidden: int, heads: int):
+        super().__init__()
+        self.heads = heads
+        self.query = torch.nn.Linear(hidden, hidden)
+        self.key = torch.nn.Linear(hidden, hidden)
+        self.value = torch.nn.Linear(hidden, hidden)
+        self.output = torch.nn.Linear(hidden, hidden)
+        self.intermediate = torch.nn.Linear(hidden, 4 * hidden)
+        self.ffn_output = torch.nn.Linear(4 * hidden, hidden)
+        self.attention_norm = torch.nn.LayerNorm(hidden)
+        self.output_norm = torch.nn.LayerNorm(hidden)
+
+    def _split_heads(self, x: torch.Tensor) -> torch.Tensor:
+        batch, seq_len, hidden = x.shape
+        return x.view(batch, seq_len, self.heads, hidden // self.heads).transpose(1, 2)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        batch, seq_len, hidden = x.shape
+        attention = F.scaled_dot_product_attention(
+            self._split_heads(self.query(x)), self._split_heads(self.key(x)), self._split_heads(self.value(x))
+        )
+        x = self.attention_norm(x + self.output(attention.transpose(1, 2).reshape(batch, seq_len, hidden)))
+        return self.output_norm(x + self.ffn_output(F.gelu(self.intermediate(x))))
+
+
+class Encoder(torch.nn.Module):
+    def __init__(self, vocab: int, hidden: int, layers: int, heads: int):
+        super().__init__()
+        self.embedding = torch.nn.Embedding(vocab, hidden)
+        self.layers = torch.nn.ModuleList(EncoderLayer(hidden, heads) for _ in range(layers))
+
+    def forward(self, input_ids: torch.Tensor) -> torch.Tensor:
+        x = self.embedding(input_ids)
+        for layer in self.layers:
+            x = layer(x)
+        return x.mean(dim=1)
+
+
+def measure(module: torch.nn.Module, inputs: torch.Tensor, steps: int) -> tuple[float, torch.Tensor]:
+    with torch.no_grad():
+        embeddings = module(inputs)
+        started = time.perf_counter()
+        for _ in range(steps):
+            module(inputs)
+    return steps * len(inputs) / (time.perf_counter() - started), embeddings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hidden", type=int, default=512)
+    parser.add_argument("--layers", type=int, default=12)
+    parser.add_argument("--heads", type=int, default=8)
+    parser.add_argument("--vocab", type=int, default=25_000)
+    parser.add_argument("--seq-len", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=5)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    fp32 = Encoder(args.vocab, args.hidden, args.layers, args.heads).eval()
+    int8 = quantize_linear_int8(fp32)
+    inputs = torch.randint(0, args.vocab, (args.batch_size, args.seq_len))
+    with torch.no_grad():
+        modes = {
+            "fp32 eager": fp32,
+            "int8 eager": int8,
+            "fp32 torchscript": torch.jit.freeze(torch.jit.trace(fp32, (inputs,))),
+            "int8 torchscript": torch.jit.freeze(torch.jit.trace(int8, (inputs,))),
+        }
+
+    print(f"{args.layers} layers x {args.hidden} wide, {args.batch_size} x {args.seq_len} tokens, {torch.get_num_threads()} threads")
+    print(f"{'mode':<18}{'cells/s':>10}{'speed-up':>10}{'min cosine':>12}")
+    baseline, reference = None, None
+    for name, module in modes.items():
+        throughput, embeddings = measure(module, inputs, args.steps)
+        if baseline is None:
+            baseline, reference = throughput, embeddings
+        report = compare_embeddings(reference.numpy(), embeddings.numpy())
+        print(f"{name:<18}{throughput:>10.1f}{throughput / baseline:>9.2f}x{report.min_cosine_similarity:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark throughput of concurrent inference-like processes on one host.
+
+Runs 1..N processes at once, each doing the feed-forward matmuls of a transformer
+layer (torch if installed, numpy otherwise), with and without the execution profile
+the inference DAG applies (``dags/helical_inference/execution.py``). Without a
+profile every process starts one thread per core; with it each gets its share of the
+cores, pinned. Scaling efficiency is aggregate throughput over N times the
+single-process throughput.
+
+    uv run python benchmarks/cpu_scaling.py --max-processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+
+def _run(profiled: bool, concurrency: int, args: argparse.Namespace, start: "multiprocessing.synchronize.Barrier", results: "multiprocessing.Queue") -> None:
+    from helical_inference.execution import apply_execution_profile, resolve_execution_profile
+
+    if profiled:
+        apply_execution_profile(resolve_execution_profile(concurrency=concurrency))
+    try:
+        import torch
+
+        torch.manual_seed(0)
+        layers = torch.nn.Sequential(torch.nn.Linear(args.hidden, 4 * args.hidden), torch.nn.GELU(), torch.nn.Linear(4 * args.hidden, args.hidden))
+        batch = torch.randn(args.batch_size, args.hidden)
+
+        def step() -> None:
+            with torch.no_grad():
+                layers(batch)
+
+    except ImportError:
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        w1 = rng.standard_normal((args.hidden, 4 * args.hidden), dtype=np.float32)
+        w2 = rng.standard_normal((4 * args.hidden, args.hidden), dtype=np.float32)
+        batch = rng.standard_normal((args.batch_size, args.hidden), dtype=np.float32)
+
+        def step() -> None:
+            np.maximum(batch @ w1, 0) @ w2
+
+    step()
+    start.wait()
+    started = time.perf_counter()
+    for _ in range(args.steps):
+        step()
+    results.put(args.steps * args.batch_size / (time.perf_counter() - started))
+
+
+def measure(profiled: bool, processes: int, args: argparse.Namespace) -> float:
+    """Aggregate rows/s of ``processes`` concurrent workers"""
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(processes)
+    results = context.Queue()
+    workers = [context.Process(target=_run, args=(profiled, processes, args, start, results)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(results.get() for _ in workers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--hidden", type=int, default=512, help="model width (512 for Geneformer/scGPT)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'processes':>9}{'default rows/s':>16}{'efficiency':>12}{'profiled rows/s':>17}{'efficiency':>12}")
+    baseline: dict[bool, float] = {}
+    for processes in range(1, args.max_processes + 1):
+        row = f"{processes:>9}"
+        for profiled, width in ((False, 16), (True, 17)):
+            throughput = measure(profiled, processes, args)
+            baseline.setdefault(profiled, throughput)
+            row += f"{throughput:>{width}.0f}{throughput / (processes * baseline[profiled]):>12.0%}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,33 @@ from typing import Dict, Any
 
 from airflow.sdk import DAG, task, Param, get_current_context
 
+RESULTS_DIR = "/opt/airflow/results"
+
+# Keep in sync with MODEL_CLASSES in the backend cost model. Each class runs in its
+# own pool/queue (created by airflow-init) sized so that concurrent runs fit in a
+# worker's memory.
+MODEL_CLASSES = {
+    "c2s": "medium",
+    "geneformer": "medium",
+    "genept": "small",
+    "helix_mrna": "medium",
+    "hyena_dna": "small",
+    "mamba2_mrna": "medium",
+    "scgpt": "medium",
+    "transcriptformer": "large",
+    "uce": "large",
+}
+
+# Models whose process_data normalises AnnData.X in place (sc.pp.normalize_total);
+# they need writable copies of the counts instead of views over the Arrow buffers
+IN_PLACE_PREPROCESSING_MODELS = {"c2s", "genept", "scgpt"}
+
+
+def get_model_name(params: Dict[str, Any]) -> str:
+    # Runs triggered by the backend carry the model under `model`
+    return params.get("model") or params["model_name"]
+
+
 with DAG(
         "execute_inference_helical_model_dag",
         params={
@@ -10,17 +37,50 @@ with DAG(
             "model_name": Param("geneformer", type="string"),
             "results_path": Param(None, type="string"),
             "parameters": Param({}, type="object"),
+            "model_class": Param(None, type=["null", "string"], enum=[None, "small", "medium", "large"]),
+            "split": Param("train[:10%]", type="string"),
+            "streaming": Param(True, type="boolean"),
+            "chunk_size": Param(1000, type="integer", minimum=1),
+            "sample_fraction": Param(None, type=["null", "number"], exclusiveMinimum=0, maximum=1),
+            "seed": Param(0, type="integer"),
+            "obs_filter": Param(None, type=["null", "object"], additionalProperties={"type": "array"}),
+            "sample_size": Param(None, type=["null", "integer"], minimum=1),
+            "stratify_by": Param(None, type=["null", "string"]),
+            "genes": Param(None, type=["null", "array"], items={"type": "string"}, minItems=1),
+            "execution_profile": Param(None, type=["null", "object"]),
+            "inference_precision": Param("fp32", type="string", enum=["fp32", "int8"]),
+            "runtime": Param("eager", type="string", enum=["eager", "torchscript"]),
+            "profile": Param(False, type="boolean"),
         },
 ) as dag:
+    @task.branch
+    def route_by_model_class():
+        params = get_current_context()["params"]
+        model_class = params["model_class"] or MODEL_CLASSES.get(get_model_name(params), "medium")
+        logging.getLogger("airflow.task").info(f"Routing run to the {model_class} inference pool")
+        return f"inference_task_{model_class}"
+
     @task.python
     def inference_task():
         ctx = get_current_context()
         logger = logging.getLogger("airflow.task")
+        from helical_inference.execution import apply_execution_profile, resolve_execution_profile
+
+        # Before numpy/torch are imported, so that their thread pools start with it
+        execution_profile = resolve_execution_profile(ctx["params"]["execution_profile"])
+        apply_execution_profile(execution_profile)
+        logger.info(f"Execution profile: {execution_profile}")
+
         logger.info("Triggering imports")
+        import dataclasses
+        import hashlib
+        import io
+        import json
         import os
+        import resource
+        import time
         import numpy as np
 
-        from datasets import load_dataset
         from helical.models.base_models import HelicalBaseFoundationModel
         from helical.models.c2s import Cell2Sen, Cell2SenConfig
         from helical.models.geneformer import Geneformer, GeneformerConfig
@@ -31,19 +91,21 @@ with DAG(
         from helical.models.scgpt import scGPT, scGPTConfig
         from helical.models.transcriptformer import TranscriptFormer, TranscriptFormerConfig
         from helical.models.uce import UCE, UCEConfig
-        from helical.utils import get_anndata_from_hf_dataset
+        from helical_inference.conversion import ArrowAnnDataConverter
+        from helical_inference.ingestion import load_arrow_chunks
+        from helical_inference.optimization import ACCURACY_CHECK_CELLS, optimize_model
+        from helical_inference.profiling import PROFILE_DIRNAME, RunProfiler
+        from helical_inference.progress import PROGRESS_FILENAME, ProgressReporter
+        from helical_inference.storage import result_storage_from_env
+        from helical_inference.summary import SUMMARY_FILENAME, EmbeddingSummary
 
+        started_at = time.monotonic()
         data_path = ctx["params"]["data_path"]
-        model_name = ctx["params"]["model_name"]
+        model_name = get_model_name(ctx["params"])
         results_path = ctx["params"]["results_path"]
         parameters = ctx["params"]["parameters"]
-        logger.info(f"Running inference with {model_name=} on {data_path=} with {results_path=} {parameters=}")
-
-        dataset = load_dataset(data_path, split="train[:10%]", trust_remote_code=True, download_mode="reuse_cache_if_exists")
-        logger.info(f"Dataset loaded from '{data_path}' (split: train[:10%])")
-
-        ann_data = get_anndata_from_hf_dataset(dataset)
-        logger.info(f"Converted dataset to AnnData: {ann_data.shape[0]} cells, {ann_data.shape[1]} genes")
+        split = ctx["params"]["split"]
+        logger.info(f"Running inference with {model_name=} on {data_path=} ({split=}) with {results_path=} {parameters=}")
 
         def model_factory(model_name: str, params: Dict[str, Any] | None = None) -> HelicalBaseFoundationModel:
             params = params or {}
@@ -68,26 +130,139 @@ with DAG(
             else:
                 raise ValueError(f"Unsupported model: {model_name}")
 
-        model = model_factory(model_name, parameters)
-
-        logger.info("Tokenizing data (1 sample)")
-        dataset = model.process_data(ann_data[:1], gene_names="gene_name")
-        logger.info("Data tokenized successfully")
-
-        logger.info("Generating embeddings")
-        embeddings = model.get_embeddings(dataset)
-        logger.info(f"Embeddings generated: shape={embeddings.shape}")
-
         run_id = ctx["run_id"]
         safe_run_id = run_id.replace(":", "-").replace("+", "-")
-        output_path = f"/opt/airflow/results/{results_path or safe_run_id}"
+        run_dir = os.path.join(RESULTS_DIR, safe_run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        output_path = f"{RESULTS_DIR}/{results_path or safe_run_id}"
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # Fails the run before the model is loaded if the storage is misconfigured
+        storage = result_storage_from_env()
+        result_key = os.path.relpath(output_path, RESULTS_DIR)
+
+        def publish(path: str) -> None:
+            storage.publish(path, os.path.relpath(path, RESULTS_DIR))
+
+        progress = ProgressReporter(os.path.join(run_dir, PROGRESS_FILENAME), publish=publish)
+        profiler = RunProfiler(os.path.join(run_dir, PROFILE_DIRNAME), enabled=ctx["params"]["profile"], publish=publish)
+        profiler.start()
+        # Profiles of failed runs are written too: they are the ones worth looking at
+        try:
+            progress.stage("loading_model")
+            model = model_factory(model_name, parameters)
+
+            # Cells flow through in fixed-size chunks, from the dataset to tokenization to
+            # the output file, so peak memory is bounded by the chunk size, not the dataset
+            chunks = load_arrow_chunks(
+                data_path,
+                split,
+                chunk_size=ctx["params"]["chunk_size"],
+                streaming=ctx["params"]["streaming"],
+                sample_fraction=ctx["params"]["sample_fraction"],
+                seed=ctx["params"]["seed"],
+                obs_filter=ctx["params"]["obs_filter"],
+                sample_size=ctx["params"]["sample_size"],
+                stratify_by=ctx["params"]["stratify_by"],
+            )
+            n_cells, n_genes, n_dims = 0, 0, None
+            optimization = None
+            # Checksum of the output, recorded for the backend's results catalogue
+            digest = hashlib.sha256()
+            summary = EmbeddingSummary()
+            logger.info(f"Writing embeddings to '{output_path}'")
+            progress.start_embedding(chunks.num_rows, estimated=chunks.num_rows_estimated)
+            embedding_started_at = time.monotonic()
+            # Binary mode so that tell() is a byte offset: after each flush the file up to
+            # there holds only complete rows, which the backend serves as partial results
+            convert = ArrowAnnDataConverter(chunks.features, writable=model_name in IN_PLACE_PREPROCESSING_MODELS, genes=ctx["params"]["genes"])
+            with open(output_path, "wb") as output_file:
+                for ann_data in map(convert, chunks.tables):
+                    if optimization is None:
+                        # Opt-in int8/TorchScript, checked against fp32 on the first cells
+                        precision, runtime = ctx["params"]["inference_precision"], ctx["params"]["runtime"]
+                        sample = None
+                        if (precision, runtime) != ("fp32", "eager"):
+                            sample = model.process_data(ann_data[:ACCURACY_CHECK_CELLS].copy(), gene_names="gene_name")
+                        optimization = optimize_model(model, model_name, parameters, precision, runtime, sample)
+                    with profiler.chunk(ann_data.shape[0]):
+                        with profiler.stage("process_data"):
+                            dataset = model.process_data(ann_data, gene_names="gene_name")
+                        with profiler.stage("get_embeddings"):
+                            embeddings = np.asarray(model.get_embeddings(dataset))
+                    buffer = io.BytesIO()
+                    np.savetxt(buffer, embeddings, delimiter=",")
+                    digest.update(buffer.getbuffer())
+                    output_file.write(buffer.getbuffer())
+                    output_file.flush()
+                    summary.update(embeddings)
+                    if n_cells == 0:
+                        logger.info(f"First embeddings after {time.monotonic() - started_at:.1f}s: shape={embeddings.shape}")
+                    n_cells += ann_data.shape[0]
+                    n_genes = ann_data.shape[1]
+                    n_dims = int(np.prod(embeddings.shape[1:]))
+                    progress.update(n_cells, *storage.store_partial(output_path, result_key, output_file.tell(), n_cells))
+                    logger.info(f"Embedded {n_cells}/{chunks.num_rows or '?'} cells")
+            # The expected count is only an estimate under sample_fraction
+            progress.finish_embedding(n_cells)
+        finally:
+            profiler.finish()
+        embedding_seconds = time.monotonic() - embedding_started_at
+        cells_per_second = n_cells / embedding_seconds if embedding_seconds > 0 else None
+        logger.info(f"Embeddings for {n_cells} cells written successfully to '{output_path}'")
+        logger.info(f"Embedded {n_cells} cells in {embedding_seconds:.1f}s ({cells_per_second or 0:.1f} cells/s) with {execution_profile}")
+        summary_path = os.path.join(run_dir, SUMMARY_FILENAME)
+        summary.write(summary_path)
+        publish(summary_path)
+        logger.info(f"Embedding summary written to '{summary_path}'")
+
+        # Before metrics.json: the backend catalogues the result once that exists
+        progress.stage("storing_results")
+        result_bytes = os.path.getsize(output_path)
+        storage.store(output_path, result_key)
+        progress.stage("writing_metrics")
 
-        logger.info(f"Writing embeddings to '{output_path}'")
-        np.savetxt(output_path, embeddings, delimiter=",")
-        logger.info(f"Embeddings written successfully to '{output_path}'")
+        # Recorded for the backend: its cost model calibrates memory/runtime estimates
+        # from past runs, and its results catalogue indexes the result file
+        metrics = {
+            "model": model_name,
+            "data_path": data_path,
+            "split": split,
+            "n_cells": n_cells,
+            "n_genes": n_genes,
+            # Shape of the data before the selection and gene subset, which the backend
+            # applies to it to bound the size of later runs on the same split
+            "source_n_cells": chunks.source_rows,
+            "source_n_genes": convert.source_n_genes,
+            "peak_memory_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "runtime_seconds": time.monotonic() - started_at,
+            "cells_per_second": cells_per_second,
+            "execution_profile": dataclasses.asdict(execution_profile),
+            "optimization": optimization,
+            "result": {
+                "path": result_key,
+                "format": "csv",
+                "bytes": result_bytes,
+                "rows": n_cells,
+                "dims": n_dims,
+                "sha256": digest.hexdigest(),
+            },
+        }
+        metrics_path = os.path.join(run_dir, "metrics.json")
+        with open(metrics_path, "w") as f:
+            json.dump(metrics, f)
+        publish(metrics_path)
+        logger.info(f"Run metrics written to '{metrics_path}': {metrics}")
+        # The backend serves the stored result from now on
+        storage.remove_partial(result_key)
+        progress.stage("done")
 
-    inference_task()
+    route = route_by_model_class()
+    for model_class in sorted(set(MODEL_CLASSES.values())):
+        route >> inference_task.override(
+            task_id=f"inference_task_{model_class}",
+            pool=f"inference_{model_class}",
+            queue=f"inference_{model_class}",
+        )()
 
 if __name__ == "__main__":
     ...
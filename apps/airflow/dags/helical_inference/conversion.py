@@ -0,0 +1,126 @@
+"""Arrow to AnnData conversion for HuggingFace single-cell datasets.
+
+Equivalent to ``helical.utils.get_anndata_from_hf_dataset`` but without a per-row
+Python loop or dense/object intermediates: the expression matrix is a
+``scipy.sparse.csr_matrix`` whose ``data``/``indices``/``indptr`` are views over the
+Arrow buffers of the ``raw_counts`` and ``rows`` list columns. A gene subset is applied
+to those buffers, before the matrix is built.
+"""
+import logging
+from typing import Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger("airflow.task")
+
+COUNTS_COLUMN = "raw_counts"
+INDICES_COLUMN = "rows"
+EXCLUDED_COLUMNS = (COUNTS_COLUMN, INDICES_COLUMN, "size")
+
+
+def _list_buffers(table: pa.Table, name: str, writable: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """Offsets (rebased to 0) and flattened values of a list column.
+
+    Zero-copy for a single-chunk column without nulls, which is what record batches
+    from a dataset are; multi-chunk columns are concatenated once. Views over Arrow
+    buffers are read-only, ``writable`` copies the values.
+    """
+    column = table.column(name)
+    array = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    if array.null_count:
+        raise ValueError(f"Column '{name}' contains null rows")
+    offsets = array.offsets.to_numpy()
+    values = array.flatten().to_numpy(zero_copy_only=False, writable=writable)
+    if offsets[0] != 0:
+        offsets = offsets - offsets[0]
+    return offsets, values
+
+
+def _obs_frame(table: pa.Table) -> pd.DataFrame:
+    columns = [name for name in table.column_names if name not in EXCLUDED_COLUMNS]
+    obs_table = table.select(columns)
+    # String columns become categoricals: one small integer code per cell instead of a
+    # Python string object, which is also how AnnData stores them
+    for i, field in enumerate(obs_table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            obs_table = obs_table.set_column(i, field.name, pc.dictionary_encode(obs_table.column(i)))
+    obs = obs_table.to_pandas()
+    obs.index = obs.index.astype(str)
+    return obs
+
+
+def _subset_genes(
+    indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, lookup: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR buffers restricted to the genes ``lookup`` maps to a new index"""
+    new_indices = lookup[indices]
+    keep = new_indices >= 0
+    # Offsets into the kept values: kept values before each row boundary
+    kept_before = np.concatenate(([0], np.cumsum(keep)))
+    return kept_before[indptr], new_indices[keep], data[keep]
+
+
+class ArrowAnnDataConverter:
+    """Builds AnnData chunks from record batches of a dataset with the given features.
+
+    ``writable`` gives each chunk its own copy of the counts, for models that
+    normalise ``X`` in place during ``process_data``. ``genes`` keeps only those genes
+    (case-insensitive, in dataset order); counts of other genes are dropped.
+    ``source_n_genes`` is the number of genes in the dataset, once a chunk is built.
+    """
+
+    def __init__(self, features: Optional[Any] = None, writable: bool = False, genes: Optional[Sequence[str]] = None):
+        self._features = features
+        self._writable = writable
+        self._genes = genes
+        self._var: Optional[pd.DataFrame] = None
+        self.source_n_genes: Optional[int] = None
+        # Dataset gene index -> subset gene index, -1 for dropped genes
+        self._gene_lookup: Optional[np.ndarray] = None
+
+    def _build_var(self, table: pa.Table) -> pd.DataFrame:
+        from datasets import Features
+
+        features = self._features or Features.from_arrow_schema(table.schema)
+        var_names = pd.Index([name.upper() for name in features[COUNTS_COLUMN].id.split(",")])
+        self.source_n_genes = len(var_names)
+        if self._genes:
+            requested = pd.Index([gene.upper() for gene in self._genes])
+            keep = var_names.isin(requested)
+            missing = requested.difference(var_names)
+            if not keep.any():
+                raise ValueError(f"None of the {len(requested)} requested genes are in the dataset")
+            if len(missing):
+                logger.warning(f"{len(missing)} requested genes are not in the dataset, e.g. {list(missing[:5])}")
+            self._gene_lookup = np.full(len(var_names), -1, dtype=np.int64)
+            self._gene_lookup[keep] = np.arange(np.count_nonzero(keep))
+            var_names = var_names[keep]
+            logger.info(f"Keeping {len(var_names)} genes")
+        return pd.DataFrame({"gene_name": var_names}, index=var_names)
+
+    def __call__(self, table: pa.Table) -> Any:
+        import anndata as ad
+        from scipy.sparse import csr_matrix
+
+        if self._var is None:
+            self._var = self._build_var(table)
+        n_genes = len(self._var) if self._gene_lookup is None else len(self._gene_lookup)
+
+        indptr, data = _list_buffers(table, COUNTS_COLUMN, writable=self._writable)
+        index_offsets, indices = _list_buffers(table, INDICES_COLUMN)
+        if not np.array_equal(indptr, index_offsets):
+            raise ValueError(f"'{COUNTS_COLUMN}' and '{INDICES_COLUMN}' have different lengths per row")
+        if len(indices) and indices.max() >= n_genes:
+            raise ValueError(
+                f"Number of gene names ({n_genes}) does not match the gene indices in '{INDICES_COLUMN}'"
+            )
+        if self._gene_lookup is not None:
+            indptr, indices, data = _subset_genes(indptr, indices, data, self._gene_lookup)
+            n_genes = len(self._var)
+
+        matrix = csr_matrix((data, indices, indptr), shape=(table.num_rows, n_genes), copy=False)
+        # A shallow copy per chunk: models may add, drop or rename var columns
+        return ad.AnnData(matrix, obs=_obs_frame(table), var=self._var.copy(deep=False))
@@ -0,0 +1,149 @@
+"""CPU execution profile of an inference task: thread pools and core pinning.
+
+Several inference tasks share a worker host: the workers of the inference pools each
+run one task per slot of their pool. Left alone, torch and the BLAS library each start
+one thread per core in every task, and concurrent tasks oversubscribe the CPUs. By
+default a task gets ``cores / tasks the host runs at once`` threads, pinned to its own
+block of cores. The blocks are handed out through lock files in
+``INFERENCE_CPU_SLOTS_DIR``, which the workers of a host must share.
+"""
+import fcntl
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import IO, Any, Optional, Sequence
+
+logger = logging.getLogger("airflow.task")
+
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+POOL_SLOTS_ENV_VARS = ("INFERENCE_POOL_SMALL_SLOTS", "INFERENCE_POOL_MEDIUM_SLOTS", "INFERENCE_POOL_LARGE_SLOTS")
+# Used when INFERENCE_CPU_SLOTS_DIR is not set
+CPU_SLOTS_DIR = os.path.join(tempfile.gettempdir(), "helical_inference_cpu_slots")
+
+# Core block this process holds, with its lock file; released when the process exits
+_held_slot: Optional[tuple[int, IO[str]]] = None
+
+
+@dataclass(frozen=True)
+class ExecutionProfile:
+    intra_op_threads: int
+    inter_op_threads: int
+    blas_threads: int
+    cpu_affinity: Optional[tuple[int, ...]] = None
+
+
+def worker_concurrency() -> int:
+    """Inference tasks that may run at once on this host: ``INFERENCE_WORKER_CONCURRENCY``,
+    or the slots of all inference pools (``INFERENCE_POOL_<CLASS>_SLOTS``), whose workers
+    share the host, or the Celery worker concurrency"""
+    value = os.environ.get("INFERENCE_WORKER_CONCURRENCY")
+    if value:
+        return max(int(value), 1)
+    pool_slots = [os.environ.get(name) for name in POOL_SLOTS_ENV_VARS]
+    if any(pool_slots):
+        return max(sum(int(slots) for slots in pool_slots if slots), 1)
+    try:
+        from airflow.configuration import conf
+
+        return max(conf.getint("celery", "worker_concurrency", fallback=1), 1)
+    except ImportError:
+        return 1
+
+
+def available_cpus() -> list[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _acquire_cpu_slot(concurrency: int) -> Optional[int]:
+    """Index of a core block no other task on this host holds, or None if all are taken"""
+    global _held_slot
+    if _held_slot is not None:
+        return _held_slot[0]
+    slots_dir = os.environ.get("INFERENCE_CPU_SLOTS_DIR") or CPU_SLOTS_DIR
+    os.makedirs(slots_dir, exist_ok=True)
+    for slot in range(concurrency):
+        lock_file = open(os.path.join(slots_dir, f"slot-{slot}.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            continue
+        _held_slot = (slot, lock_file)
+        return slot
+    return None
+
+
+def resolve_execution_profile(
+    requested: Optional[dict[str, Any]] = None,
+    cpus: Optional[Sequence[int]] = None,
+    concurrency: Optional[int] = None,
+) -> ExecutionProfile:
+    """Fills in the settings a run did not request.
+
+    ``requested`` may set ``intra_op_threads``, ``inter_op_threads``, ``blas_threads``
+    and ``cpu_affinity``: ``"auto"`` (default, pin to a free block of cores), ``"none"``
+    or an explicit list of core ids.
+    """
+    requested = requested or {}
+    cpus = list(cpus if cpus is not None else available_cpus())
+    concurrency = concurrency or worker_concurrency()
+    affinity = requested.get("cpu_affinity") or "auto"
+    if isinstance(affinity, (list, tuple)):
+        # The run's cores are its own: one thread per core by default
+        cpus, concurrency = [int(cpu) for cpu in affinity], 1
+    intra_op_threads = requested.get("intra_op_threads") or max(len(cpus) // concurrency, 1)
+
+    cpu_affinity: Optional[tuple[int, ...]] = None
+    if isinstance(affinity, (list, tuple)):
+        cpu_affinity = tuple(cpus)
+    elif affinity == "auto" and intra_op_threads < len(cpus):
+        slot = _acquire_cpu_slot(concurrency)
+        if slot is not None:
+            start = slot * intra_op_threads % len(cpus)
+            cpu_affinity = tuple((cpus + cpus)[start : start + intra_op_threads])
+        elif not requested.get("intra_op_threads"):
+            # More tasks than slots (a stale lock, or a concurrency set too low): every
+            # core is already in use, so take as little of them as possible
+            logger.warning(f"All {concurrency} CPU slots on this host are taken, running on 1 unpinned thread")
+            intra_op_threads = 1
+        else:
+            logger.warning(f"All {concurrency} CPU slots on this host are taken, not pinning cores")
+    elif affinity not in ("auto", "none"):
+        raise ValueError(f"Unsupported cpu_affinity: {affinity!r}")
+
+    return ExecutionProfile(
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=requested.get("inter_op_threads") or 1,
+        blas_threads=requested.get("blas_threads") or intra_op_threads,
+        cpu_affinity=cpu_affinity,
+    )
+
+
+def apply_execution_profile(profile: ExecutionProfile) -> None:
+    """Must run before the model is built, and ideally before numpy/torch are imported:
+    thread pools only read the environment when they start"""
+    if profile.cpu_affinity:
+        # Threads started from here on inherit the affinity
+        os.sched_setaffinity(0, profile.cpu_affinity)
+    for name in BLAS_ENV_VARS:
+        os.environ[name] = str(profile.blas_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+
+        # Covers BLAS/OpenMP libraries that were already loaded into the process
+        threadpool_limits(limits=profile.blas_threads)
+    except ImportError:
+        pass
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(profile.intra_op_threads)
+    try:
+        torch.set_num_interop_threads(profile.inter_op_threads)
+    except RuntimeError as e:
+        # Only possible before torch runs its first inter-op parallel work
+        logger.warning(f"Could not set inter-op threads: {e}")
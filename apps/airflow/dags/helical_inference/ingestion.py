@@ -0,0 +1,320 @@
+"""Chunked ingestion of HuggingFace single-cell datasets.
+
+Rows are selected (split slice, obs filter, deterministic subsample and sample size) on
+Arrow record batches by their position in the split, so rows that are dropped are never
+decoded into Python objects or AnnData.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger("airflow.task")
+
+_SPLIT_PATTERN = re.compile(r"^(?P<name>[\w.-]+)(\[(?P<start>-?\d+%?)?:(?P<stop>-?\d+%?)?\])?$")
+
+
+@dataclass(frozen=True)
+class SplitSpec:
+    """A HuggingFace split expression such as ``train``, ``train[:10%]`` or ``test[100:2000]``"""
+
+    name: str
+    start: Optional[str] = None
+    stop: Optional[str] = None
+
+    @classmethod
+    def parse(cls, split: str) -> "SplitSpec":
+        match = _SPLIT_PATTERN.match(split.replace(" ", ""))
+        if match is None:
+            raise ValueError(f"Unsupported split expression: {split!r}")
+        return cls(name=match["name"], start=match["start"], stop=match["stop"])
+
+    @property
+    def needs_num_rows(self) -> bool:
+        bounds = [b for b in (self.start, self.stop) if b is not None]
+        return any(b.endswith("%") or b.startswith("-") for b in bounds)
+
+    def row_range(self, num_rows: Optional[int]) -> tuple[int, Optional[int]]:
+        """Absolute ``[start, stop)`` row range; ``stop`` is None for an open-ended slice"""
+
+        def resolve(bound: Optional[str], default: Optional[int]) -> Optional[int]:
+            if bound is None:
+                return default
+            if num_rows is None and (bound.endswith("%") or bound.startswith("-")):
+                raise ValueError(f"Split bound {bound!r} needs the number of rows of split '{self.name}'")
+            if bound.endswith("%"):
+                value = round(int(bound[:-1]) * num_rows / 100)
+            else:
+                value = int(bound)
+            if value < 0:
+                value += num_rows
+            return max(value, 0) if num_rows is None else min(max(value, 0), num_rows)
+
+        return resolve(self.start, 0), resolve(self.stop, num_rows)
+
+
+def row_priorities(indices: np.ndarray, seed: int) -> np.ndarray:
+    """Uniform [0, 1) value per row, from a hash of its index and ``seed`` only, so that
+    selections do not depend on chunking, streaming vs. eager loading or worker count."""
+    # splitmix64 finaliser, vectorised; uint64 arithmetic wraps on overflow
+    with np.errstate(over="ignore"):
+        z = indices.astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+
+def subsample_mask(indices: np.ndarray, fraction: Optional[float], seed: int) -> np.ndarray:
+    """Deterministic Bernoulli(``fraction``) selection of row indices"""
+    if fraction is None or fraction >= 1:
+        return np.ones(len(indices), dtype=bool)
+    return row_priorities(indices, seed) < fraction
+
+
+def _filter_value_set(column: str, values: list, features: Any, type: pa.DataType) -> pa.Array:
+    feature = features[column] if features is not None and column in features else None
+    # ClassLabel columns hold integer codes; they are filtered by label name too
+    if hasattr(feature, "str2int"):
+        values = [feature.str2int(v) if isinstance(v, str) else v for v in values]
+    try:
+        return pa.array(values).cast(type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        raise ValueError(f"obs_filter values for '{column}' do not match its type ({type}): {e}") from e
+
+
+def obs_filter_mask(table: pa.Table, obs_filter: Optional[dict[str, list]], features: Any = None) -> np.ndarray:
+    """Rows whose value is one of the listed values, for every column of ``obs_filter``"""
+    mask = np.ones(table.num_rows, dtype=bool)
+    for column, values in (obs_filter or {}).items():
+        if column not in table.column_names:
+            raise ValueError(f"obs_filter column '{column}' is not in the dataset")
+        data = table.column(column)
+        matches = pc.is_in(data, value_set=_filter_value_set(column, values, features, data.type))
+        mask &= matches.to_numpy(zero_copy_only=False).astype(bool)
+    return mask
+
+
+def _batch_indices(
+    batches: Iterator[pa.Table], start: int, stop: Optional[int]
+) -> Iterator[tuple[pa.Table, int, np.ndarray]]:
+    """Batches overlapping ``[start, stop)``, with the split indices of their rows in it"""
+    offset = 0
+    for batch in batches:
+        batch_start, offset = offset, offset + batch.num_rows
+        if offset <= start:
+            continue
+        if stop is not None and batch_start >= stop:
+            return
+        if batch.num_rows == 0:
+            continue
+        yield batch, batch_start, np.arange(max(batch_start, start), offset if stop is None else min(offset, stop))
+
+
+def _filtered_indices(
+    batch: pa.Table,
+    batch_start: int,
+    indices: np.ndarray,
+    obs_filter: Optional[dict[str, list]],
+    features: Any,
+    sample_fraction: Optional[float],
+    seed: int,
+) -> np.ndarray:
+    if obs_filter:
+        rows = batch.slice(indices[0] - batch_start, len(indices)) if len(indices) < batch.num_rows else batch
+        indices = indices[obs_filter_mask(rows, obs_filter, features)]
+    return indices[subsample_mask(indices, sample_fraction, seed)]
+
+
+def _allocate(counts: np.ndarray, sample_size: int) -> np.ndarray:
+    """Largest-remainder split of ``sample_size`` across strata, proportional to their sizes"""
+    quotas = counts * sample_size / counts.sum()
+    allocation = np.floor(quotas).astype(np.int64)
+    remainders = np.argsort(allocation - quotas, kind="stable")
+    allocation[remainders[: sample_size - allocation.sum()]] += 1
+    return allocation
+
+
+def select_sample(
+    batches: Iterator[pa.Table],
+    start: int,
+    stop: Optional[int],
+    sample_size: int,
+    seed: int,
+    sample_fraction: Optional[float] = None,
+    obs_filter: Optional[dict[str, list]] = None,
+    stratify_by: Optional[str] = None,
+    features: Any = None,
+) -> np.ndarray:
+    """Sorted split indices of ``sample_size`` rows, among the rows passing the filter and
+    subsample: the rows with the lowest hash priorities, overall or, with ``stratify_by``,
+    within each value of that column in proportion to its frequency.
+
+    ``batches`` only need the obs columns the filter and strata read; nothing is kept
+    per row but its index, priority and stratum.
+    """
+    indices, priorities, strata = [], [], []
+    for batch, batch_start, batch_indices in _batch_indices(batches, start, stop):
+        batch_indices = _filtered_indices(batch, batch_start, batch_indices, obs_filter, features, sample_fraction, seed)
+        indices.append(batch_indices)
+        # Seeded differently from the subsample, which already kept the low priorities
+        priorities.append(row_priorities(batch_indices, seed + 1))
+        if stratify_by is not None:
+            strata.append(batch.column(stratify_by).take(pa.array(batch_indices - batch_start)))
+    all_indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int64)
+    all_priorities = np.concatenate(priorities) if priorities else np.empty(0)
+    if len(all_indices) <= sample_size:
+        logger.warning(f"Only {len(all_indices)} rows match the selection, fewer than the sample size {sample_size}")
+        return all_indices
+    if stratify_by is None:
+        return np.sort(all_indices[np.argpartition(all_priorities, sample_size)[:sample_size]])
+
+    # Null values form their own stratum
+    encoded = pc.dictionary_encode(pa.chunked_array(strata)).combine_chunks()
+    codes = encoded.indices.fill_null(len(encoded.dictionary)).to_numpy(zero_copy_only=False)
+    counts = np.bincount(codes)
+    allocation = _allocate(counts, sample_size)
+    # Rank of each row within its stratum, by priority
+    order = np.lexsort((all_priorities, codes))
+    stratum_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ranks = np.arange(len(order)) - stratum_starts[codes[order]]
+    selected = order[ranks < allocation[codes[order]]]
+    logger.info(f"Stratified sample of {len(selected)} rows over {np.count_nonzero(counts)} values of '{stratify_by}'")
+    return np.sort(all_indices[selected])
+
+
+def _select_rows(
+    batches: Iterator[pa.Table],
+    start: int,
+    stop: Optional[int],
+    sample_fraction: Optional[float],
+    seed: int,
+    obs_filter: Optional[dict[str, list]] = None,
+    features: Any = None,
+    sample: Optional[np.ndarray] = None,
+) -> Iterator[pa.Table]:
+    if sample is not None:
+        # Rows past the last sampled one are not read
+        last = int(sample[-1]) + 1 if len(sample) else start
+        stop = last if stop is None else min(stop, last)
+    for batch, batch_start, indices in _batch_indices(batches, start, stop):
+        if sample is not None:
+            # Indices are contiguous: the sampled ones are a slice of the sorted sample
+            indices = sample[np.searchsorted(sample, indices[0]) : np.searchsorted(sample, indices[-1], side="right")]
+        else:
+            indices = _filtered_indices(batch, batch_start, indices, obs_filter, features, sample_fraction, seed)
+        if len(indices):
+            yield batch.take(pa.array(indices - batch_start))
+
+
+def _rechunk(tables: Iterator[pa.Table], chunk_size: int) -> Iterator[pa.Table]:
+    pending: list[pa.Table] = []
+    pending_rows = 0
+    for table in tables:
+        pending.append(table)
+        pending_rows += table.num_rows
+        while pending_rows >= chunk_size:
+            merged = pa.concat_tables(pending)
+            yield merged.slice(0, chunk_size)
+            rest = merged.slice(chunk_size)
+            pending, pending_rows = [rest], rest.num_rows
+    if pending_rows:
+        yield pa.concat_tables(pending)
+
+
+def _column_names(dataset: Any) -> list[str]:
+    """Columns of the dataset. Streaming datasets whose features are not resolved have
+    no ``column_names``; they are read from the schema of the first batch."""
+    if dataset.column_names is not None:
+        return list(dataset.column_names)
+    first = next(iter(dataset.with_format("arrow").iter(batch_size=1)), None)
+    return [] if first is None else first.column_names
+
+
+def _count_rows(dataset: Any) -> int:
+    # Only needed when the dataset card does not declare split sizes; reads a single
+    # column and never decodes rows.
+    logger.warning("Split size unknown, counting rows to resolve the split expression")
+    columns = _column_names(dataset)
+    if not columns:
+        # No first batch to read the columns from: the split is empty
+        return 0
+    return sum(batch.num_rows for batch in dataset.select_columns(columns[:1]).with_format("arrow").iter(batch_size=10_000))
+
+
+@dataclass
+class ArrowChunks:
+    """Fixed-size Arrow chunks of the selected rows, plus the dataset's features.
+    ``num_rows`` is the number of selected rows and ``source_rows`` the number of rows
+    in the split slice they are selected from, when they are known up front.
+    ``num_rows_estimated`` is set when ``num_rows`` is the expected size of a
+    ``sample_fraction`` subsample rather than an exact count."""
+
+    features: Any
+    tables: Iterator[pa.Table]
+    num_rows: Optional[int]
+    source_rows: Optional[int] = None
+    num_rows_estimated: bool = False
+
+
+def load_arrow_chunks(
+    data_path: str,
+    split: str,
+    chunk_size: int,
+    streaming: bool = True,
+    sample_fraction: Optional[float] = None,
+    seed: int = 0,
+    obs_filter: Optional[dict[str, list]] = None,
+    sample_size: Optional[int] = None,
+    stratify_by: Optional[str] = None,
+) -> ArrowChunks:
+    """Selects rows in order: the ``split`` slice, ``obs_filter``, ``sample_fraction``,
+    then ``sample_size`` (stratified by the ``stratify_by`` column)."""
+    if stratify_by is not None and sample_size is None:
+        raise ValueError("stratify_by needs a sample_size")
+    from datasets import load_dataset
+
+    spec = SplitSpec.parse(split)
+    if streaming:
+        dataset = load_dataset(data_path, split=spec.name, streaming=True, trust_remote_code=True)
+        splits = dataset.info.splits or {}
+        # Dataset cards without sizes declare 0 examples: unknown, not empty
+        num_rows = (splits[spec.name].num_examples if spec.name in splits else None) or None
+        if num_rows is None and spec.needs_num_rows:
+            num_rows = _count_rows(dataset)
+        start, stop = spec.row_range(num_rows)
+        logger.info(f"Streaming '{data_path}' split '{split}': rows [{start}, {stop})")
+    else:
+        # The split is sliced here rather than by `load_dataset` so that row indices, and
+        # therefore the subsample, match the streaming path
+        dataset = load_dataset(data_path, split=spec.name, trust_remote_code=True, download_mode="reuse_cache_if_exists")
+        start, stop = spec.row_range(len(dataset))
+        logger.info(f"Dataset loaded from '{data_path}' (split: {split}): rows [{start}, {stop})")
+
+    features = dataset.features
+    sample = None
+    expected_rows = None
+    num_rows_estimated = False
+    if sample_size is not None:
+        # A first pass over the obs columns only picks the rows, which the second reads
+        columns = list(dict.fromkeys([*(obs_filter or {}), *([stratify_by] if stratify_by else [])]))
+        column_names = _column_names(dataset)
+        missing = [c for c in columns if c not in column_names]
+        if missing:
+            raise ValueError(f"Columns {missing} are not in the dataset")
+        obs_batches = dataset.select_columns(columns or column_names[:1]).with_format("arrow").iter(batch_size=10_000)
+        sample = select_sample(obs_batches, start, stop, sample_size, seed, sample_fraction, obs_filter, stratify_by, features)
+        expected_rows = len(sample)
+        logger.info(f"Sampled {expected_rows} rows")
+    elif stop is not None and not obs_filter:
+        expected_rows = round((stop - start) * min(sample_fraction or 1, 1))
+        num_rows_estimated = sample_fraction is not None and sample_fraction < 1
+    batches = dataset.with_format("arrow").iter(batch_size=chunk_size)
+    selected = _select_rows(batches, start, stop, sample_fraction, seed, obs_filter, features, sample)
+    source_rows = None if stop is None else stop - start
+    return ArrowChunks(features=features, tables=_rechunk(selected, chunk_size), num_rows=expected_rows, source_rows=source_rows, num_rows_estimated=num_rows_estimated)
+
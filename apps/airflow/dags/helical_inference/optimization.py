@@ -0,0 +1,155 @@
+"""Optimised CPU inference: dynamic int8 quantization and TorchScript graphs.
+
+Both are opt-in per run and apply to the torch module helical models keep in
+``model.model``. Before a run switches to the optimised module, the embeddings of a
+sample of cells are compared with the fp32 eager ones. The run keeps fp32 eager if they
+drift, or if the model cannot be optimised.
+
+int8 applies to any model. TorchScript is limited to ``TORCHSCRIPT_MODELS``, which
+today is HyenaDNA only: a traced graph replaces the module's ``forward``, takes
+positional tensors and returns tensors, and the other models use their module in ways
+it cannot stand in for (see below). Their ``runtime: torchscript`` runs stay eager.
+"""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger("airflow.task")
+
+# Models whose torch module helical calls through ``forward`` with positional tensors,
+# reading tensors back, as tracing requires. Not the others: Geneformer's module is a
+# HuggingFace BERT called with keyword arguments (``attention_mask``,
+# ``output_hidden_states``) whose ModelOutput helical reads ``hidden_states`` from, and
+# scGPT's embeddings come from its module's ``_encode`` method, which a traced graph
+# does not have. Supporting them takes a per-model wrapper around helical's
+# ``get_embeddings``, not a trace of the module.
+TORCHSCRIPT_MODELS = {"hyena_dna"}
+
+ACCURACY_CHECK_CELLS = 64
+MIN_COSINE_SIMILARITY = 0.99
+
+EXPORT_CACHE_DIR = os.environ.get(
+    "HELICAL_EXPORT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "helical_workbench", "exported")
+)
+
+
+@dataclass
+class AccuracyReport:
+    cells: int
+    mean_cosine_similarity: float
+    min_cosine_similarity: float
+    max_abs_error: float
+
+    @property
+    def passed(self) -> bool:
+        return self.min_cosine_similarity >= MIN_COSINE_SIMILARITY
+
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> AccuracyReport:
+    reference = np.asarray(reference, dtype=np.float64).reshape(len(reference), -1)
+    candidate = np.asarray(candidate, dtype=np.float64).reshape(len(candidate), -1)
+    if reference.shape != candidate.shape:
+        raise ValueError(f"Embedding shapes differ: {reference.shape} vs {candidate.shape}")
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    similarity = np.einsum("ij,ij->i", reference, candidate) / np.maximum(norms, np.finfo(np.float64).tiny)
+    return AccuracyReport(
+        cells=len(reference),
+        mean_cosine_similarity=float(similarity.mean()),
+        min_cosine_similarity=float(similarity.min()),
+        max_abs_error=float(np.abs(reference - candidate).max()),
+    )
+
+
+def quantize_linear_int8(module: Any) -> Any:
+    """Copy of ``module`` with int8 weights in its linear layers; activations are
+    quantized on the fly"""
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_cache_path(model_name: str, parameters: dict[str, Any], precision: str) -> str:
+    import torch
+
+    key = json.dumps(
+        {"model": model_name, "parameters": parameters, "precision": precision, "torch": torch.__version__},
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(EXPORT_CACHE_DIR, f"{model_name}-{precision}-{digest}.pt")
+
+
+def load_or_trace(module: Any, example_inputs: tuple[Any, ...], cache_path: str) -> Any:
+    import torch
+
+    if os.path.exists(cache_path):
+        logger.info(f"Loading exported graph from '{cache_path}'")
+        return torch.jit.load(cache_path)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(module, example_inputs, check_trace=False))
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    torch.jit.save(traced, tmp_path)
+    os.replace(tmp_path, cache_path)
+    logger.info(f"Exported graph cached at '{cache_path}'")
+    return traced
+
+
+def optimize_model(
+    model: Any, model_name: str, parameters: dict[str, Any], precision: str, runtime: str, sample: Any
+) -> dict[str, Any]:
+    """Replaces ``model.model`` with its optimised version if that keeps the embeddings
+    of ``sample`` (output of ``process_data``) close to fp32 eager ones.
+
+    Returns what was requested, what is used and the accuracy check, for the run metrics.
+    """
+    import torch
+
+    summary: dict[str, Any] = {
+        "requested": {"precision": precision, "runtime": runtime},
+        "precision": "fp32",
+        "runtime": "eager",
+    }
+    module = getattr(model, "model", None)
+    if not isinstance(module, torch.nn.Module):
+        logger.warning(f"{model_name} has no torch module to optimise, running fp32 eager")
+        return summary
+    if runtime == "torchscript" and model_name not in TORCHSCRIPT_MODELS:
+        logger.warning(f"No exported graph for {model_name}, running eager")
+        runtime = "eager"
+    if precision == "fp32" and runtime == "eager":
+        return summary
+
+    example_inputs: list[tuple[Any, ...]] = []
+    hook = module.register_forward_pre_hook(lambda _, args: example_inputs.append(args) if not example_inputs else None)
+    try:
+        reference = np.asarray(model.get_embeddings(sample))
+    finally:
+        hook.remove()
+
+    try:
+        optimized = quantize_linear_int8(module) if precision == "int8" else module
+        if runtime == "torchscript":
+            optimized = load_or_trace(optimized, example_inputs[0], export_cache_path(model_name, parameters, precision))
+        model.model = optimized
+        candidate = np.asarray(model.get_embeddings(sample))
+        report = compare_embeddings(reference, candidate)
+    except Exception as e:
+        logger.warning(f"Could not run {model_name} with {precision=} {runtime=}, running fp32 eager: {e}")
+        model.model = module
+        return summary
+
+    summary["accuracy"] = asdict(report)
+    logger.info(f"Accuracy of {precision} {runtime} against fp32 eager: {summary['accuracy']}")
+    if not report.passed:
+        logger.warning(f"Minimum cosine similarity below {MIN_COSINE_SIMILARITY}, running fp32 eager")
+        model.model = module
+        return summary
+    summary["precision"], summary["runtime"] = precision, runtime
+    return summary
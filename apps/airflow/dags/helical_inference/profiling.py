@@ -0,0 +1,145 @@
+"""Opt-in profiling of an inference task, bounded to its first chunks.
+
+From model loading until ``PROFILED_CHUNKS`` chunks have been embedded, the task runs
+under cProfile. The embedding of those chunks is also traced with the torch profiler
+(tokenization and model forward labelled separately), and tracemalloc records each
+chunk's allocation peak. Profiling then stops, so the rest of the run goes at full
+speed. Artefacts are written to ``profile/`` in the run's results directory and passed
+to ``publish``; the backend serves them as a zip archive.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Iterator, Optional
+
+logger = logging.getLogger("airflow.task")
+
+PROFILE_DIRNAME = "profile"
+PROFILED_CHUNKS = 3
+TOP_ALLOCATIONS = 25
+TOP_FUNCTIONS = 50
+
+
+class RunProfiler:
+    """Does nothing unless ``enabled``, so the task can call it unconditionally"""
+
+    def __init__(
+        self,
+        profile_dir: str,
+        enabled: bool = False,
+        chunks: int = PROFILED_CHUNKS,
+        publish: Optional[Callable[[str], None]] = None,
+    ):
+        self._profile_dir = profile_dir
+        self._publish = publish
+        self._enabled = enabled
+        self._chunks = chunks
+        self._chunks_done = 0
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._torch_profiler: Any = None
+        self._memory: list[dict[str, Any]] = []
+        self._started_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self._enabled and self._chunks_done < self._chunks
+
+    def start(self) -> None:
+        if not self.active:
+            return
+        logger.info(f"Profiling model loading and the first {self._chunks} chunks into '{self._profile_dir}'")
+        self._started_at = time.monotonic()
+        tracemalloc.start()
+        self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+
+    def _start_torch_profiler(self) -> None:
+        try:
+            from torch.profiler import ProfilerActivity, profile
+        except ImportError:
+            return
+        self._torch_profiler = profile(activities=[ProfilerActivity.CPU], record_shapes=True, profile_memory=True)
+        self._torch_profiler.__enter__()
+
+    @contextmanager
+    def chunk(self, cells: int) -> Iterator[None]:
+        """Wraps the processing of one chunk of ``cells`` cells"""
+        if not self.active:
+            yield
+            return
+        if self._torch_profiler is None:
+            self._start_torch_profiler()
+        tracemalloc.reset_peak()
+        started_at = time.monotonic()
+        yield
+        current, peak = tracemalloc.get_traced_memory()
+        self._memory.append(
+            {
+                "chunk": self._chunks_done,
+                "cells": cells,
+                "seconds": time.monotonic() - started_at,
+                "traced_bytes": current,
+                "peak_traced_bytes": peak,
+            }
+        )
+        self._chunks_done += 1
+        if not self.active:
+            self.finish()
+
+    def stage(self, name: str) -> ContextManager[Any]:
+        """Labels a stage of a chunk (e.g. tokenization) in the torch trace"""
+        if self._torch_profiler is None:
+            return nullcontext()
+        from torch.profiler import record_function
+
+        return record_function(name)
+
+    def finish(self) -> None:
+        """Stops profiling and writes the artefacts; called after the last profiled
+        chunk, or at the end of the task if it had fewer chunks"""
+        if self._cprofile is None:
+            return
+        self._cprofile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        if self._torch_profiler is not None:
+            self._torch_profiler.__exit__(None, None, None)
+        os.makedirs(self._profile_dir, exist_ok=True)
+
+        self._cprofile.dump_stats(os.path.join(self._profile_dir, "cprofile.pstats"))
+        report = io.StringIO()
+        pstats.Stats(self._cprofile, stream=report).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        self._write("cprofile.txt", report.getvalue())
+
+        top = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)]).statistics("lineno")[:TOP_ALLOCATIONS]
+        memory = {
+            "chunks": self._memory,
+            "top_allocations": [{"location": str(stat.traceback), "bytes": stat.size, "count": stat.count} for stat in top],
+        }
+        self._write("memory.json", json.dumps(memory, indent=2))
+
+        if self._torch_profiler is not None:
+            self._torch_profiler.export_chrome_trace(os.path.join(self._profile_dir, "torch_trace.json"))
+            self._write("torch_ops.txt", self._torch_profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=TOP_FUNCTIONS))
+        if self._publish is not None:
+            try:
+                for name in sorted(os.listdir(self._profile_dir)):
+                    self._publish(os.path.join(self._profile_dir, name))
+            except Exception as e:
+                # Called when the run fails too: its own error is the one to raise
+                logger.warning(f"Could not publish the profile: {e}")
+
+        logger.info(f"Profile of {self._chunks_done} chunks written to '{self._profile_dir}' ({time.monotonic() - (self._started_at or 0):.1f}s profiled)")
+        self._cprofile = None
+        self._torch_profiler = None
+        self._enabled = False
+
+    def _write(self, name: str, content: str) -> None:
+        with open(os.path.join(self._profile_dir, name), "w") as f:
+            f.write(content)
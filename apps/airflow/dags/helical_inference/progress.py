@@ -0,0 +1,100 @@
+"""Progress of a running inference task, published for the backend.
+
+``progress.json`` sits next to the run's results and is replaced atomically, so a
+reader never sees a partial write; ``publish`` then copies it to the result storage.
+``result_bytes`` is the length of the embeddings file published so far, up to a
+complete (flushed) chunk, and ``result_rows`` the rows in it: that prefix can be served
+while the run is still going. ``cells_total`` may be an estimate
+(``cells_total_estimated``) until embedding ends and the true count is known.
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+logger = logging.getLogger("airflow.task")
+
+PROGRESS_FILENAME = "progress.json"
+
+
+class ProgressReporter:
+    def __init__(
+        self,
+        path: str,
+        min_interval_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        publish: Optional[Callable[[str], None]] = None,
+    ):
+        self._path = path
+        self._publish = publish
+        self._min_interval_seconds = min_interval_seconds
+        self._clock = clock
+        self._stage = "starting"
+        self._cells_done = 0
+        self._cells_total: Optional[int] = None
+        self._cells_total_estimated = False
+        self._result_bytes = 0
+        self._result_rows = 0
+        self._embedding_started_at: Optional[float] = None
+        self._last_written_at: Optional[float] = None
+
+    def stage(self, stage: str) -> None:
+        self._stage = stage
+        self._write()
+
+    def start_embedding(self, cells_total: Optional[int], estimated: bool = False) -> None:
+        self._cells_total = cells_total
+        self._cells_total_estimated = estimated and cells_total is not None
+        self._embedding_started_at = self._clock()
+        self.stage("embedding")
+
+    def finish_embedding(self, cells_done: int) -> None:
+        """Records the true number of cells, whatever was expected, and writes it"""
+        self._cells_done = cells_done
+        self._cells_total = cells_done
+        self._cells_total_estimated = False
+        self._write()
+
+    def update(self, cells_done: int, result_bytes: int, result_rows: Optional[int] = None) -> None:
+        """Called after each chunk; writes at most once per ``min_interval_seconds``.
+        ``result_rows`` defaults to ``cells_done``: the whole result is published."""
+        self._cells_done = cells_done
+        self._result_bytes = result_bytes
+        self._result_rows = cells_done if result_rows is None else result_rows
+        now = self._clock()
+        if self._last_written_at is None or now - self._last_written_at >= self._min_interval_seconds:
+            self._write()
+
+    def _write(self) -> None:
+        now = self._clock()
+        # Measured from the first chunk on, so that model loading does not drag it down
+        cells_per_second = None
+        if self._embedding_started_at is not None and self._cells_done and now > self._embedding_started_at:
+            cells_per_second = self._cells_done / (now - self._embedding_started_at)
+        eta_seconds = None
+        if cells_per_second and self._cells_total is not None:
+            eta_seconds = max(self._cells_total - self._cells_done, 0) / cells_per_second
+        progress = {
+            "stage": self._stage,
+            "cells_done": self._cells_done,
+            "cells_total": self._cells_total,
+            "cells_total_estimated": self._cells_total_estimated,
+            "cells_per_second": cells_per_second,
+            "eta_seconds": eta_seconds,
+            "result_bytes": self._result_bytes,
+            "result_rows": self._result_rows,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, self._path)
+        self._last_written_at = now
+        if self._publish is not None:
+            try:
+                self._publish(self._path)
+            except Exception as e:
+                # Progress is advisory: the run goes on, the next write catches up
+                logger.warning(f"Could not publish progress: {e}")
@@ -0,0 +1,163 @@
+"""Where the inference task stores its result file and the artefacts of the run,
+configured by the same environment variables as the backend, which serves them.
+
+The task always writes to the results directory first. The result grows chunk by
+chunk; ``store_partial`` publishes its complete rows for the backend to serve as
+partial results, and ``store`` moves the whole file into the storage when the run
+finishes. The run's artefacts (progress, summary, profile, metrics) are published with
+``publish`` as they are written. Keys are paths relative to the results directory.
+
+With ``RESULTS_STORAGE=local`` (the default) the results directory is the storage and
+nothing moves. With ``RESULTS_STORAGE=s3`` everything goes to ``RESULTS_S3_BUCKET``
+under ``RESULTS_S3_PREFIX``: partial results as parts of at least
+``RESULTS_S3_MULTIPART_CHUNK_BYTES`` under ``<key>.parts/``, uploaded in the background
+and removed once the run is complete, and the result in parallel multipart parts,
+then deleted from the worker.
+"""
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger("airflow.task")
+
+MULTIPART_CHUNK_BYTES = 64 * 1024**2
+MULTIPART_CONCURRENCY = 8
+# Named after their offset in the result, so that they list in order
+PARTS_SUFFIX = ".parts/"
+
+
+class LocalResultStorage:
+    def publish(self, local_path: str, key: str) -> None:
+        pass
+
+    def store_partial(self, local_path: str, key: str, complete_bytes: int, rows: int) -> Tuple[int, int]:
+        """Publishes the first ``complete_bytes`` (``rows`` rows) of the result as it
+        is written; returns the bytes and rows published so far. Here the result is
+        written in place, so all of it is."""
+        return complete_bytes, rows
+
+    def store(self, local_path: str, key: str) -> None:
+        pass
+
+    def remove_partial(self, key: str) -> None:
+        pass
+
+
+class S3ResultStorage:
+    """boto3 ships with the Airflow image (amazon provider); it is imported on first use"""
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        chunk_bytes: int = MULTIPART_CHUNK_BYTES,
+        max_concurrency: int = MULTIPART_CONCURRENCY,
+        client: Any = None,
+    ):
+        self._bucket = bucket
+        self._prefix = prefix.strip("/")
+        self._endpoint_url = endpoint_url
+        self._chunk_bytes = chunk_bytes
+        self._max_concurrency = max_concurrency
+        self._client = client
+        # Partial results: one background upload at a time, so that embedding goes on
+        self._part_uploads = ThreadPoolExecutor(max_workers=1, thread_name_prefix="partial-results")
+        self._part_upload: Optional[Future] = None
+        self._published: dict[str, Tuple[int, int]] = {}
+
+    def object_key(self, key: str) -> str:
+        return f"{self._prefix}/{key}" if self._prefix else key
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=self._endpoint_url,
+                # One connection per concurrent part
+                config=Config(signature_version="s3v4", s3={"addressing_style": "path"}, max_pool_connections=self._max_concurrency),
+            )
+        return self._client
+
+    def publish(self, local_path: str, key: str) -> None:
+        self.client.upload_file(local_path, self._bucket, self.object_key(key))
+
+    def _upload_part(self, local_path: str, key: str, start: int, end: int, rows: int) -> Tuple[int, int]:
+        with open(local_path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        self.client.put_object(Bucket=self._bucket, Key=self.object_key(f"{key}{PARTS_SUFFIX}{start:015d}"), Body=data)
+        return end, rows
+
+    def _collect_part_upload(self, key: str) -> None:
+        upload, self._part_upload = self._part_upload, None
+        if upload is None:
+            return
+        try:
+            self._published[key] = upload.result()
+        except Exception as e:
+            # Partial results lag behind, the run goes on; the range is sent again
+            logger.warning(f"Could not upload partial results of '{key}': {e}")
+
+    def store_partial(self, local_path: str, key: str, complete_bytes: int, rows: int) -> Tuple[int, int]:
+        if self._part_upload is not None and self._part_upload.done():
+            self._collect_part_upload(key)
+        published_bytes, published_rows = self._published.get(key, (0, 0))
+        if self._part_upload is None and complete_bytes - published_bytes >= self._chunk_bytes:
+            self._part_upload = self._part_uploads.submit(self._upload_part, local_path, key, published_bytes, complete_bytes, rows)
+        return published_bytes, published_rows
+
+    def remove_partial(self, key: str) -> None:
+        pages = self.client.get_paginator("list_objects_v2").paginate(Bucket=self._bucket, Prefix=self.object_key(f"{key}{PARTS_SUFFIX}"))
+        for page in pages:
+            parts = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if parts:
+                self.client.delete_objects(Bucket=self._bucket, Delete={"Objects": parts, "Quiet": True})
+
+    def store(self, local_path: str, key: str) -> None:
+        from boto3.s3.transfer import TransferConfig
+
+        # The last part must not be uploaded after remove_partial
+        if self._part_upload is not None:
+            wait([self._part_upload])
+            self._collect_part_upload(key)
+        client = self.client
+        # Parts of chunk_bytes are uploaded by max_concurrency threads; boto3 completes
+        # the multipart upload, or aborts it if a part fails
+        transfer = TransferConfig(
+            multipart_threshold=self._chunk_bytes,
+            multipart_chunksize=self._chunk_bytes,
+            max_concurrency=self._max_concurrency,
+            use_threads=True,
+        )
+        size = os.path.getsize(local_path)
+        object_key = self.object_key(key)
+        started_at = time.monotonic()
+        client.upload_file(local_path, self._bucket, object_key, Config=transfer, ExtraArgs={"ContentType": "text/csv"})
+        seconds = time.monotonic() - started_at
+        logger.info(f"Uploaded {size} bytes to s3://{self._bucket}/{object_key} in {seconds:.1f}s ({size / max(seconds, 1e-9) / 1024**2:.1f} MiB/s)")
+        os.remove(local_path)
+
+
+def result_storage_from_env():
+    backend = os.environ.get("RESULTS_STORAGE", "local")
+    if backend == "local":
+        return LocalResultStorage()
+    if backend != "s3":
+        raise ValueError(f"Unsupported RESULTS_STORAGE: {backend}")
+    bucket = os.environ.get("RESULTS_S3_BUCKET")
+    if not bucket:
+        raise ValueError("RESULTS_S3_BUCKET must be set when RESULTS_STORAGE=s3")
+    return S3ResultStorage(
+        bucket,
+        prefix=os.environ.get("RESULTS_S3_PREFIX", ""),
+        endpoint_url=os.environ.get("RESULTS_S3_ENDPOINT_URL") or None,
+        chunk_bytes=int(os.environ.get("RESULTS_S3_MULTIPART_CHUNK_BYTES", MULTIPART_CHUNK_BYTES)),
+        max_concurrency=int(os.environ.get("RESULTS_S3_MULTIPART_CONCURRENCY", MULTIPART_CONCURRENCY)),
+    )
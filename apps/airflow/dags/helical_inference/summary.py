@@ -0,0 +1,112 @@
+"""Summary statistics of a run's embeddings, computed in one pass over the chunks.
+
+Per dimension: count, mean, variance (population), min, max and NaN count; per cell:
+the L2 norm, summarised the same way over the cells without NaNs. Moments are merged
+with Chan et al.'s pairwise update, so chunks (or shards of a run) combine exactly
+whatever their sizes. ``summary.json`` sits next to the run's results; the backend
+serves it, and computes the same statistics from the CSV for runs that predate it.
+"""
+import json
+import os
+from typing import Any, Optional
+
+import numpy as np
+
+SUMMARY_FILENAME = "summary.json"
+
+
+class Moments:
+    """Count, mean, sum of squared deviations, min and max of each of ``size`` values"""
+
+    def __init__(self, size: int):
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    @classmethod
+    def of(cls, values: np.ndarray) -> "Moments":
+        """Moments of the columns of ``values`` (rows x size), ignoring NaNs"""
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        moments = cls(values.shape[1])
+        moments.count = valid.sum(axis=0)
+        nonempty = moments.count > 0
+        moments.mean = np.divide(np.where(valid, values, 0).sum(axis=0), moments.count, out=np.zeros(values.shape[1]), where=nonempty)
+        moments.m2 = np.square(np.where(valid, values - moments.mean, 0)).sum(axis=0)
+        moments.min = np.where(valid, values, np.inf).min(axis=0, initial=np.inf)
+        moments.max = np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf)
+        return moments
+
+    def merge(self, other: "Moments") -> None:
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        weight = np.divide(other.count, count, out=np.zeros(len(count)), where=count > 0)
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + other.m2 + delta**2 * self.count * weight
+        self.count = count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+
+    def to_dict(self) -> dict[str, list[Optional[float]]]:
+        empty = self.count == 0
+        variance = np.divide(self.m2, self.count, out=np.zeros(len(self.count)), where=~empty)
+
+        def column(values: np.ndarray) -> list[Optional[float]]:
+            return [None if e else float(v) for v, e in zip(values, empty)]
+
+        return {
+            "count": self.count.tolist(),
+            "mean": column(self.mean),
+            "variance": column(variance),
+            "min": column(self.min),
+            "max": column(self.max),
+        }
+
+
+class EmbeddingSummary:
+    def __init__(self) -> None:
+        self.rows = 0
+        self.rows_with_nan = 0
+        self.dimensions: Optional[Moments] = None
+        self.norms = Moments(1)
+
+    def update(self, embeddings: np.ndarray) -> None:
+        """Adds a chunk of embeddings (cells x ...); extra axes are flattened"""
+        embeddings = np.asarray(embeddings, dtype=np.float64).reshape(len(embeddings), -1)
+        other = EmbeddingSummary()
+        other.rows = len(embeddings)
+        nan_rows = np.isnan(embeddings).any(axis=1)
+        other.rows_with_nan = int(nan_rows.sum())
+        other.dimensions = Moments.of(embeddings)
+        other.norms = Moments.of(np.linalg.norm(embeddings[~nan_rows], axis=1)[:, None])
+        self.merge(other)
+
+    def merge(self, other: "EmbeddingSummary") -> None:
+        self.rows += other.rows
+        self.rows_with_nan += other.rows_with_nan
+        if self.dimensions is None:
+            self.dimensions = other.dimensions
+        elif other.dimensions is not None:
+            self.dimensions.merge(other.dimensions)
+        self.norms.merge(other.norms)
+
+    def to_dict(self) -> dict[str, Any]:
+        dimensions = self.dimensions or Moments(0)
+        nan_count = self.rows - dimensions.count
+        norm = {key: values[0] for key, values in self.norms.to_dict().items()}
+        return {
+            "rows": self.rows,
+            "dims": len(dimensions.count),
+            "nan_count": int(nan_count.sum()),
+            "rows_with_nan": self.rows_with_nan,
+            "norm": norm,
+            "dimensions": {**dimensions.to_dict(), "nan_count": nan_count.tolist()},
+        }
+
+    def write(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,168 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+from datasets import Features, Sequence, Value
+
+from helical_inference.conversion import ArrowAnnDataConverter, _subset_genes
+
+GENES = ["gene0", "Gene1", "GENE2", "gene3", "gene4"]
+
+
+def make_table(n_cells, seed=0):
+    rng = np.random.default_rng(seed)
+    counts, rows = [], []
+    for _ in range(n_cells):
+        genes = np.sort(rng.choice(len(GENES), rng.integers(0, len(GENES) + 1), replace=False))
+        rows.append(genes.tolist())
+        counts.append(rng.integers(1, 50, len(genes)).astype(np.float32).tolist())
+    return pa.table(
+        {
+            "raw_counts": pa.array(counts, type=pa.list_(pa.float32())),
+            "rows": pa.array(rows, type=pa.list_(pa.int32())),
+            "size": pa.array([len(GENES)] * n_cells, type=pa.int32()),
+            "cell_type": pa.array(rng.choice(["B cell", "T cell"], n_cells)),
+            "donor": pa.array(rng.integers(0, 3, n_cells)),
+        }
+    )
+
+
+@pytest.fixture
+def features():
+    return Features(
+        {
+            "raw_counts": Sequence(Value("float32"), id=",".join(GENES)),
+            "rows": Sequence(Value("int32")),
+            "size": Value("int32"),
+            "cell_type": Value("string"),
+            "donor": Value("int64"),
+        }
+    )
+
+
+def dense_counts(table):
+    """Reference expression matrix, built row by row"""
+    matrix = np.zeros((table.num_rows, len(GENES)), dtype=np.float32)
+    for i, (counts, rows) in enumerate(zip(table.column("raw_counts").to_pylist(), table.column("rows").to_pylist())):
+        matrix[i, rows] = counts
+    return matrix
+
+
+class TestArrowAnnDataConverter:
+    def test_matches_row_by_row_conversion(self, features):
+        table = make_table(50)
+        ann_data = ArrowAnnDataConverter(features)(table)
+        np.testing.assert_array_equal(ann_data.X.toarray(), dense_counts(table))
+        assert list(ann_data.var_names) == [gene.upper() for gene in GENES]
+        assert list(ann_data.var["gene_name"]) == [gene.upper() for gene in GENES]
+        assert list(ann_data.obs.columns) == ["cell_type", "donor"]
+        assert list(ann_data.obs["cell_type"]) == table.column("cell_type").to_pylist()
+        assert list(ann_data.obs["donor"]) == table.column("donor").to_pylist()
+
+    @pytest.mark.parametrize("offset, length", [(0, 10), (7, 20), (45, 5)])
+    def test_sliced_tables(self, features, offset, length):
+        # Record batches are slices of the dataset's table: list offsets do not start at 0
+        table = make_table(50).slice(offset, length)
+        ann_data = ArrowAnnDataConverter(features)(table)
+        np.testing.assert_array_equal(ann_data.X.toarray(), dense_counts(table))
+        assert ann_data.n_obs == length
+
+    def test_multi_chunk_columns(self, features):
+        table = pa.concat_tables([make_table(10, seed=1), make_table(15, seed=2).slice(3)])
+        ann_data = ArrowAnnDataConverter(features)(table)
+        np.testing.assert_array_equal(ann_data.X.toarray(), dense_counts(table))
+
+    def test_counts_are_views_unless_writable(self, features):
+        table = make_table(20)
+        assert not ArrowAnnDataConverter(features)(table).X.data.flags.writeable
+        writable = ArrowAnnDataConverter(features, writable=True)(table)
+        writable.X.data *= 2
+        np.testing.assert_array_equal(writable.X.toarray(), dense_counts(table) * 2)
+
+    def test_chunks_do_not_share_var(self, features):
+        convert = ArrowAnnDataConverter(features)
+        first, second = convert(make_table(5, seed=1)), convert(make_table(5, seed=2))
+        assert first.var is not second.var
+        first.var["highly_variable"] = True
+        first.var.rename(columns={"gene_name": "symbol"}, inplace=True)
+        assert list(second.var.columns) == ["gene_name"]
+
+    def test_features_default_to_the_table_schema(self):
+        table = make_table(5)
+        schema = Features(
+            {
+                "raw_counts": Sequence(Value("float32"), id=",".join(GENES)),
+                "rows": Sequence(Value("int32")),
+                "size": Value("int32"),
+                "cell_type": Value("string"),
+                "donor": Value("int64"),
+            }
+        ).arrow_schema
+        ann_data = ArrowAnnDataConverter()(table.cast(schema))
+        assert list(ann_data.var_names) == [gene.upper() for gene in GENES]
+
+    def test_rejects_mismatched_list_lengths(self, features):
+        table = make_table(5)
+        rows = pa.array([[0]] * 5, type=pa.list_(pa.int32()))
+        with pytest.raises(ValueError):
+            ArrowAnnDataConverter(features)(table.set_column(1, "rows", rows))
+
+    def test_rejects_gene_indices_beyond_gene_names(self, features):
+        table = pa.table(
+            {
+                "raw_counts": pa.array([[1.0]], type=pa.list_(pa.float32())),
+                "rows": pa.array([[len(GENES)]], type=pa.list_(pa.int32())),
+            }
+        )
+        with pytest.raises(ValueError):
+            ArrowAnnDataConverter(features)(table)
+
+
+class TestGeneSubset:
+    def test_remaps_csr_buffers(self):
+        # Rows [0, 2], [1], [], [0, 1, 2] over genes 0-2; gene 1 is dropped, 2 becomes 1
+        indptr = np.array([0, 2, 3, 3, 6])
+        indices = np.array([0, 2, 1, 0, 1, 2])
+        data = np.arange(1.0, 7.0)
+        new_indptr, new_indices, new_data = _subset_genes(indptr, indices, data, np.array([0, -1, 1]))
+        assert new_indptr.tolist() == [0, 2, 2, 2, 4]
+        assert new_indices.tolist() == [0, 1, 0, 1]
+        assert new_data.tolist() == [1.0, 2.0, 4.0, 6.0]
+
+    @pytest.mark.parametrize("offset, length", [(0, 50), (7, 20), (45, 5)])
+    def test_sliced_tables(self, features, offset, length):
+        table = make_table(50).slice(offset, length)
+        ann_data = ArrowAnnDataConverter(features, genes=["gene4", "gene1"])(table)
+        # Dataset order, whatever the order of the request
+        assert list(ann_data.var_names) == ["GENE1", "GENE4"]
+        np.testing.assert_array_equal(ann_data.X.toarray(), dense_counts(table)[:, [1, 4]])
+        assert ann_data.n_obs == length
+
+    def test_multi_chunk_columns(self, features):
+        table = pa.concat_tables([make_table(10, seed=1).slice(2), make_table(15, seed=2).slice(3, 9)])
+        ann_data = ArrowAnnDataConverter(features, genes=["GENE0", "gene2", "unknown"])(table)
+        np.testing.assert_array_equal(ann_data.X.toarray(), dense_counts(table)[:, [0, 2]])
+
+    def test_records_the_source_gene_count(self, features):
+        convert = ArrowAnnDataConverter(features, genes=["gene2"])
+        assert convert.source_n_genes is None
+        assert convert(make_table(5)).n_vars == 1
+        assert convert.source_n_genes == len(GENES)
+
+    def test_rejects_genes_not_in_the_dataset(self, features):
+        with pytest.raises(ValueError):
+            ArrowAnnDataConverter(features, genes=["unknown"])(make_table(5))
+
+
+@pytest.mark.parametrize("offset, length", [(0, 40), (13, 17)])
+def test_matches_helical_conversion(features, offset, length):
+    pytest.importorskip("helical")
+    from datasets import Dataset, DatasetInfo
+    from helical.utils import get_anndata_from_hf_dataset
+
+    table = make_table(40).slice(offset, length)
+    expected = get_anndata_from_hf_dataset(Dataset(pa.concat_tables([table]).combine_chunks(), info=DatasetInfo(features=features)))
+    ann_data = ArrowAnnDataConverter(features)(table)
+    np.testing.assert_array_equal(ann_data.X.toarray(), np.asarray(expected.X.todense() if hasattr(expected.X, "todense") else expected.X))
+    assert list(ann_data.var_names) == list(expected.var_names)
+    for column in expected.obs.columns:
+        assert list(ann_data.obs[column]) == list(expected.obs[column])
@@ -0,0 +1,112 @@
+import fcntl
+import sys
+
+import pytest
+
+from helical_inference import execution
+from helical_inference.execution import POOL_SLOTS_ENV_VARS, resolve_execution_profile, worker_concurrency
+
+CPUS = list(range(14))
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    for name in ("INFERENCE_WORKER_CONCURRENCY", *POOL_SLOTS_ENV_VARS):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+@pytest.fixture
+def slots_dir(tmp_path, monkeypatch):
+    """Lock files of a fresh host; the slot this process takes is released afterwards"""
+    monkeypatch.setenv("INFERENCE_CPU_SLOTS_DIR", str(tmp_path))
+    monkeypatch.setattr(execution, "_held_slot", None)
+    yield tmp_path
+    if execution._held_slot is not None:
+        execution._held_slot[1].close()
+
+
+@pytest.fixture
+def other_tasks(slots_dir):
+    """Holds slots as other tasks on the host would"""
+    held = []
+
+    def hold(*slots):
+        for slot in slots:
+            lock_file = open(slots_dir / f"slot-{slot}.lock", "w")
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            held.append(lock_file)
+
+    yield hold
+    for lock_file in held:
+        lock_file.close()
+
+
+class TestWorkerConcurrency:
+    def test_explicit_concurrency(self, env):
+        env.setenv("INFERENCE_WORKER_CONCURRENCY", "3")
+        env.setenv("INFERENCE_POOL_SMALL_SLOTS", "4")
+        assert worker_concurrency() == 3
+
+    def test_slots_of_all_pools(self, env):
+        for name, slots in zip(POOL_SLOTS_ENV_VARS, ("4", "2", "1")):
+            env.setenv(name, slots)
+        assert worker_concurrency() == 7
+
+    def test_unset_pools_are_skipped(self, env):
+        env.setenv("INFERENCE_POOL_MEDIUM_SLOTS", "2")
+        assert worker_concurrency() == 2
+
+    def test_one_task_without_airflow(self, env):
+        env.setitem(sys.modules, "airflow.configuration", None)
+        assert worker_concurrency() == 1
+
+
+class TestResolveExecutionProfile:
+    def test_cores_are_shared_between_tasks(self, slots_dir):
+        profile = resolve_execution_profile(cpus=CPUS, concurrency=7)
+        assert (profile.intra_op_threads, profile.inter_op_threads, profile.blas_threads) == (2, 1, 2)
+        assert profile.cpu_affinity == (0, 1)
+
+    def test_concurrency_from_pool_slots(self, env, slots_dir):
+        for name, slots in zip(POOL_SLOTS_ENV_VARS, ("4", "2", "1")):
+            env.setenv(name, slots)
+        assert resolve_execution_profile(cpus=CPUS).intra_op_threads == 2
+
+    def test_pinned_to_the_first_free_block(self, slots_dir, other_tasks):
+        other_tasks(0, 1)
+        profile = resolve_execution_profile(cpus=CPUS, concurrency=7)
+        assert profile.cpu_affinity == (4, 5)
+
+    def test_slot_is_held_until_the_process_exits(self, slots_dir, other_tasks):
+        first = resolve_execution_profile(cpus=CPUS, concurrency=7)
+        assert resolve_execution_profile(cpus=CPUS, concurrency=7) == first
+        with pytest.raises(BlockingIOError):
+            other_tasks(0)
+        execution._held_slot[1].close()
+        execution._held_slot = None
+        other_tasks(0)
+
+    def test_one_unpinned_thread_when_no_slot_is_free(self, slots_dir, other_tasks):
+        other_tasks(*range(7))
+        profile = resolve_execution_profile(cpus=CPUS, concurrency=7)
+        assert (profile.intra_op_threads, profile.blas_threads, profile.cpu_affinity) == (1, 1, None)
+
+    def test_requested_threads_are_kept_when_no_slot_is_free(self, slots_dir, other_tasks):
+        other_tasks(*range(7))
+        profile = resolve_execution_profile({"intra_op_threads": 4}, cpus=CPUS, concurrency=7)
+        assert (profile.intra_op_threads, profile.cpu_affinity) == (4, None)
+
+    def test_no_slot_without_pinning(self, slots_dir):
+        profile = resolve_execution_profile({"cpu_affinity": "none"}, cpus=CPUS, concurrency=7)
+        assert (profile.intra_op_threads, profile.cpu_affinity) == (2, None)
+        assert execution._held_slot is None
+
+    def test_explicit_cores(self, slots_dir):
+        profile = resolve_execution_profile({"cpu_affinity": [3, 4, 5]}, cpus=CPUS, concurrency=7)
+        assert (profile.intra_op_threads, profile.cpu_affinity) == (3, (3, 4, 5))
+        assert execution._held_slot is None
+
+    def test_unsupported_affinity(self, slots_dir):
+        with pytest.raises(ValueError, match="Unsupported cpu_affinity"):
+            resolve_execution_profile({"cpu_affinity": "numa"}, cpus=CPUS, concurrency=7)
@@ -0,0 +1,320 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+import pyarrow.parquet as pq
+from datasets import ClassLabel, Features, IterableDataset, Value
+
+from helical_inference.ingestion import (
+    SplitSpec,
+    _allocate,
+    _column_names,
+    _rechunk,
+    _select_rows,
+    load_arrow_chunks,
+    obs_filter_mask,
+    select_sample,
+    subsample_mask,
+)
+
+
+def make_table(num_rows):
+    return pa.table({"row": np.arange(num_rows)})
+
+
+def batches_of(table, batch_size):
+    return (table.slice(start, batch_size) for start in range(0, table.num_rows, batch_size))
+
+
+def selected_rows(tables):
+    return [row for table in tables for row in table.column("row").to_pylist()]
+
+
+class TestSplitSpec:
+    @pytest.mark.parametrize(
+        "split, expected",
+        [
+            ("train", SplitSpec("train")),
+            ("train[:10%]", SplitSpec("train", None, "10%")),
+            ("test[100:2000]", SplitSpec("test", "100", "2000")),
+            ("train[-5%:]", SplitSpec("train", "-5%", None)),
+            ("train[ 10 : -10 ]", SplitSpec("train", "10", "-10")),
+        ],
+    )
+    def test_parse(self, split, expected):
+        assert SplitSpec.parse(split) == expected
+
+    @pytest.mark.parametrize("split", ["train[", "train[1:2:3]", "train[a:b]", ""])
+    def test_rejects_unsupported_expressions(self, split):
+        with pytest.raises(ValueError):
+            SplitSpec.parse(split)
+
+    @pytest.mark.parametrize(
+        "split, needs_num_rows",
+        [("train", False), ("train[10:20]", False), ("train[:10%]", True), ("train[-10:]", True)],
+    )
+    def test_needs_num_rows(self, split, needs_num_rows):
+        assert SplitSpec.parse(split).needs_num_rows is needs_num_rows
+
+    @pytest.mark.parametrize(
+        "split, num_rows, expected",
+        [
+            ("train", 1000, (0, 1000)),
+            ("train", None, (0, None)),
+            ("train[:10%]", 1000, (0, 100)),
+            ("train[10%:20%]", 1000, (100, 200)),
+            ("train[-100:]", 1000, (900, 1000)),
+            ("train[-5%:-1%]", 1000, (950, 990)),
+            ("train[100:2000]", 1000, (100, 1000)),
+            ("train[100:2000]", None, (100, 2000)),
+            ("train[-2000:]", 1000, (0, 1000)),
+        ],
+    )
+    def test_row_range(self, split, num_rows, expected):
+        assert SplitSpec.parse(split).row_range(num_rows) == expected
+
+    @pytest.mark.parametrize("split", ["train", "train[:10%]", "train[-5:]", "train[10:20]"])
+    def test_empty_split(self, split):
+        assert SplitSpec.parse(split).row_range(0) == (0, 0)
+
+    @pytest.mark.parametrize("split", ["train[:10%]", "train[-5:]"])
+    def test_relative_bounds_need_num_rows(self, split):
+        with pytest.raises(ValueError, match="number of rows"):
+            SplitSpec.parse(split).row_range(None)
+
+
+class TestSubsample:
+    def test_keeps_everything_without_fraction(self):
+        assert subsample_mask(np.arange(10), None, seed=0).all()
+        assert subsample_mask(np.arange(10), 1.0, seed=0).all()
+
+    def test_keeps_about_the_fraction(self):
+        kept = subsample_mask(np.arange(100_000), 0.1, seed=0).mean()
+        assert kept == pytest.approx(0.1, abs=0.005)
+
+    def test_depends_on_seed(self):
+        indices = np.arange(1000)
+        assert (subsample_mask(indices, 0.5, seed=0) != subsample_mask(indices, 0.5, seed=1)).any()
+
+    @pytest.mark.parametrize("batch_size", [1, 7, 100, 1000, 5000])
+    def test_selection_does_not_depend_on_batch_size(self, batch_size):
+        table = make_table(3000)
+        expected = selected_rows(_select_rows(batches_of(table, 3000), 250, 2750, 0.3, seed=42))
+        rows = selected_rows(_select_rows(batches_of(table, batch_size), 250, 2750, 0.3, seed=42))
+        assert rows == expected
+        assert all(250 <= row < 2750 for row in rows)
+
+
+class TestSelectRows:
+    def test_slices_the_split(self):
+        rows = selected_rows(_select_rows(batches_of(make_table(100), 30), 25, 65, None, seed=0))
+        assert rows == list(range(25, 65))
+
+    def test_open_ended_slice(self):
+        rows = selected_rows(_select_rows(batches_of(make_table(100), 30), 90, None, None, seed=0))
+        assert rows == list(range(90, 100))
+
+    def test_stops_reading_after_the_slice(self):
+        read = []
+
+        def batches():
+            for batch in batches_of(make_table(100), 10):
+                read.append(batch)
+                yield batch
+
+        list(_select_rows(batches(), 0, 25, None, seed=0))
+        assert len(read) == 4
+
+
+class TestObsFilterMask:
+    def test_keeps_rows_matching_every_column(self):
+        table = pa.table({"cell_type": ["B", "T", "T", "NK"], "donor": [1, 1, 2, 1]})
+        mask = obs_filter_mask(table, {"cell_type": ["T", "NK"], "donor": [1]})
+        assert mask.tolist() == [False, True, False, True]
+
+    def test_class_label_columns_match_names_and_codes(self):
+        features = Features({"cell_type": ClassLabel(names=["B", "T", "NK"])})
+        table = pa.table({"cell_type": pa.array([0, 1, 2, 1], type=pa.int64())})
+        assert obs_filter_mask(table, {"cell_type": ["T"]}, features).tolist() == [False, True, False, True]
+        assert obs_filter_mask(table, {"cell_type": ["B", 2]}, features).tolist() == [True, False, True, False]
+
+    def test_unknown_class_label_name(self):
+        features = Features({"cell_type": ClassLabel(names=["B", "T"])})
+        table = pa.table({"cell_type": pa.array([0, 1], type=pa.int64())})
+        with pytest.raises(ValueError):
+            obs_filter_mask(table, {"cell_type": ["NK"]}, features)
+
+    def test_rejects_values_of_another_type(self):
+        table = pa.table({"donor": [1, 2]})
+        with pytest.raises(ValueError, match="donor"):
+            obs_filter_mask(table, {"donor": ["first"]})
+
+    def test_rejects_unknown_columns(self):
+        with pytest.raises(ValueError, match="tissue"):
+            obs_filter_mask(pa.table({"donor": [1]}), {"tissue": ["lung"]})
+
+
+class TestAllocate:
+    @pytest.mark.parametrize(
+        "counts, sample_size, expected",
+        [
+            ([60, 30, 10], 10, [6, 3, 1]),
+            # Remainders 0.5, 0.0, 0.5: ties go to the first stratum
+            ([7, 2, 1], 5, [4, 1, 0]),
+            ([1, 1, 1], 2, [1, 1, 0]),
+            ([0, 4, 4], 3, [0, 2, 1]),
+            ([3, 97], 10, [0, 10]),
+            ([50, 25, 25], 100, [50, 25, 25]),
+        ],
+    )
+    def test_largest_remainder(self, counts, sample_size, expected):
+        allocation = _allocate(np.array(counts), sample_size)
+        assert allocation.tolist() == expected
+        assert allocation.sum() == sample_size
+
+
+def make_obs_table(strata):
+    return pa.table({"row": np.arange(len(strata)), "cell_type": pa.array(strata, type=pa.string())})
+
+
+class TestSelectSample:
+    @pytest.mark.parametrize("batch_size", [1, 7, 100, 1000])
+    def test_does_not_depend_on_batch_size(self, batch_size):
+        table = make_table(1000)
+        expected = select_sample(batches_of(table, 1000), 100, 900, 50, seed=3)
+        sample = select_sample(batches_of(table, batch_size), 100, 900, 50, seed=3)
+        np.testing.assert_array_equal(sample, expected)
+        assert len(sample) == 50
+        assert (np.diff(sample) > 0).all()
+        assert ((sample >= 100) & (sample < 900)).all()
+
+    def test_depends_on_seed(self):
+        table = make_table(1000)
+        first = select_sample(batches_of(table, 100), 0, None, 50, seed=0)
+        second = select_sample(batches_of(table, 100), 0, None, 50, seed=1)
+        assert (first != second).any()
+
+    def test_samples_among_the_filtered_and_subsampled_rows(self):
+        table = make_obs_table(["A", "B"] * 500)
+        kept = selected_rows(_select_rows(batches_of(table, 64), 0, None, 0.5, seed=1, obs_filter={"cell_type": ["A"]}))
+        sample = select_sample(batches_of(table, 64), 0, None, 20, seed=1, sample_fraction=0.5, obs_filter={"cell_type": ["A"]})
+        assert len(sample) == 20
+        assert set(sample.tolist()) <= set(kept)
+
+    def test_keeps_every_row_when_fewer_match(self):
+        sample = select_sample(batches_of(make_table(100), 30), 10, 40, 50, seed=0)
+        assert sample.tolist() == list(range(10, 40))
+
+    def test_stratifies_in_proportion(self):
+        table = make_obs_table(["A"] * 600 + ["B"] * 300 + ["C"] * 100)
+        sample = select_sample(batches_of(table, 128), 0, None, 10, seed=0, stratify_by="cell_type")
+        strata = table.column("cell_type").take(pa.array(sample)).to_pylist()
+        assert sorted(strata) == ["A"] * 6 + ["B"] * 3 + ["C"]
+
+    def test_null_values_are_a_stratum(self):
+        table = make_obs_table(["A"] * 70 + [None] * 30)
+        sample = select_sample(batches_of(table, 16), 0, None, 10, seed=0, stratify_by="cell_type")
+        strata = table.column("cell_type").take(pa.array(sample)).to_pylist()
+        assert strata.count(None) == 3
+        assert strata.count("A") == 7
+
+    def test_stratified_sample_does_not_depend_on_batch_size(self):
+        table = make_obs_table(["A", "B", None, "A"] * 250)
+        expected = select_sample(batches_of(table, 1000), 0, None, 40, seed=5, stratify_by="cell_type")
+        sample = select_sample(batches_of(table, 9), 0, None, 40, seed=5, stratify_by="cell_type")
+        np.testing.assert_array_equal(sample, expected)
+
+
+class TestSelectSampledRows:
+    @pytest.mark.parametrize("batch_size", [1, 7, 64, 1000])
+    def test_reads_the_sampled_rows(self, batch_size):
+        sample = np.array([3, 4, 5, 64, 127, 128, 500, 998])
+        rows = selected_rows(_select_rows(batches_of(make_table(1000), batch_size), 0, None, None, 0, sample=sample))
+        assert rows == sample.tolist()
+
+    def test_sample_within_the_slice(self):
+        sample = np.array([100, 150, 199])
+        rows = selected_rows(_select_rows(batches_of(make_table(1000), 64), 100, 200, None, 0, sample=sample))
+        assert rows == [100, 150, 199]
+
+    def test_stops_reading_after_the_last_sampled_row(self):
+        read = []
+
+        def batches():
+            for batch in batches_of(make_table(100), 10):
+                read.append(batch)
+                yield batch
+
+        list(_select_rows(batches(), 0, None, None, 0, sample=np.array([2, 24])))
+        assert len(read) == 4
+
+    def test_empty_sample(self):
+        assert list(_select_rows(batches_of(make_table(100), 10), 0, None, None, 0, sample=np.array([], dtype=np.int64))) == []
+
+
+class TestColumnNames:
+    def test_streaming_dataset_without_features(self):
+        def rows():
+            for i in range(3):
+                yield {"cell_type": "B", "donor": i}
+
+        dataset = IterableDataset.from_generator(rows)
+        assert dataset.column_names is None
+        assert _column_names(dataset) == ["cell_type", "donor"]
+
+    def test_resolved_features(self):
+        features = Features({"donor": Value("int64")})
+        dataset = IterableDataset.from_generator(lambda: iter([{"donor": 1}]), features=features)
+        assert _column_names(dataset) == ["donor"]
+
+
+class TestRechunk:
+    @pytest.mark.parametrize("batch_size", [1, 3, 10, 64, 1000])
+    def test_chunks_have_chunk_size_rows_but_the_last(self, batch_size):
+        chunks = list(_rechunk(batches_of(make_table(250), batch_size), 64))
+        assert [chunk.num_rows for chunk in chunks] == [64, 64, 64, 58]
+        assert selected_rows(chunks) == list(range(250))
+
+    def test_exact_multiple_has_no_empty_chunk(self):
+        chunks = list(_rechunk(batches_of(make_table(128), 50), 64))
+        assert [chunk.num_rows for chunk in chunks] == [64, 64]
+
+    def test_no_rows(self):
+        assert list(_rechunk(iter([]), 64)) == []
+
+
+@pytest.fixture
+def local_dataset(tmp_path):
+    """A dataset directory ``load_dataset`` reads without network access"""
+
+    def write(num_rows):
+        pq.write_table(make_table(num_rows), tmp_path / "train.parquet")
+        return str(tmp_path)
+
+    return write
+
+
+class TestLoadArrowChunks:
+    @pytest.mark.parametrize("streaming", [True, False])
+    def test_selects_the_split_slice(self, local_dataset, streaming):
+        chunks = load_arrow_chunks(local_dataset(100), "train[10%:25]", chunk_size=8, streaming=streaming)
+        assert selected_rows(chunks.tables) == list(range(10, 25))
+        assert (chunks.num_rows, chunks.source_rows, chunks.num_rows_estimated) == (15, 15, False)
+
+    def test_empty_split(self, tmp_path):
+        # A streaming split of unknown size whose rows are counted; an empty Parquet file
+        # trips the datasets reader, a CSV header does not
+        (tmp_path / "train.csv").write_text("row\n")
+        chunks = load_arrow_chunks(str(tmp_path), "train[:10%]", chunk_size=8)
+        assert (chunks.num_rows, chunks.source_rows) == (0, 0)
+        assert list(chunks.tables) == []
+
+    def test_subsample_size_is_an_estimate(self, local_dataset):
+        chunks = load_arrow_chunks(local_dataset(1000), "train", chunk_size=64, streaming=False, sample_fraction=0.5)
+        assert (chunks.num_rows, chunks.num_rows_estimated) == (500, True)
+        assert len(selected_rows(chunks.tables)) == pytest.approx(500, abs=60)
+
+    def test_sample_size_is_exact(self, local_dataset):
+        chunks = load_arrow_chunks(local_dataset(1000), "train", chunk_size=64, sample_fraction=0.5, sample_size=20)
+        assert (chunks.num_rows, chunks.num_rows_estimated) == (20, False)
+        assert len(selected_rows(chunks.tables)) == 20
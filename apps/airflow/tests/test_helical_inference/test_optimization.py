@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+import torch
+
+from helical_inference import optimization
+from helical_inference.optimization import (
+    ACCURACY_CHECK_CELLS,
+    MIN_COSINE_SIMILARITY,
+    compare_embeddings,
+    export_cache_path,
+    optimize_model,
+)
+
+
+class TinyModel:
+    """The parts of a helical model that optimize_model uses: a torch module in
+    ``model`` and ``get_embeddings``"""
+
+    def __init__(self, seed=0):
+        torch.manual_seed(seed)
+        self.model = torch.nn.Sequential(torch.nn.Linear(32, 64), torch.nn.ReLU(), torch.nn.Linear(64, 16)).eval()
+
+    def get_embeddings(self, sample):
+        with torch.no_grad():
+            return self.model(sample).numpy()
+
+
+class Noise(torch.nn.Module):
+    def forward(self, x):
+        return torch.randn(len(x), 16)
+
+
+@pytest.fixture
+def sample():
+    return torch.randn(ACCURACY_CHECK_CELLS, 32, generator=torch.Generator().manual_seed(1))
+
+
+@pytest.fixture(autouse=True)
+def export_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(optimization, "EXPORT_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+class TestCompareEmbeddings:
+    def test_identical_embeddings(self):
+        embeddings = np.random.default_rng(0).normal(size=(10, 8))
+        report = compare_embeddings(embeddings, embeddings)
+        assert report.min_cosine_similarity == pytest.approx(1)
+        assert report.max_abs_error == 0
+        assert report.passed
+
+    def test_threshold(self):
+        reference = np.array([[1.0, 0.0]])
+        angle = np.arccos(MIN_COSINE_SIMILARITY) * 1.1
+        assert not compare_embeddings(reference, np.array([[np.cos(angle), np.sin(angle)]])).passed
+        angle = np.arccos(MIN_COSINE_SIMILARITY) * 0.9
+        assert compare_embeddings(reference, np.array([[np.cos(angle), np.sin(angle)]])).passed
+
+    def test_flattens_extra_axes(self):
+        embeddings = np.ones((4, 2, 3))
+        assert compare_embeddings(embeddings, embeddings).cells == 4
+
+    def test_rejects_different_shapes(self):
+        with pytest.raises(ValueError):
+            compare_embeddings(np.ones((4, 2)), np.ones((4, 3)))
+
+
+class TestOptimizeModel:
+    def test_fp32_eager_is_a_no_op(self, sample):
+        model = TinyModel()
+        module = model.model
+        summary = optimize_model(model, "geneformer", {}, "fp32", "eager", sample)
+        assert model.model is module
+        assert (summary["precision"], summary["runtime"]) == ("fp32", "eager")
+        assert "accuracy" not in summary
+
+    def test_int8_kept_when_close_to_fp32(self, sample):
+        model = TinyModel()
+        summary = optimize_model(model, "geneformer", {}, "int8", "eager", sample)
+        assert (summary["precision"], summary["runtime"]) == ("int8", "eager")
+        assert summary["accuracy"]["cells"] == ACCURACY_CHECK_CELLS
+        assert summary["accuracy"]["min_cosine_similarity"] >= MIN_COSINE_SIMILARITY
+        assert any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in model.model.modules())
+
+    def test_falls_back_to_fp32_when_embeddings_drift(self, sample, monkeypatch):
+        monkeypatch.setattr(optimization, "quantize_linear_int8", lambda module: Noise())
+        model = TinyModel()
+        module = model.model
+        summary = optimize_model(model, "geneformer", {}, "int8", "eager", sample)
+        assert model.model is module
+        assert (summary["precision"], summary["runtime"]) == ("fp32", "eager")
+        assert summary["accuracy"]["min_cosine_similarity"] < MIN_COSINE_SIMILARITY
+
+    def test_falls_back_to_fp32_when_optimisation_fails(self, sample, monkeypatch):
+        def fail(module):
+            raise RuntimeError("unsupported layer")
+
+        monkeypatch.setattr(optimization, "quantize_linear_int8", fail)
+        model = TinyModel()
+        module = model.model
+        summary = optimize_model(model, "geneformer", {}, "int8", "eager", sample)
+        assert model.model is module
+        assert summary["precision"] == "fp32"
+
+    def test_model_without_torch_module_stays_eager(self, sample):
+        model = TinyModel()
+        model.model = None
+        summary = optimize_model(model, "genept", {}, "int8", "torchscript", sample)
+        assert (summary["precision"], summary["runtime"]) == ("fp32", "eager")
+
+    def test_torchscript_only_for_traceable_models(self, sample):
+        model = TinyModel()
+        summary = optimize_model(model, "geneformer", {}, "fp32", "torchscript", sample)
+        assert summary["runtime"] == "eager"
+
+    def test_torchscript_graph_is_cached(self, sample, export_cache_dir):
+        model = TinyModel()
+        summary = optimize_model(model, "hyena_dna", {"batch_size": 4}, "fp32", "torchscript", sample)
+        assert summary["runtime"] == "torchscript"
+        assert isinstance(model.model, torch.jit.ScriptModule)
+        cached = list(export_cache_dir.glob("hyena_dna-fp32-*.pt"))
+        assert len(cached) == 1
+
+        second = TinyModel()
+        optimize_model(second, "hyena_dna", {"batch_size": 4}, "fp32", "torchscript", sample)
+        assert list(export_cache_dir.glob("*.pt")) == cached
+        np.testing.assert_allclose(second.get_embeddings(sample), model.get_embeddings(sample), rtol=1e-5)
+
+
+class TestExportCachePath:
+    def test_is_stable(self):
+        assert export_cache_path("hyena_dna", {"a": 1, "b": 2}, "fp32") == export_cache_path("hyena_dna", {"b": 2, "a": 1}, "fp32")
+
+    def test_changes_with_precision(self):
+        assert export_cache_path("hyena_dna", {}, "fp32") != export_cache_path("hyena_dna", {}, "int8")
+
+    def test_changes_with_parameters(self):
+        assert export_cache_path("hyena_dna", {"max_length": 1024}, "fp32") != export_cache_path("hyena_dna", {"max_length": 2048}, "fp32")
+
+    def test_changes_with_torch_version(self, monkeypatch):
+        before = export_cache_path("hyena_dna", {}, "fp32")
+        monkeypatch.setattr(torch, "__version__", "0.0.1")
+        assert export_cache_path("hyena_dna", {}, "fp32") != before
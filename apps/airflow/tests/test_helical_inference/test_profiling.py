@@ -0,0 +1,100 @@
+import json
+import pstats
+
+import pytest
+
+from helical_inference.profiling import RunProfiler
+
+
+def busy(n=2000):
+    return sum(i * i for i in range(n))
+
+
+def run_chunks(profiler, chunks, cells=8):
+    for _ in range(chunks):
+        with profiler.chunk(cells):
+            with profiler.stage("tokenization"):
+                busy()
+            with profiler.stage("model_forward"):
+                busy()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warm_up_torch_profiler():
+    # As in the task, torch is loaded before profiling starts: its first (lazy) setup
+    # under cProfile and tracemalloc takes seconds
+    try:
+        import torch.profiler
+    except ImportError:
+        return
+    with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU]):
+        pass
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    return tmp_path / "profile"
+
+
+def test_disabled_profiler_does_nothing(profile_dir):
+    profiler = RunProfiler(str(profile_dir))
+    assert not profiler.active
+    profiler.start()
+    run_chunks(profiler, 5)
+    profiler.finish()
+    assert not profile_dir.exists()
+
+
+def test_writes_artefacts_after_profiled_chunks(profile_dir):
+    profiler = RunProfiler(str(profile_dir), enabled=True, chunks=2)
+    profiler.start()
+    run_chunks(profiler, 1)
+    assert profiler.active
+    assert not profile_dir.exists()
+
+    run_chunks(profiler, 1)
+    assert not profiler.active
+    assert {"cprofile.pstats", "cprofile.txt", "memory.json"} <= {p.name for p in profile_dir.iterdir()}
+    assert pstats.Stats(str(profile_dir / "cprofile.pstats")).total_calls > 0
+    memory = json.loads((profile_dir / "memory.json").read_text())
+    assert [chunk["chunk"] for chunk in memory["chunks"]] == [0, 1]
+    assert all(chunk["cells"] == 8 and chunk["peak_traced_bytes"] >= 0 for chunk in memory["chunks"])
+    assert memory["top_allocations"]
+
+
+def test_stops_profiling_after_profiled_chunks(profile_dir):
+    profiler = RunProfiler(str(profile_dir), enabled=True, chunks=1)
+    profiler.start()
+    run_chunks(profiler, 1)
+    written = {p.name: p.stat().st_mtime_ns for p in profile_dir.iterdir()}
+    run_chunks(profiler, 3)
+    profiler.finish()
+    assert {p.name: p.stat().st_mtime_ns for p in profile_dir.iterdir()} == written
+    assert json.loads((profile_dir / "memory.json").read_text())["chunks"][0]["chunk"] == 0
+
+
+def test_finish_writes_profile_of_short_run(profile_dir):
+    profiler = RunProfiler(str(profile_dir), enabled=True, chunks=3)
+    profiler.start()
+    run_chunks(profiler, 1)
+    profiler.finish()
+    assert not profiler.active
+    assert len(json.loads((profile_dir / "memory.json").read_text())["chunks"]) == 1
+
+
+def test_torch_trace_labels_stages(profile_dir):
+    pytest.importorskip("torch")
+    profiler = RunProfiler(str(profile_dir), enabled=True, chunks=1)
+    profiler.start()
+    run_chunks(profiler, 1)
+    trace = (profile_dir / "torch_trace.json").read_text()
+    assert "tokenization" in trace and "model_forward" in trace
+    assert (profile_dir / "torch_ops.txt").exists()
+
+
+def test_publishes_artefacts(profile_dir):
+    published = []
+    profiler = RunProfiler(str(profile_dir), enabled=True, chunks=1, publish=published.append)
+    profiler.start()
+    run_chunks(profiler, 1)
+    assert published == sorted(str(p) for p in profile_dir.iterdir())
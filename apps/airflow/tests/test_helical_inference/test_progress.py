@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+from helical_inference.progress import ProgressReporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "progress.json"
+
+
+def read(path):
+    return json.loads(path.read_text())
+
+
+def test_stage_is_written_at_once(path, clock):
+    progress = ProgressReporter(str(path), min_interval_seconds=10, clock=clock)
+    progress.stage("loading_model")
+    written = read(path)
+    assert written["stage"] == "loading_model"
+    assert (written["cells_done"], written["cells_total"], written["eta_seconds"]) == (0, None, None)
+    assert not (path.parent / "progress.json.tmp").exists()
+
+
+def test_updates_are_throttled(path, clock):
+    progress = ProgressReporter(str(path), min_interval_seconds=10, clock=clock)
+    progress.start_embedding(1000)
+    clock.now += 1
+    progress.update(100, 800)
+    assert read(path)["cells_done"] == 0
+    clock.now += 9
+    progress.update(200, 1600)
+    assert read(path)["cells_done"] == 200
+    clock.now += 5
+    progress.update(300, 2400)
+    assert read(path)["cells_done"] == 200
+
+
+def test_first_update_is_written(path, clock):
+    progress = ProgressReporter(str(path), min_interval_seconds=10, clock=clock)
+    progress.update(100, 800)
+    assert read(path)["cells_done"] == 100
+
+
+def test_next_stage_flushes_throttled_updates(path, clock):
+    progress = ProgressReporter(str(path), min_interval_seconds=10, clock=clock)
+    progress.start_embedding(300)
+    clock.now += 1
+    progress.update(300, 2400)
+    assert read(path)["cells_done"] == 0
+    progress.stage("storing_results")
+    written = read(path)
+    assert (written["stage"], written["cells_done"], written["result_bytes"]) == ("storing_results", 300, 2400)
+
+
+def test_rate_and_eta_from_the_start_of_embedding(path, clock):
+    progress = ProgressReporter(str(path), min_interval_seconds=0, clock=clock)
+    progress.stage("loading_model")
+    # Model loading does not count against the rate
+    clock.now += 60
+    progress.start_embedding(1000)
+    clock.now += 10
+    progress.update(200, 1600)
+    written = read(path)
+    assert written["cells_per_second"] == pytest.approx(20)
+    assert written["eta_seconds"] == pytest.approx(40)
+    assert (written["cells_done"], written["cells_total"]) == (200, 1000)
+
+
+def test_no_eta_without_total(path, clock):
+    progress = ProgressReporter(str(path), min_interval_seconds=0, clock=clock)
+    progress.start_embedding(None)
+    clock.now += 10
+    progress.update(200, 1600)
+    written = read(path)
+    assert written["cells_per_second"] == pytest.approx(20)
+    assert (written["cells_total"], written["eta_seconds"]) == (None, None)
+
+
+def test_eta_is_never_negative(path, clock):
+    progress = ProgressReporter(str(path), min_interval_seconds=0, clock=clock)
+    progress.start_embedding(100)
+    clock.now += 10
+    progress.update(120, 960)
+    assert read(path)["eta_seconds"] == 0
+
+
+def test_estimated_total_is_replaced_by_the_true_count(path, clock):
+    progress = ProgressReporter(str(path), min_interval_seconds=10, clock=clock)
+    progress.start_embedding(500, estimated=True)
+    assert (read(path)["cells_total"], read(path)["cells_total_estimated"]) == (500, True)
+    clock.now += 1
+    progress.update(480, 3840)
+    progress.finish_embedding(480)
+    written = read(path)
+    assert (written["cells_done"], written["cells_total"], written["cells_total_estimated"]) == (480, 480, False)
+    assert written["eta_seconds"] == 0
+
+
+def test_exact_total_without_cells(path, clock):
+    progress = ProgressReporter(str(path), clock=clock)
+    progress.start_embedding(None, estimated=True)
+    assert read(path)["cells_total_estimated"] is False
+    progress.finish_embedding(0)
+    assert read(path)["cells_total"] == 0
+
+
+def test_published_with_result_rows(tmp_path):
+    published = []
+    path = tmp_path / "progress.json"
+    progress = ProgressReporter(str(path), min_interval_seconds=0, publish=published.append)
+    progress.start_embedding(100)
+    progress.update(10, 80, 8)
+    assert published == [str(path), str(path)]
+    written = read(path)
+    assert (written["cells_done"], written["result_bytes"], written["result_rows"]) == (10, 80, 8)
+
+    progress.update(20, 160)
+    assert read(path)["result_rows"] == 20
+
+
+def test_survives_failed_publish(tmp_path):
+    def fail(path):
+        raise ConnectionError("unreachable")
+
+    progress = ProgressReporter(str(tmp_path / "progress.json"), publish=fail)
+    progress.stage("loading_model")
+    assert read(tmp_path / "progress.json")["stage"] == "loading_model"
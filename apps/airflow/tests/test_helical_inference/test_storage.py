@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from helical_inference.storage import LocalResultStorage, S3ResultStorage
+
+
+class FakeS3Client:
+    """The calls S3ResultStorage makes to publish artefacts and partial results"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, path, bucket, key, **kwargs):
+        with open(path, "rb") as f:
+            self.objects[key] = f.read()
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = bytes(Body)
+
+    def get_paginator(self, operation_name):
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        yield {"Contents": [{"Key": key} for key in sorted(self.objects) if key.startswith(Prefix)]}
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+
+
+@pytest.fixture
+def client():
+    return FakeS3Client()
+
+
+@pytest.fixture
+def storage(client):
+    return S3ResultStorage("results", prefix="prod", chunk_bytes=8, client=client)
+
+
+def wait_for_parts(client, count, timeout_seconds=5):
+    deadline = time.monotonic() + timeout_seconds
+    while sum(".parts/" in key for key in client.objects) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_local_storage_publishes_whole_result(tmp_path):
+    assert LocalResultStorage().store_partial(str(tmp_path / "embeddings.csv"), "run-1/embeddings.csv", 10, 3) == (10, 3)
+
+
+def test_publishes_artefacts_under_prefix(storage, client, tmp_path):
+    (tmp_path / "summary.json").write_text("{}")
+    storage.publish(str(tmp_path / "summary.json"), "run-1/summary.json")
+    assert client.objects == {"prod/run-1/summary.json": b"{}"}
+
+
+def test_uploads_complete_rows_in_parts(storage, client, tmp_path):
+    result = tmp_path / "embeddings.csv"
+    key = "run-1/embeddings.csv"
+    result.write_bytes(b"0.1,0.2\n0.3,0.4\n0.5,")
+
+    # Less than a part: nothing to upload yet
+    assert storage.store_partial(str(result), key, 4, 1) == (0, 0)
+    assert storage.store_partial(str(result), key, 16, 2) == (0, 0)
+    wait_for_parts(client, 1)
+    assert client.objects["prod/run-1/embeddings.csv.parts/000000000000000"] == b"0.1,0.2\n0.3,0.4\n"
+    # Published bytes and rows advance once the upload is done
+    assert storage.store_partial(str(result), key, 16, 2) == (16, 2)
+
+    result.write_bytes(b"0.1,0.2\n0.3,0.4\n0.5,0.6\n0.7,0.8\n")
+    storage.store_partial(str(result), key, 32, 4)
+    wait_for_parts(client, 2)
+    assert client.objects["prod/run-1/embeddings.csv.parts/000000000000016"] == b"0.5,0.6\n0.7,0.8\n"
+    assert storage.store_partial(str(result), key, 32, 4) == (32, 4)
+
+    storage.remove_partial(key)
+    assert client.objects == {}
+
+
+def test_failed_part_upload_is_retried(storage, client, tmp_path):
+    result = str(tmp_path / "embeddings.csv")
+    (tmp_path / "embeddings.csv").write_bytes(b"0.1,0.2\n0.3,0.4\n")
+    attempts = []
+    put_object = client.put_object
+
+    def fail(**kwargs):
+        attempts.append(kwargs["Key"])
+        raise ConnectionError("reset")
+
+    client.put_object = fail
+    deadline = time.monotonic() + 5
+    while len(attempts) < 2:
+        assert storage.store_partial(result, "run-1/embeddings.csv", 16, 2) == (0, 0)
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    client.put_object = put_object
+    while storage.store_partial(result, "run-1/embeddings.csv", 16, 2) != (16, 2):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert set(attempts) == {"prod/run-1/embeddings.csv.parts/000000000000000"}
+
@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pytest
+
+from helical_inference.summary import EmbeddingSummary, Moments
+
+
+def merged(chunks):
+    moments = Moments(chunks[0].shape[1])
+    for chunk in chunks:
+        moments.merge(Moments.of(chunk))
+    return moments.to_dict()
+
+
+def split(values, sizes):
+    return np.split(values, np.cumsum(sizes)[:-1])
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).normal(loc=1e3, scale=5, size=(100, 4))
+
+
+class TestMoments:
+    @pytest.mark.parametrize("sizes", [[100], [1] * 100, [50, 50], [1, 98, 1], [37, 1, 1, 61], [0, 60, 0, 40]])
+    def test_merged_chunks_match_numpy(self, values, sizes):
+        moments = merged(split(values, sizes))
+        assert moments["count"] == [100] * 4
+        np.testing.assert_allclose(moments["mean"], values.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(moments["variance"], values.var(axis=0), rtol=1e-9)
+        np.testing.assert_array_equal(moments["min"], values.min(axis=0))
+        np.testing.assert_array_equal(moments["max"], values.max(axis=0))
+
+    def test_zero_variance_chunks(self, values):
+        constant = np.full((10, 4), 7.0)
+        chunks = [constant, values[:30], constant[:1], values[30:]]
+        data = np.concatenate(chunks)
+        moments = merged(chunks)
+        np.testing.assert_allclose(moments["mean"], data.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(moments["variance"], data.var(axis=0), rtol=1e-9)
+
+    def test_constant_data_has_zero_variance(self):
+        moments = merged([np.full((1, 3), 2.5), np.full((5, 3), 2.5), np.full((1, 3), 2.5)])
+        assert moments["mean"] == [2.5] * 3
+        assert moments["variance"] == [0.0] * 3
+
+    def test_merge_is_order_independent(self, values):
+        chunks = split(values, [10, 1, 89])
+        forward, backward = merged(chunks), merged(chunks[::-1])
+        np.testing.assert_allclose(forward["mean"], backward["mean"], rtol=1e-12)
+        np.testing.assert_allclose(forward["variance"], backward["variance"], rtol=1e-9)
+
+    def test_ignores_nans(self, values):
+        values = values.copy()
+        values[::3, 0] = np.nan
+        values[:, 1] = np.nan
+        moments = merged(split(values, [1, 49, 50]))
+        assert moments["count"] == [66, 0, 100, 100]
+        np.testing.assert_allclose(moments["mean"][0], np.nanmean(values[:, 0]), rtol=1e-12)
+        np.testing.assert_allclose(moments["variance"][0], np.nanvar(values[:, 0]), rtol=1e-9)
+        assert moments["mean"][1] is None and moments["variance"][1] is None
+
+    def test_empty(self):
+        assert Moments(2).to_dict() == {key: [None, None] for key in ("mean", "variance", "min", "max")} | {"count": [0, 0]}
+
+
+class TestEmbeddingSummary:
+    def test_chunked_summary(self, values, tmp_path):
+        values = values.copy()
+        values[5, 2] = np.nan
+        summary = EmbeddingSummary()
+        for chunk in split(values, [1, 40, 59]):
+            summary.update(chunk)
+        summary.write(str(tmp_path / "summary.json"))
+        result = json.loads((tmp_path / "summary.json").read_text())
+
+        assert (result["rows"], result["dims"], result["nan_count"], result["rows_with_nan"]) == (100, 4, 1, 1)
+        assert result["dimensions"]["nan_count"] == [0, 0, 1, 0]
+        norms = np.linalg.norm(np.delete(values, 5, axis=0), axis=1)
+        assert result["norm"]["count"] == 99
+        assert result["norm"]["mean"] == pytest.approx(norms.mean(), rel=1e-12)
+        assert result["norm"]["variance"] == pytest.approx(norms.var(), rel=1e-9)
+
+    def test_flattens_extra_axes(self):
+        summary = EmbeddingSummary()
+        summary.update(np.ones((3, 2, 2)))
+        assert summary.to_dict()["dims"] == 4
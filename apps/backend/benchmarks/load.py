@@ -0,0 +1,525 @@
+"""Load test of the backend against a fake Airflow serving thousands of runs.
+
+Everything runs on the loopback interface in separate processes: the fake Airflow
+REST API, the backend under uvicorn, and the clients driving list, status and
+results traffic. No docker, no network. The harness is not part of the installed
+package; run it from ``apps/backend`` with ``python -m benchmarks.load``.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from pydantic import BaseModel
+
+from helical_workbench_backend.services.batch_inference_processor import (
+    INFERENCE_DAG_ID,
+)
+
+APP = "helical_workbench_backend.main:app"
+
+# Directory containing the ``benchmarks`` package, for the fake Airflow process
+BENCHMARKS_ROOT = Path(__file__).resolve().parent.parent
+
+# Fraction of each request type in the traffic mix
+DEFAULT_MIX = {"list": 0.2, "status": 0.6, "results": 0.2}
+
+# Airflow's default page size for list endpoints
+AIRFLOW_PAGE_SIZE = 50
+
+# Share of the fake runs in each Airflow state; the rest succeeded
+RUN_STATES = {"running": 0.05, "failed": 0.03, "queued": 0.02}
+
+_BLOCK_ROWS = 1024
+
+
+def write_csv(path: Path, rows: int, dims: int, seed: int = 0) -> None:
+    """Embeddings CSV of ``rows`` x ``dims`` random values. A block of rows is
+    formatted once and written repeatedly, so that generating 1M rows is bound by
+    the disk rather than by float formatting."""
+    rng = random.Random(seed)
+    line = ",".join(["{:.6f}"] * dims) + "\n"
+    block = [
+        line.format(*(rng.gauss(0, 1) for _ in range(dims))).encode()
+        for _ in range(min(rows, _BLOCK_ROWS))
+    ]
+    whole_block = b"".join(block)
+    with open(path, "wb") as f:
+        for _ in range(rows // _BLOCK_ROWS):
+            f.write(whole_block)
+        f.write(b"".join(block[: rows % _BLOCK_ROWS]))
+
+
+# Writers of the result formats the inference DAG produces
+RESULT_FORMATS: dict[str, Callable[[Path, int, int], None]] = {"csv": write_csv}
+
+
+@dataclass(frozen=True)
+class FakeRun:
+    dag_run_id: str
+    state: str
+    started_at: datetime
+
+
+def generate_results(
+    results_dir: Path, runs: int, rows: int, dims: int, seed: int = 0
+) -> list[FakeRun]:
+    """Run directories for ``runs`` fake runs under ``results_dir``.
+
+    One result file per format is generated (or reused, if one of the right size is
+    already there) and hard-linked into the directory of every succeeded run, so
+    thousands of runs with 1M x 512 results take the disk space of one.
+    """
+    results_dir.mkdir(parents=True, exist_ok=True)
+    sources = {}
+    for fmt, write in RESULT_FORMATS.items():
+        source = results_dir / f"synthetic-{rows}x{dims}.{fmt}"
+        marker = source.with_suffix(".done")
+        if not marker.exists():
+            write(source, rows, dims)
+            marker.touch()
+        sources[fmt] = source
+
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    fake_runs = []
+    formats = sorted(sources)
+    for i in range(runs):
+        draw, state = rng.random(), "success"
+        for candidate, share in RUN_STATES.items():
+            if draw < share:
+                state = candidate
+                break
+            draw -= share
+        run = FakeRun(f"load__{i:06d}", state, started + timedelta(minutes=i))
+        fake_runs.append(run)
+        if state != "success":
+            continue
+        run_dir = results_dir / run.dag_run_id
+        run_dir.mkdir(exist_ok=True)
+        source = sources[formats[i % len(formats)]]
+        result = run_dir / "embeddings.csv"
+        if not result.exists():
+            os.link(source, result)
+        (run_dir / "metrics.json").write_text(
+            json.dumps(
+                {
+                    "model": "geneformer",
+                    "data_path": "synthetic",
+                    "n_cells": rows,
+                    "n_genes": 30000,
+                    "peak_memory_bytes": 4 * 1024**3,
+                    "runtime_seconds": 600.0,
+                    "result": {
+                        "path": f"{run.dag_run_id}/embeddings.csv",
+                        "format": source.suffix.lstrip("."),
+                        "rows": rows,
+                        "dims": dims,
+                    },
+                }
+            )
+        )
+    return fake_runs
+
+
+def _dag_run_json(run: FakeRun) -> dict[str, Any]:
+    started_at = run.started_at.isoformat()
+    finished = run.state in ("success", "failed")
+    return {
+        "dag_run_id": run.dag_run_id,
+        "dag_id": INFERENCE_DAG_ID,
+        "dag_display_name": INFERENCE_DAG_ID,
+        "dag_versions": [],
+        "run_after": started_at,
+        "run_type": "manual",
+        "state": run.state,
+        "logical_date": started_at,
+        "queued_at": started_at,
+        "start_date": None if run.state == "queued" else started_at,
+        "end_date": (run.started_at + timedelta(minutes=10)).isoformat()
+        if finished
+        else None,
+        "note": "synthetic failure" if run.state == "failed" else None,
+        "triggered_by": "rest_api",
+        "conf": {
+            "data_path": "synthetic",
+            "model": "geneformer",
+            "results_path": f"{run.dag_run_id}/embeddings.csv",
+            "model_class": "medium",
+        },
+    }
+
+
+class _FakeAirflowServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], runs: list[FakeRun]):
+        super().__init__(address, _FakeAirflowHandler)
+        # Serialised once: the fake must not be the bottleneck
+        self.runs = {run.dag_run_id: json.dumps(_dag_run_json(run)) for run in runs}
+        newest_first = sorted(runs, key=lambda run: run.started_at, reverse=True)
+        self.by_state: dict[str | None, list[str]] = defaultdict(list)
+        for run in newest_first:
+            self.by_state[None].append(run.dag_run_id)
+            self.by_state[run.state].append(run.dag_run_id)
+
+
+class _FakeAirflowHandler(BaseHTTPRequestHandler):
+    """The endpoints of the Airflow REST API the backend calls"""
+
+    protocol_version = "HTTP/1.1"
+    server: _FakeAirflowServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: str) -> None:
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path == "/auth/token":
+            self._send(201, '{"access_token": "load-test"}')
+        else:
+            self._send(404, '{"detail": "Not Found"}')
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        prefix = f"/api/v2/dags/{INFERENCE_DAG_ID}/dagRuns"
+        if url.path == prefix:
+            query = parse_qs(url.query)
+            states: list[str | None] = [*query.get("state", [])] or [None]
+            limit = int(query.get("limit", [str(AIRFLOW_PAGE_SIZE)])[0])
+            offset = int(query.get("offset", ["0"])[0])
+            ids = [i for state in states for i in self.server.by_state.get(state, [])]
+            page = ",".join(self.server.runs[i] for i in ids[offset : offset + limit])
+            self._send(200, f'{{"dag_runs": [{page}], "total_entries": {len(ids)}}}')
+        elif url.path.startswith(prefix + "/"):
+            run = self.server.runs.get(url.path[len(prefix) + 1 :])
+            if run is None:
+                self._send(404, '{"detail": "DagRun not found"}')
+            else:
+                self._send(200, run)
+        else:
+            self._send(404, '{"detail": "Not Found"}')
+
+
+def serve_fake_airflow(port: int, runs_path: str) -> None:
+    """Serves the runs saved in ``runs_path`` by ``_save_runs`` until terminated"""
+    with open(runs_path) as f:
+        runs = [
+            FakeRun(run["dag_run_id"], run["state"], datetime.fromisoformat(run["at"]))
+            for run in json.load(f)
+        ]
+    _FakeAirflowServer(("127.0.0.1", port), runs).serve_forever()
+
+
+def _save_runs(runs: list[FakeRun], path: Path) -> None:
+    path.write_text(
+        json.dumps(
+            [
+                {
+                    "dag_run_id": r.dag_run_id,
+                    "state": r.state,
+                    "at": r.started_at.isoformat(),
+                }
+                for r in runs
+            ]
+        )
+    )
+
+
+_SERVE_FAKE_AIRFLOW = (
+    "from benchmarks.load import serve_fake_airflow; "
+    "serve_fake_airflow({port}, {runs_path!r})"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+def _wait_until_up(url: str, timeout_seconds: float) -> None:
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def _rss_bytes(pid: int, field_name: str) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        line = next(line for line in status if line.startswith(f"{field_name}:"))
+    return int(line.split()[1]) * 1024
+
+
+class EndpointReport(BaseModel):
+    requests: int
+    errors: int
+    requests_per_second: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    bytes_served: int
+
+
+class LoadTestReport(BaseModel):
+    runs: int
+    result_rows: int
+    result_dims: int
+    result_bytes: int
+    clients: int
+    duration_seconds: float
+    requests_per_second: float
+    bytes_per_second: float
+    backend_peak_rss_bytes: int
+    backend_final_rss_bytes: int
+    endpoints: dict[str, EndpointReport]
+
+
+@dataclass
+class _Samples:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    bytes_served: int = 0
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def _client(
+    base_url: str,
+    runs: list[FakeRun],
+    mix: dict[str, float],
+    deadline: float,
+    seed: int,
+    samples: dict[str, _Samples],
+    lock: threading.Lock,
+) -> None:
+    rng = random.Random(seed)
+    succeeded = [run.dag_run_id for run in runs if run.state == "success"]
+    operations, weights = zip(*mix.items())
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        if operation == "list":
+            url = f"{base_url}/inference_job_runs"
+        elif operation == "status":
+            url = f"{base_url}/inference_job_runs/{rng.choice(runs).dag_run_id}"
+        else:
+            url = f"{base_url}/inference_job_runs/{rng.choice(succeeded)}/results"
+        started = time.perf_counter()
+        received, ok = 0, False
+        try:
+            with session.get(url, stream=True, timeout=60) as response:
+                for chunk in response.iter_content(1 << 20):
+                    received += len(chunk)
+                ok = response.ok
+        except requests.RequestException:
+            pass
+        elapsed = time.perf_counter() - started
+        with lock:
+            sample = samples[operation]
+            sample.latencies.append(elapsed)
+            sample.bytes_served += received
+            sample.errors += not ok
+
+
+def run_load_test(
+    work_dir: Path,
+    runs: int = 5000,
+    rows: int = 1_000_000,
+    dims: int = 512,
+    clients: int = 32,
+    duration_seconds: float = 30,
+    mix: dict[str, float] | None = None,
+    backend_env: dict[str, str] | None = None,
+    seed: int = 0,
+) -> LoadTestReport:
+    """Sets up results, fake Airflow and backend in ``work_dir``, runs the load and
+    tears the processes down. ``backend_env`` is passed on to the backend (e.g.
+    retention settings)."""
+    mix = mix or DEFAULT_MIX
+    results_dir = work_dir / "results"
+    fake_runs = generate_results(results_dir, runs, rows, dims, seed=seed)
+    if not any(run.state == "success" for run in fake_runs):
+        mix = {op: share for op, share in mix.items() if op != "results"}
+
+    airflow_port, backend_port = _free_port(), _free_port()
+    runs_path = work_dir / "runs.json"
+    _save_runs(fake_runs, runs_path)
+    airflow = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            _SERVE_FAKE_AIRFLOW.format(port=airflow_port, runs_path=str(runs_path)),
+        ],
+        cwd=BENCHMARKS_ROOT,
+    )
+    env = {
+        **os.environ,
+        "AIRFLOW_HOST": f"http://127.0.0.1:{airflow_port}",
+        "RESULTS_DIR": str(results_dir),
+        **(backend_env or {}),
+    }
+    backend = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            APP,
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(backend_port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{backend_port}"
+    try:
+        _wait_until_up(f"http://127.0.0.1:{airflow_port}/auth/token", 30)
+        _wait_until_up(f"{base_url}/ping", 30)
+        # Warm up: the first request imports the Airflow client
+        requests.get(f"{base_url}/inference_job_runs", timeout=60)
+
+        samples: dict[str, _Samples] = defaultdict(_Samples)
+        lock = threading.Lock()
+        started = time.monotonic()
+        deadline = started + duration_seconds
+        threads = [
+            threading.Thread(
+                target=_client,
+                args=(base_url, fake_runs, mix, deadline, seed + i, samples, lock),
+            )
+            for i in range(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        peak_rss = _rss_bytes(backend.pid, "VmHWM")
+        final_rss = _rss_bytes(backend.pid, "VmRSS")
+    finally:
+        for process in (backend, airflow):
+            process.terminate()
+            process.wait(timeout=30)
+
+    endpoints = {}
+    for operation, sample in sorted(samples.items()):
+        latencies = sorted(sample.latencies)
+        endpoints[operation] = EndpointReport(
+            requests=len(latencies),
+            errors=sample.errors,
+            requests_per_second=len(latencies) / elapsed,
+            p50_ms=_percentile(latencies, 0.50) * 1000,
+            p90_ms=_percentile(latencies, 0.90) * 1000,
+            p99_ms=_percentile(latencies, 0.99) * 1000,
+            max_ms=(latencies[-1] if latencies else 0.0) * 1000,
+            bytes_served=sample.bytes_served,
+        )
+    total_bytes = sum(e.bytes_served for e in endpoints.values())
+    return LoadTestReport(
+        runs=runs,
+        result_rows=rows,
+        result_dims=dims,
+        result_bytes=next(iter(results_dir.glob("synthetic-*.csv"))).stat().st_size,
+        clients=clients,
+        duration_seconds=elapsed,
+        requests_per_second=sum(e.requests for e in endpoints.values()) / elapsed,
+        bytes_per_second=total_bytes / elapsed,
+        backend_peak_rss_bytes=peak_rss,
+        backend_final_rss_bytes=final_rss,
+        endpoints=endpoints,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load test the backend on a fake Airflow"
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        help="keeps the generated results between runs (default: a temporary dir)",
+    )
+    parser.add_argument("--runs", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dims", type=int, default=512)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_load_test(
+            args.work_dir or Path(tmp),
+            runs=args.runs,
+            rows=args.rows,
+            dims=args.dims,
+            clients=args.clients,
+            duration_seconds=args.duration,
+        )
+
+    if args.json:
+        print(report.model_dump_json(indent=2))
+    else:
+        print(
+            f"{report.runs} runs, "
+            f"results of {report.result_rows} x {report.result_dims} "
+            f"({report.result_bytes / 1024**2:.0f} MiB), {report.clients} clients "
+            f"for {report.duration_seconds:.1f}s"
+        )
+        print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>9}", end="")
+        print(f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'MiB':>9}")
+        for name, e in report.endpoints.items():
+            print(
+                f"{name:<10}{e.requests:>10}{e.errors:>8}{e.requests_per_second:>9.1f}"
+                f"{e.p50_ms:>9.1f}{e.p90_ms:>9.1f}{e.p99_ms:>9.1f}{e.max_ms:>9.1f}"
+                f"{e.bytes_served / 1024**2:>9.1f}"
+            )
+        print(
+            f"total: {report.requests_per_second:.1f} req/s, "
+            f"{report.bytes_per_second / 1024**2:.1f} MiB/s served"
+        )
+        print(
+            f"backend RSS: peak {report.backend_peak_rss_bytes / 1024**2:.1f} MiB, "
+            f"final {report.backend_final_rss_bytes / 1024**2:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
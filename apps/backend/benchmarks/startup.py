@@ -0,0 +1,147 @@
+"""Cold start of the backend: import time, time to run the app's startup (its
+lifespan, up to serving requests), peak RSS and eagerly imported heavy modules,
+each measured in a fresh interpreter against a results directory holding past runs.
+Not part of the installed package; run it from ``apps/backend`` with
+``python -m benchmarks.startup``.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from pydantic import BaseModel
+
+APP_MODULE = "helical_workbench_backend.main"
+
+# Heavy packages the app must not import until a request needs them
+DEFERRED_MODULES = ("airflow_client",)
+
+# Cold start budget for importing the app, asserted by the test suite
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+MAX_RSS_BUDGET_BYTES = 64 * 1024**2
+# Startup must not grow with the number of past runs in the results directory
+LIFESPAN_BUDGET_SECONDS = 0.5
+PAST_RUNS = 2000
+
+# Peak RSS comes from VmHWM: unlike ru_maxrss, Linux resets it on exec, so it does
+# not include the RSS of the process that launched the probe.
+_PROBE = """
+import asyncio, json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+
+async def startup(app):
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        return time.perf_counter() - started
+
+app = getattr(sys.modules["{module}"], "app", None)
+lifespan_elapsed = asyncio.run(startup(app)) if app is not None else None
+try:
+    with open("/proc/self/status") as status:
+        hwm = next(line for line in status if line.startswith("VmHWM:"))
+    max_rss_kib = int(hwm.split()[1])
+except (OSError, StopIteration):
+    max_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "import_seconds": elapsed,
+    "lifespan_seconds": lifespan_elapsed,
+    "max_rss_bytes": max_rss_kib * 1024,
+    "modules": sorted({{name.split(".")[0] for name in sys.modules}}),
+}}))
+"""
+
+
+class StartupMeasurement(BaseModel):
+    import_seconds: float
+    # None if the module has no ``app``
+    lifespan_seconds: float | None
+    max_rss_bytes: int
+    eagerly_imported: list[str]
+
+
+def seed_past_runs(results_dir: Path, runs: int) -> None:
+    """``metrics.json`` of ``runs`` finished runs, as the inference DAG writes them"""
+    for i in range(runs):
+        run_dir = results_dir / f"past__{i:06d}"
+        run_dir.mkdir(parents=True, exist_ok=True)
+        (run_dir / "metrics.json").write_text(
+            json.dumps(
+                {
+                    "model": "geneformer",
+                    "data_path": f"s3://datasets/{i % 50}",
+                    "n_cells": 1000 + i,
+                    "n_genes": 2000,
+                    "peak_memory_bytes": 2 * 1024**3 + i * 1024**2,
+                    "runtime_seconds": 60 + i,
+                }
+            )
+        )
+
+
+def measure_startup(
+    module: str = APP_MODULE, runs: int = 3, past_runs: int = PAST_RUNS
+) -> StartupMeasurement:
+    """Import ``module`` and run the startup of its app in ``runs`` fresh
+    interpreters, with ``past_runs`` finished runs in the results directory; reports
+    the median times and the largest peak RSS"""
+    samples = []
+    with tempfile.TemporaryDirectory() as results_dir:
+        seed_past_runs(Path(results_dir), past_runs)
+        env = {**os.environ, "RESULTS_DIR": results_dir, "RESULTS_STORAGE": "local"}
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", _PROBE.format(module=module)],
+                capture_output=True,
+                check=True,
+                text=True,
+                env=env,
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+    loaded = set(samples[0]["modules"])
+    lifespans = [s["lifespan_seconds"] for s in samples]
+    return StartupMeasurement(
+        import_seconds=statistics.median(s["import_seconds"] for s in samples),
+        lifespan_seconds=None if None in lifespans else statistics.median(lifespans),
+        max_rss_bytes=max(s["max_rss_bytes"] for s in samples),
+        eagerly_imported=[name for name in DEFERRED_MODULES if name in loaded],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure backend cold start")
+    parser.add_argument("--module", default=APP_MODULE)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--past-runs",
+        type=int,
+        default=PAST_RUNS,
+        help="Finished runs in the results directory",
+    )
+    args = parser.parse_args()
+
+    measurement = measure_startup(args.module, runs=args.runs, past_runs=args.past_runs)
+    print(
+        f"import time: {measurement.import_seconds:.3f}s "
+        f"(budget {IMPORT_TIME_BUDGET_SECONDS}s)"
+    )
+    if measurement.lifespan_seconds is not None:
+        print(
+            f"startup:     {measurement.lifespan_seconds:.3f}s "
+            f"(budget {LIFESPAN_BUDGET_SECONDS}s)"
+        )
+    print(
+        f"peak RSS:    {measurement.max_rss_bytes / 1024**2:.1f} MiB "
+        f"(budget {MAX_RSS_BUDGET_BYTES / 1024**2:.0f} MiB)"
+    )
+    print(f"eagerly imported heavy modules: {measurement.eagerly_imported or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
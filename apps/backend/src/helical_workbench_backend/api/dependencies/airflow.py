@@ -1,18 +1,132 @@
+import logging
+from functools import lru_cache
+from typing import Any
+
 from fastapi import Depends
 
 from helical_workbench_backend.clients.airflow_authenticated_client import (
+    AirflowApiConfig,
     AuthnAirflowClient,
 )
+from helical_workbench_backend.clients.dag_run_client import DagRunClient
+from helical_workbench_backend.services.admission_controller import (
+    AdmissionControlConfig,
+    AdmissionController,
+)
 from helical_workbench_backend.services.batch_inference_processor import (
     BatchInferenceProcessor,
+    BatchInferenceProcessorConfig,
+)
+from helical_workbench_backend.services.cost_model import CostModel, load_run_metrics
+from helical_workbench_backend.services.result_storage import (
+    ResultStorage,
+    ResultStorageConfig,
+    make_result_storage,
+)
+from helical_workbench_backend.services.results_catalogue import (
+    ResultsCatalogue,
+    ResultsRetentionConfig,
 )
 
+logger = logging.getLogger(__name__)
+
+
+# Settings are parsed from the environment once per process (at app startup, see
+# main.lifespan) instead of on every request.
+@lru_cache
+def get_airflow_api_config() -> AirflowApiConfig:
+    return AirflowApiConfig()
+
+
+@lru_cache
+def get_batch_processor_config() -> BatchInferenceProcessorConfig:
+    return BatchInferenceProcessorConfig()
+
+
+@lru_cache
+def get_admission_control_config() -> AdmissionControlConfig:
+    return AdmissionControlConfig()
+
+
+@lru_cache
+def get_results_retention_config() -> ResultsRetentionConfig:
+    return ResultsRetentionConfig()
+
+
+@lru_cache
+def get_result_storage_config() -> ResultStorageConfig:
+    return ResultStorageConfig()
+
+
+# Shared so that the S3 client and its connection pool are created once
+@lru_cache
+def get_result_storage() -> ResultStorage:
+    return make_result_storage(
+        get_result_storage_config(), get_batch_processor_config().results_dir
+    )
+
+
+# Starts with the uncalibrated priors: reading the metrics of every past run is left
+# to calibrate_admission_controller, run in the background (see main.lifespan), then
+# the cost model is recalibrated on the runs the results catalogue finds as they
+# finish
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+    return AdmissionController(CostModel(), config=get_admission_control_config())
+
+
+def calibrate_admission_controller() -> None:
+    try:
+        history = load_run_metrics(get_result_storage())
+    except Exception:
+        logger.exception("Could not read past runs, the cost model keeps its priors")
+        return
+    get_admission_controller().calibrate(history)
+
+
+def _record_finished_runs(metrics: list[dict[str, Any]]) -> None:
+    get_admission_controller().record_runs(metrics)
+
+
+# One catalogue per process: lookups are served from its in-memory index, which the
+# background garbage collection pass (see main.lifespan) keeps in sync with the
+# storage
+@lru_cache
+def get_results_catalogue() -> ResultsCatalogue:
+    return ResultsCatalogue(
+        get_result_storage(),
+        config=get_results_retention_config(),
+        on_new_runs=_record_finished_runs,
+    )
+
+
+# Shared by all requests so that concurrent reads are coalesced and the circuit
+# breaker and stale cache see every call
+@lru_cache
+def get_dag_run_client() -> DagRunClient:
+    config = get_airflow_api_config()
+    return DagRunClient(AuthnAirflowClient(airflow_api_config=config), config=config)
+
 
-def get_airflow_client() -> AuthnAirflowClient:
-    return AuthnAirflowClient()
+def get_airflow_client(
+    airflow_api_config: AirflowApiConfig = Depends(get_airflow_api_config),
+) -> AuthnAirflowClient:
+    return AuthnAirflowClient(airflow_api_config=airflow_api_config)
 
 
 def get_batch_processor(
     airflow_client: AuthnAirflowClient = Depends(get_airflow_client),
+    config: BatchInferenceProcessorConfig = Depends(get_batch_processor_config),
+    admission_controller: AdmissionController = Depends(get_admission_controller),
+    dag_run_client: DagRunClient = Depends(get_dag_run_client),
+    results_catalogue: ResultsCatalogue = Depends(get_results_catalogue),
+    result_storage: ResultStorage = Depends(get_result_storage),
 ) -> BatchInferenceProcessor:
-    return BatchInferenceProcessor(airflow_client=airflow_client)
+    return BatchInferenceProcessor(
+        airflow_client=airflow_client,
+        config=config,
+        admission_controller=admission_controller,
+        dag_run_client=dag_run_client,
+        results_catalogue=results_catalogue,
+        result_storage=result_storage,
+    )
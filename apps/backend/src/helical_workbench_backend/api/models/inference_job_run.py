@@ -1,8 +1,8 @@
 import datetime
 from enum import Enum
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 
 class Model(str, Enum):
@@ -17,11 +17,33 @@ class Model(str, Enum):
     UCE = "uce"
 
 
+class InferencePrecision(str, Enum):
+    FP32 = "fp32"
+    INT8 = "int8"
+
+
+class InferenceRuntime(str, Enum):
+    EAGER = "eager"
+    TORCHSCRIPT = "torchscript"
+
+
 class JobRunStatus(str, Enum):
     PENDING = "pending"
     RUNNING = "running"
     SUCCEEDED = "succeeded"
     FAILED = "failed"
+    # Succeeded, but its results were evicted by the retention policy
+    EXPIRED = "expired"
+
+
+class ExecutionProfile(BaseModel):
+    """CPU threads and cores of a run; unset values default to the run's share of
+    the worker's cores"""
+
+    intra_op_threads: Optional[int] = Field(default=None, ge=1)
+    inter_op_threads: Optional[int] = Field(default=None, ge=1)
+    blas_threads: Optional[int] = Field(default=None, ge=1)
+    cpu_affinity: Literal["auto", "none"] | list[int] = "auto"
 
 
 class InferenceJobRunInputs(BaseModel):
@@ -29,6 +51,29 @@ class InferenceJobRunInputs(BaseModel):
     model: Model
     results_path: str | None = None
     parameters: dict[str, Any] = {}
+    split: str = "train[:10%]"
+    streaming: bool = True
+    sample_fraction: float | None = Field(default=None, gt=0, le=1)
+    seed: int = 0
+    # Keeps the cells whose value of each obs column is one of the listed values
+    obs_filter: Optional[dict[str, list[str | int | float | bool]]] = None
+    # Number of cells embedded, sampled (with seed) from those selected above
+    sample_size: Optional[int] = Field(default=None, ge=1)
+    # obs column the sample is stratified by, in proportion to its values
+    stratify_by: Optional[str] = None
+    # Genes kept in the expression matrix the model sees
+    genes: Optional[list[str]] = Field(default=None, min_length=1)
+    execution_profile: Optional[ExecutionProfile] = None
+    inference_precision: InferencePrecision = InferencePrecision.FP32
+    runtime: InferenceRuntime = InferenceRuntime.EAGER
+    # Profile model loading and the first chunks (see GET /{id}/profile)
+    profile: bool = False
+
+    @model_validator(mode="after")
+    def _stratify_needs_sample_size(self) -> "InferenceJobRunInputs":
+        if self.stratify_by is not None and self.sample_size is None:
+            raise ValueError("stratify_by requires sample_size")
+        return self
 
 
 class InferenceJobRunCreate(BaseModel):
@@ -37,6 +82,56 @@ class InferenceJobRunCreate(BaseModel):
     inputs: InferenceJobRunInputs
 
 
+class JobRunProgress(BaseModel):
+    """Progress the inference task publishes after each chunk of cells"""
+
+    stage: str
+    cells_done: int
+    cells_total: Optional[int] = None
+    # Set while cells_total is the expected size of a sample_fraction subsample
+    cells_total_estimated: bool = False
+    cells_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    updated_at: datetime.datetime
+    # Length of the complete rows published so far, served as partial results, and
+    # their number; it lags cells_done when the result is uploaded in parts
+    result_bytes: int = Field(default=0, exclude=True)
+    result_rows: Optional[int] = Field(default=None, exclude=True)
+
+
+class SummaryStats(BaseModel):
+    count: int
+    # None when there are no values (count is 0)
+    mean: Optional[float] = None
+    # Population variance
+    variance: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+class DimensionStats(BaseModel):
+    """Statistics of each embedding dimension, NaNs excluded; one entry per dimension"""
+
+    count: list[int]
+    mean: list[Optional[float]]
+    variance: list[Optional[float]]
+    min: list[Optional[float]]
+    max: list[Optional[float]]
+    nan_count: list[int]
+
+
+class EmbeddingSummary(BaseModel):
+    """Summary statistics of a run's embeddings"""
+
+    rows: int
+    dims: int
+    nan_count: int
+    rows_with_nan: int
+    # L2 norms of the rows without NaNs
+    norm: SummaryStats
+    dimensions: DimensionStats
+
+
 class InferenceJobRun(BaseModel):
     """Response schema (also the domain entity)"""
 
@@ -47,3 +142,8 @@ class InferenceJobRun(BaseModel):
     finished_at: Optional[datetime.datetime] = None
     result_path: Optional[str] = None
     error: Optional[str] = None
+    queued_reason: Optional[str] = None
+    progress: Optional[JobRunProgress] = None
+    # Set when Airflow was unreachable and this is the last state read from it;
+    # returned as the X-Airflow-Stale-Since header rather than in the body
+    stale_since: Optional[datetime.datetime] = Field(default=None, exclude=True)
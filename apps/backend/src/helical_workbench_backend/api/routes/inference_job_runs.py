@@ -1,29 +1,51 @@
 import os
 from typing import Optional
 
-from fastapi import APIRouter, Depends
-from starlette.responses import FileResponse
+from fastapi import APIRouter, Depends, Response
+from starlette.responses import (
+    FileResponse,
+    JSONResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 
 from helical_workbench_backend.api.dependencies.airflow import get_batch_processor
 from helical_workbench_backend.api.models.inference_job_run import (
+    EmbeddingSummary,
     InferenceJobRun,
     InferenceJobRunCreate,
 )
 from helical_workbench_backend.services.batch_inference_processor import (
     BatchInferenceProcessor,
 )
+from helical_workbench_backend.services.result_storage import ResultDownload
 
 RESULTS_DIR = os.environ.get("RESULTS_DIR", "/app/results")
 
+STALE_SINCE_HEADER = "X-Airflow-Stale-Since"
+PARTIAL_ROWS_HEADER = "X-Partial-Result-Rows"
+SUMMARY_RETRY_AFTER_SECONDS = 5
+
 router = APIRouter(prefix="/inference_job_runs", tags=["inference_job_runs"])
 
 
+def _set_stale_since_header(
+    response: Response, job_runs: list[InferenceJobRun]
+) -> None:
+    stale_since = [run.stale_since for run in job_runs if run.stale_since]
+    if stale_since:
+        response.headers[STALE_SINCE_HEADER] = min(stale_since).isoformat()
+
+
 @router.get("", response_model=list[InferenceJobRun])
 def list_inference_job_runs(
+    response: Response,
     status: Optional[str] = None,
     processor: BatchInferenceProcessor = Depends(get_batch_processor),
 ) -> list[InferenceJobRun]:
-    return processor.list_dag_runs(status=status)
+    job_runs = processor.list_dag_runs(status=status)
+    _set_stale_since_header(response, job_runs)
+    return job_runs
 
 
 @router.post("", response_model=InferenceJobRun, status_code=201)
@@ -37,15 +59,80 @@ def create_inference_job_run(
 @router.get("/{job_run_id}", response_model=InferenceJobRun)
 def get_inference_job_run(
     job_run_id: str,
+    response: Response,
     processor: BatchInferenceProcessor = Depends(get_batch_processor),
 ) -> InferenceJobRun:
-    return processor.get_dag_run_status(job_run_id)
+    job_run = processor.get_dag_run_status(job_run_id)
+    _set_stale_since_header(response, [job_run])
+    return job_run
+
+
+def _download_response(
+    download: ResultDownload, headers: dict[str, str] | None = None
+) -> Response:
+    if download.path is not None:
+        return FileResponse(download.path)
+    if download.url is not None:
+        # Large results go straight from the object store to the client
+        return RedirectResponse(download.url, status_code=307)
+    headers = dict(headers or {})
+    if download.size_bytes is not None:
+        headers["Content-Length"] = str(download.size_bytes)
+    return StreamingResponse(
+        download.chunks or iter(()), media_type="text/csv", headers=headers
+    )
 
 
 @router.get("/{job_run_id}/results", response_model=list[list[float]])
 def get_inference_job_run_results(
+    job_run_id: str,
+    partial: bool = False,
+    processor: BatchInferenceProcessor = Depends(get_batch_processor),
+) -> Response:
+    if not partial:
+        return _download_response(processor.get_dag_run_results(job_run_id))
+
+    # Rows embedded so far by a running job; the complete result once it succeeded
+    download, progress = processor.get_dag_run_partial_results(job_run_id)
+    if progress is None:
+        return _download_response(download)
+    rows = progress.cells_done if progress.result_rows is None else progress.result_rows
+    return _download_response(download, headers={PARTIAL_ROWS_HEADER: str(rows)})
+
+
+@router.get(
+    "/{job_run_id}/summary",
+    response_model=EmbeddingSummary,
+    responses={202: {"description": "Summary being computed, retry later"}},
+)
+def get_inference_job_run_summary(
+    job_run_id: str,
+    processor: BatchInferenceProcessor = Depends(get_batch_processor),
+) -> EmbeddingSummary | Response:
+    summary = processor.get_dag_run_summary(job_run_id)
+    if summary is None:
+        # Older results without a summary.json are summarised in the background
+        return JSONResponse(
+            {"detail": "Summary is being computed"},
+            status_code=202,
+            headers={"Retry-After": str(SUMMARY_RETRY_AFTER_SECONDS)},
+        )
+    return summary
+
+
+@router.get(
+    "/{job_run_id}/profile",
+    response_class=Response,
+    responses={200: {"content": {"application/zip": {}}}},
+)
+def get_inference_job_run_profile(
     job_run_id: str,
     processor: BatchInferenceProcessor = Depends(get_batch_processor),
-) -> FileResponse:
-    job_results = processor.get_dag_run_results(job_run_id)
-    return FileResponse(job_results)
+) -> Response:
+    return StreamingResponse(
+        processor.get_dag_run_profile(job_run_id),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{job_run_id}-profile.zip"'
+        },
+    )
@@ -1,19 +1,47 @@
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 
 import requests
-from airflow_client.client import ApiClient, Configuration
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
+# airflow_client takes seconds to import, so it is only imported on first use (see
+# benchmarks/startup.py)
+if TYPE_CHECKING:
+    from airflow_client.client import ApiClient, Configuration
+
 
 class AirflowApiConfig(BaseSettings):
     host: str = Field(default="http://localhost:8080", validation_alias="AIRFLOW_HOST")
     username: str = Field(default="airflow", validation_alias="AIRFLOW_USERNAME")
     password: str = Field(default="airflow", validation_alias="AIRFLOW_PASSWORD")
+    request_timeout_seconds: float = Field(
+        default=10, validation_alias="AIRFLOW_REQUEST_TIMEOUT_SECONDS"
+    )
+    max_retries: int = Field(default=2, validation_alias="AIRFLOW_MAX_RETRIES")
+    retry_backoff_seconds: float = Field(
+        default=0.2, validation_alias="AIRFLOW_RETRY_BACKOFF_SECONDS"
+    )
+    circuit_failure_threshold: int = Field(
+        default=5, validation_alias="AIRFLOW_CIRCUIT_FAILURE_THRESHOLD"
+    )
+    circuit_reset_seconds: float = Field(
+        default=30, validation_alias="AIRFLOW_CIRCUIT_RESET_SECONDS"
+    )
+    stale_cache_size: int = Field(
+        default=4096, validation_alias="AIRFLOW_STALE_CACHE_SIZE"
+    )
 
     model_config = {"populate_by_name": True}
 
 
+class AirflowTokenError(RuntimeError):
+    """Airflow did not issue an access token; ``status`` is that of its response"""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
 class AirflowAccessTokenResponse(BaseModel):
     access_token: str
 
@@ -21,10 +49,10 @@ class AirflowAccessTokenResponse(BaseModel):
 class AuthnAirflowClient:
     def __init__(
         self,
-        api_client_factory: Callable[[Configuration], ApiClient] | None = None,
+        api_client_factory: Callable[["Configuration"], "ApiClient"] | None = None,
         airflow_api_config: AirflowApiConfig | None = None,
     ):
-        self._api_client_factory = api_client_factory or ApiClient
+        self._api_client_factory = api_client_factory
         self._airflow_api_config = airflow_api_config or AirflowApiConfig()
 
     def _get_airflow_client_access_token(
@@ -36,23 +64,33 @@ class AuthnAirflowClient:
             "password": self._airflow_api_config.password,
         }
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url, json=payload, headers=headers)
+        response = requests.post(
+            url,
+            json=payload,
+            headers=headers,
+            timeout=self._airflow_api_config.request_timeout_seconds,
+        )
         if response.status_code != 201:
-            raise RuntimeError(
-                f"Failed to get access token: {response.status_code} {response.text}"
+            raise AirflowTokenError(
+                f"Failed to get access token: {response.status_code} {response.text}",
+                status=response.status_code,
             )
         response_success = AirflowAccessTokenResponse(**response.json())
         return response_success.access_token
 
-    def _get_airflow_configuration(self) -> Configuration:
+    def _get_airflow_configuration(self) -> "Configuration":
+        from airflow_client.client import Configuration
+
         return Configuration(
             host=self._airflow_api_config.host,
         )
 
-    def __enter__(self) -> ApiClient:
+    def __enter__(self) -> "ApiClient":
+        from airflow_client.client import ApiClient
+
         configuration = self._get_airflow_configuration()
         configuration.access_token = self._get_airflow_client_access_token()
-        return self._api_client_factory(configuration)
+        return (self._api_client_factory or ApiClient)(configuration)
 
     def __exit__(self, exc_type, exc_value, traceback):  # type: ignore[no-untyped-def]
         pass
@@ -0,0 +1,328 @@
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Generic, Hashable, TypeVar
+
+import requests
+
+from helical_workbench_backend.clients.airflow_authenticated_client import (
+    AirflowApiConfig,
+    AirflowTokenError,
+    AuthnAirflowClient,
+)
+
+if TYPE_CHECKING:
+    from airflow_client.client import (
+        ApiClient,
+        DAGRunCollectionResponse,
+        DAGRunResponse,
+        PoolResponse,
+        TriggerDAGRunPostBody,
+    )
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AirflowUnavailableError(RuntimeError):
+    """Airflow could not be reached and there is no cached state to fall back to"""
+
+    def __init__(self, message: str, retry_after_seconds: float):
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+def is_transient(error: BaseException) -> bool:
+    """Errors worth retrying: timeouts, connection failures, 429 and 5xx, including
+    those of the access token request"""
+    import urllib3
+    from airflow_client.client.exceptions import ApiException
+
+    if isinstance(error, (ApiException, AirflowTokenError)):
+        return error.status is None or error.status == 429 or error.status >= 500
+    return isinstance(
+        error,
+        (urllib3.exceptions.HTTPError, requests.RequestException, TimeoutError),
+    )
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key wait
+    for that call and share its result (or exception)"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future[Any]] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = Future()
+        if not leader:
+            result: T = call.result()
+            return result
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures. Once ``reset_seconds``
+    have passed it lets a single trial call through, and closes if that succeeds."""
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(self._opened_at + self._reset_seconds - self._clock(), 0.0)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or self.retry_after() > 0:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Airflow reachable again, closing circuit")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self._failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(
+                        "Opening Airflow circuit after %d consecutive failures",
+                        self._failures,
+                    )
+                self._opened_at = self._clock()
+
+
+class _StaleCache:
+    """Last good response per key, least recently used first out"""
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[Any, datetime]] = OrderedDict()
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, datetime.now(timezone.utc))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> tuple[Any, datetime] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+
+@dataclass(frozen=True)
+class AirflowRead(Generic[T]):
+    value: T
+    # When ``value`` was fetched, if it is cached state served because Airflow
+    # could not be reached
+    stale_since: datetime | None = None
+
+
+class DagRunClient:
+    """``DagRunApi`` (and pool) calls with per-call timeouts and a circuit breaker.
+
+    DAG run reads are idempotent, so they are also retried with jittered exponential
+    backoff, coalesced across concurrent callers and, while Airflow is down, served
+    from the last good response. One instance is shared by all requests of a process.
+    """
+
+    def __init__(
+        self,
+        airflow_client: AuthnAirflowClient,
+        config: AirflowApiConfig | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._airflow_client = airflow_client
+        self._config = config or AirflowApiConfig()
+        self._sleep = sleep
+        self._breaker = CircuitBreaker(
+            self._config.circuit_failure_threshold,
+            self._config.circuit_reset_seconds,
+            clock=clock,
+        )
+        self._single_flight = SingleFlight()
+        self._cache = _StaleCache(self._config.stale_cache_size)
+
+    def _unavailable(self, reason: str) -> AirflowUnavailableError:
+        return AirflowUnavailableError(
+            f"Airflow is unavailable: {reason}",
+            retry_after_seconds=self._breaker.retry_after()
+            or self._config.circuit_reset_seconds,
+        )
+
+    def _fetch_with_retries(self, fetch: Callable[["ApiClient", float], T]) -> T:
+        attempt = 0
+        while True:
+            try:
+                with self._airflow_client as api_client:
+                    value = fetch(api_client, self._config.request_timeout_seconds)
+            except Exception as e:
+                if not is_transient(e):
+                    # Airflow answered, the request itself was wrong
+                    self._breaker.record_success()
+                    raise
+                if attempt >= self._config.max_retries:
+                    self._breaker.record_failure()
+                    raise
+                # Full jitter, so that callers that failed together do not retry
+                # together
+                delay = random.uniform(
+                    0, self._config.retry_backoff_seconds * 2**attempt
+                )
+                logger.info("Airflow call failed (%s), retrying in %.2fs", e, delay)
+                self._sleep(delay)
+                attempt += 1
+            else:
+                self._breaker.record_success()
+                return value
+
+    def _read(
+        self, key: Hashable, fetch: Callable[["ApiClient", float], T]
+    ) -> AirflowRead[T]:
+        reason = "circuit open"
+        if self._breaker.allow():
+            try:
+                value = self._single_flight.do(
+                    key, lambda: self._fetch_with_retries(fetch)
+                )
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                reason = str(e)
+            else:
+                self._cache.put(key, value)
+                return AirflowRead(value)
+
+        cached = self._cache.get(key)
+        if cached is None:
+            raise self._unavailable(reason)
+        value, fetched_at = cached
+        logger.warning("Serving state of %s cached at %s (%s)", key, fetched_at, reason)
+        return AirflowRead(value, stale_since=fetched_at)
+
+    def get_dag_run(
+        self, dag_id: str, dag_run_id: str
+    ) -> AirflowRead["DAGRunResponse"]:
+        from airflow_client.client.api.dag_run_api import DagRunApi
+
+        return self._read(
+            ("get_dag_run", dag_id, dag_run_id),
+            lambda api_client, timeout: DagRunApi(api_client).get_dag_run(
+                dag_id=dag_id, dag_run_id=dag_run_id, _request_timeout=timeout
+            ),
+        )
+
+    def get_dag_runs(
+        self, dag_id: str, state: list[str] | None = None
+    ) -> AirflowRead["DAGRunCollectionResponse"]:
+        from airflow_client.client.api.dag_run_api import DagRunApi
+
+        kwargs: dict[str, Any] = {}
+        if state:
+            kwargs["state"] = state
+        return self._read(
+            ("get_dag_runs", dag_id, tuple(state or ())),
+            lambda api_client, timeout: DagRunApi(api_client).get_dag_runs(
+                dag_id=dag_id, _request_timeout=timeout, **kwargs
+            ),
+        )
+
+    def _call_once(self, call: Callable[[], T]) -> T:
+        """A single attempt through the circuit breaker; transient failures raise
+        ``AirflowUnavailableError``"""
+        if not self._breaker.allow():
+            raise self._unavailable("circuit open")
+        try:
+            value = call()
+        except Exception as e:
+            if not is_transient(e):
+                self._breaker.record_success()
+                raise
+            self._breaker.record_failure()
+            raise self._unavailable(str(e)) from e
+        self._breaker.record_success()
+        return value
+
+    def trigger_dag_run(
+        self, dag_id: str, trigger_dag_run_post_body: "TriggerDAGRunPostBody"
+    ) -> "DAGRunResponse":
+        """Not retried nor coalesced: triggering a run is not idempotent"""
+        from airflow_client.client.api.dag_run_api import DagRunApi
+
+        # The access token is requested within the attempt, so that the breaker
+        # also sees its failures
+        def trigger() -> "DAGRunResponse":
+            with self._airflow_client as api_client:
+                return DagRunApi(api_client).trigger_dag_run(
+                    dag_id=dag_id,
+                    trigger_dag_run_post_body=trigger_dag_run_post_body,
+                    _request_timeout=self._config.request_timeout_seconds,
+                )
+
+        dag_run = self._call_once(trigger)
+        self._cache.put(("get_dag_run", dag_id, dag_run.dag_run_id), dag_run)
+        return dag_run
+
+    def get_pool(self, pool_name: str) -> "PoolResponse":
+        """Not retried nor served from cache: it only informs the admission of a run
+        being triggered, which should not wait on Airflow"""
+        from airflow_client.client.api.pool_api import PoolApi
+
+        def fetch() -> "PoolResponse":
+            with self._airflow_client as api_client:
+                return PoolApi(api_client).get_pool(
+                    pool_name=pool_name,
+                    _request_timeout=self._config.request_timeout_seconds,
+                )
+
+        return self._call_once(fetch)
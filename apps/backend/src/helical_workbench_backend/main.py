@@ -1,10 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from helical_workbench_backend.api.dependencies.airflow import (
+    calibrate_admission_controller,
+    get_admission_controller,
+    get_airflow_api_config,
+    get_batch_processor_config,
+    get_dag_run_client,
+    get_result_storage,
+    get_results_catalogue,
+    get_results_retention_config,
+)
 from helical_workbench_backend.api.router import router
+from helical_workbench_backend.services.results_catalogue import run_retention
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    get_airflow_api_config()
+    get_batch_processor_config()
+    get_admission_controller()
+    get_dag_run_client()
+    get_result_storage()
+    catalogue = get_results_catalogue()
+    # Reads the metrics of every past run: admissions use the uncalibrated priors
+    # until it is done rather than delaying startup
+    calibration = asyncio.create_task(asyncio.to_thread(calibrate_admission_controller))
+    retention = asyncio.create_task(
+        run_retention(catalogue, get_results_retention_config().gc_interval_seconds)
+    )
+    yield
+    for task in (calibration, retention):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    # Access times recorded since the last pass
+    catalogue.save()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -0,0 +1,176 @@
+import logging
+import math
+import threading
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+from pydantic_settings import BaseSettings
+
+from helical_workbench_backend.api.models.inference_job_run import (
+    InferenceJobRunInputs,
+)
+from helical_workbench_backend.clients.dag_run_client import AirflowUnavailableError
+from helical_workbench_backend.services.cost_model import (
+    MODEL_CLASSES,
+    CostModel,
+    ModelClass,
+    ResourceEstimate,
+    RunMetrics,
+)
+
+if TYPE_CHECKING:
+    from helical_workbench_backend.clients.dag_run_client import DagRunClient
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionControlConfig(BaseSettings):
+    # Memory of the worker serving each inference queue
+    worker_memory_bytes: int = Field(
+        default=16 * 1024**3, validation_alias="WORKER_MEMORY_BYTES"
+    )
+    # Pool slot counts, used when the pool cannot be read from Airflow; keep in sync
+    # with airflow-init in apps/airflow/docker-compose.yaml
+    small_pool_slots: int = Field(
+        default=4, ge=1, validation_alias="INFERENCE_POOL_SMALL_SLOTS"
+    )
+    medium_pool_slots: int = Field(
+        default=2, ge=1, validation_alias="INFERENCE_POOL_MEDIUM_SLOTS"
+    )
+    large_pool_slots: int = Field(
+        default=1, ge=1, validation_alias="INFERENCE_POOL_LARGE_SLOTS"
+    )
+    default_n_cells: int = Field(
+        default=10_000, validation_alias="DEFAULT_DATASET_N_CELLS"
+    )
+    default_n_genes: int = Field(
+        default=30_000, validation_alias="DEFAULT_DATASET_N_GENES"
+    )
+    model_config = {"populate_by_name": True}
+
+    def pool_slots(self, model_class: ModelClass) -> int:
+        return {
+            ModelClass.SMALL: self.small_pool_slots,
+            ModelClass.MEDIUM: self.medium_pool_slots,
+            ModelClass.LARGE: self.large_pool_slots,
+        }[model_class]
+
+
+def pool_for(model_class: ModelClass) -> str:
+    """Airflow pool (and Celery queue) the DAG routes a model class to"""
+    return f"inference_{model_class.value}"
+
+
+class AdmissionDecision(BaseModel):
+    model_class: ModelClass
+    pool: str
+    estimate: ResourceEstimate
+    queued_reason: Optional[str] = None
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        cost_model: CostModel,
+        config: AdmissionControlConfig | None = None,
+    ):
+        self._cost_model = cost_model
+        self._config = config or AdmissionControlConfig()
+        self._lock = threading.Lock()
+        self._history: list[RunMetrics] = []
+
+    @classmethod
+    def from_history(
+        cls,
+        history: Iterable[RunMetrics],
+        config: AdmissionControlConfig | None = None,
+    ) -> "AdmissionController":
+        controller = cls(CostModel(), config=config)
+        controller.calibrate(history)
+        return controller
+
+    def calibrate(self, history: Iterable[RunMetrics]) -> None:
+        """Recalibrates the cost model on the metrics of past runs, read from the
+        storage after startup; runs recorded in the meantime are kept"""
+        history = list(history)
+        with self._lock:
+            self._history = history + self._history
+            self._cost_model = CostModel.calibrate(self._history)
+
+    def record_runs(self, metrics: Iterable[dict[str, Any]]) -> None:
+        """Recalibrates the cost model with the ``metrics.json`` of finished runs"""
+        runs = []
+        for raw in metrics:
+            try:
+                runs.append(RunMetrics.model_validate(raw))
+            except ValueError:
+                logger.warning("Not calibrating on unreadable run metrics %s", raw)
+        if not runs:
+            return
+        with self._lock:
+            self._history.extend(runs)
+            self._cost_model = CostModel.calibrate(self._history)
+        logger.info("Cost model recalibrated on %d finished runs", len(runs))
+
+    def _dataset_shape(self, inputs: InferenceJobRunInputs) -> tuple[int, int]:
+        """Upper bound of the cells and genes the run embeds: the shape of the split
+        before any selection, as recorded by a past run, with this run's sample
+        fraction, sample size and gene subset applied. ``obs_filter`` is not: how
+        many cells it keeps is only known once the data is read."""
+        n_cells, n_genes = self._cost_model.dataset_shape(
+            inputs.data_path, inputs.split
+        ) or (self._config.default_n_cells, self._config.default_n_genes)
+        if inputs.sample_fraction is not None:
+            n_cells = math.ceil(n_cells * inputs.sample_fraction)
+        if inputs.sample_size is not None:
+            n_cells = min(n_cells, inputs.sample_size)
+        if inputs.genes is not None:
+            n_genes = min(n_genes, len(inputs.genes))
+        return n_cells, n_genes
+
+    def admit(
+        self, inputs: InferenceJobRunInputs, dag_run_client: "DagRunClient"
+    ) -> AdmissionDecision:
+        from airflow_client.client import ApiException
+
+        n_cells, n_genes = self._dataset_shape(inputs)
+        estimate = self._cost_model.estimate(inputs.model, n_cells, n_genes)
+        model_class = MODEL_CLASSES[inputs.model]
+        pool = pool_for(model_class)
+        # When Airflow does not answer, the run is admitted against the configured
+        # slot count, without a queued reason
+        try:
+            pool_state = dag_run_client.get_pool(pool)
+        except (ApiException, AirflowUnavailableError) as e:
+            logger.warning("Could not read Airflow pool %s: %s", pool, e)
+            pool_state = None
+        slots = self._config.pool_slots(model_class)
+        if pool_state is not None and pool_state.slots > 0:
+            slots = pool_state.slots
+
+        # Each queue has its own worker, running up to one task per slot of the pool:
+        # a run may use its slot's share of the worker memory
+        slot_memory_bytes = self._config.worker_memory_bytes // slots
+        if estimate.peak_memory_bytes > slot_memory_bytes:
+            raise HTTPException(
+                status_code=422,
+                detail=(
+                    f"Estimated peak memory of {estimate.peak_memory_bytes} bytes "
+                    f"exceeds the {slot_memory_bytes} bytes of a slot of pool "
+                    f"'{pool}' ({slots} slots sharing "
+                    f"{self._config.worker_memory_bytes} bytes)"
+                ),
+            )
+
+        decision = AdmissionDecision(
+            model_class=model_class, pool=pool, estimate=estimate
+        )
+        if pool_state is not None and pool_state.open_slots <= 0:
+            decision.queued_reason = (
+                f"Waiting for capacity in pool '{pool}': "
+                f"{pool_state.running_slots} running, "
+                f"{pool_state.queued_slots} queued, "
+                f"{pool_state.slots} slots"
+            )
+        return decision
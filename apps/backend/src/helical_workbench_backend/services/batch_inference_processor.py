@@ -1,26 +1,62 @@
+import math
+import threading
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Iterator, TypeVar
 
-from airflow_client.client import DAGRunResponse, TriggerDAGRunPostBody
-from airflow_client.client.api.dag_run_api import DagRunApi
 from fastapi import HTTPException
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
 from helical_workbench_backend.api.models.inference_job_run import (
+    EmbeddingSummary,
     InferenceJobRun,
     InferenceJobRunCreate,
     InferenceJobRunInputs,
+    JobRunProgress,
     JobRunStatus,
 )
 from helical_workbench_backend.clients.airflow_authenticated_client import (
     AuthnAirflowClient,
 )
+from helical_workbench_backend.clients.dag_run_client import (
+    AirflowUnavailableError,
+    DagRunClient,
+)
+from helical_workbench_backend.services.admission_controller import (
+    AdmissionControlConfig,
+    AdmissionController,
+)
+from helical_workbench_backend.services.cost_model import CostModel
+from helical_workbench_backend.services.embedding_summary import summarize_lines
+from helical_workbench_backend.services.result_storage import (
+    LocalResultStorage,
+    ResultDownload,
+    ResultStorage,
+)
+from helical_workbench_backend.services.results_catalogue import (
+    ResultEntry,
+    ResultsCatalogue,
+)
+from helical_workbench_backend.services.run_artifacts import RunArtifacts
+
+# airflow_client takes seconds to import, so it is only imported on first use (see
+# benchmarks/startup.py)
+if TYPE_CHECKING:
+    from airflow_client.client import DAGRunResponse
+
+T = TypeVar("T")
 
 INFERENCE_DAG_ID = "execute_inference_helical_model_dag"
 
+# Summaries of results that predate the summary.json the DAG writes are computed in
+# the background, one at a time: parsing a large CSV must not hold up a request.
+# Failed computations are kept until a request reports them.
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+_summary_lock = threading.Lock()
+_summary_futures: dict[str, "Future[EmbeddingSummary]"] = {}
+
 _AIRFLOW_STATE_MAP = {
     "queued": JobRunStatus.PENDING,
     "running": JobRunStatus.RUNNING,
@@ -36,10 +72,18 @@ class BatchInferenceProcessorConfig(BaseSettings):
     model_config = {"populate_by_name": True}
 
 
+def _conf_to_inputs(conf: dict[str, Any]) -> InferenceJobRunInputs:
+    """Reconstruct inputs from a DAG run conf; keys the DAG added are ignored"""
+    return InferenceJobRunInputs(**{"data_path": "", "model": "geneformer", **conf})
+
+
 def _dag_run_to_job_run(
-    dag_run: DAGRunResponse, inputs: InferenceJobRunInputs
+    dag_run: "DAGRunResponse",
+    inputs: InferenceJobRunInputs,
+    stale_since: datetime | None = None,
 ) -> InferenceJobRun:
     state = _AIRFLOW_STATE_MAP.get(dag_run.state, JobRunStatus.PENDING)
+    admission = (dag_run.conf or {}).get("admission") or {}
     return InferenceJobRun(
         id=dag_run.dag_run_id,
         status=state,
@@ -52,79 +96,235 @@ def _dag_run_to_job_run(
         if state == JobRunStatus.SUCCEEDED
         else None,
         error=dag_run.note if state == JobRunStatus.FAILED else None,
+        # A run waiting for a slot of its pool is already running for Airflow (its
+        # routing task ran): the reason stays until the inference task reports progress
+        queued_reason=admission.get("queued_reason")
+        if state in (JobRunStatus.PENDING, JobRunStatus.RUNNING)
+        else None,
+        stale_since=stale_since,
     )
 
 
+def _forget_summary(dag_run_id: str, future: "Future[EmbeddingSummary]") -> None:
+    # Computed summaries are read from summary.json from then on
+    if future.exception() is None:
+        with _summary_lock:
+            if _summary_futures.get(dag_run_id) is future:
+                del _summary_futures[dag_run_id]
+
+
+def _call_airflow(call: Callable[[], T]) -> T:
+    try:
+        return call()
+    except AirflowUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after_seconds))},
+        ) from e
+
+
 class BatchInferenceProcessor:
     def __init__(
         self,
         airflow_client: AuthnAirflowClient,
         config: BatchInferenceProcessorConfig | None = None,
+        admission_controller: AdmissionController | None = None,
+        admission_config: AdmissionControlConfig | None = None,
+        dag_run_client: DagRunClient | None = None,
+        results_catalogue: ResultsCatalogue | None = None,
+        result_storage: ResultStorage | None = None,
     ):
-        self._airflow_client = airflow_client
+        self._dag_run_client = dag_run_client or DagRunClient(airflow_client)
         self._config = config or BatchInferenceProcessorConfig()
+        self._result_storage = result_storage or LocalResultStorage(
+            self._config.results_dir
+        )
+        self._artifacts = RunArtifacts(self._result_storage)
+        self._results_catalogue = results_catalogue or ResultsCatalogue(
+            self._result_storage
+        )
+        self._admission_controller = admission_controller
+        self._admission_config = admission_config
+
+    def _get_admission_controller(self) -> AdmissionController:
+        if self._admission_controller is None:
+            cost_model = CostModel.from_storage(self._result_storage)
+            self._admission_controller = AdmissionController(
+                cost_model, config=self._admission_config
+            )
+        return self._admission_controller
+
+    def _with_artifacts(self, job_run: InferenceJobRun) -> InferenceJobRun:
+        if job_run.status == JobRunStatus.RUNNING:
+            job_run.progress = self._artifacts.read_progress(job_run.id)
+            if job_run.progress is not None:
+                job_run.queued_reason = None
+        elif job_run.status == JobRunStatus.SUCCEEDED and (
+            self._results_catalogue.is_expired(job_run.id)
+        ):
+            job_run.status = JobRunStatus.EXPIRED
+            job_run.result_path = None
+        return job_run
 
     def trigger_dag_run(self, job_create: InferenceJobRunCreate) -> InferenceJobRun:
+        from airflow_client.client import TriggerDAGRunPostBody
+
         dag_run_id = f"api__{uuid.uuid4()}"
         job_create.inputs.results_path = (
             job_create.inputs.results_path or f"{dag_run_id}/embeddings.csv"
         )
-        with self._airflow_client as api_client:
-            dag_run_api = DagRunApi(api_client)
-            dag_run = dag_run_api.trigger_dag_run(
-                dag_id=INFERENCE_DAG_ID,
-                trigger_dag_run_post_body=TriggerDAGRunPostBody(
-                    dag_run_id=dag_run_id,
-                    logical_date=datetime.now(timezone.utc),
-                    conf=job_create.inputs.model_dump(),
-                ),
+        admission = self._get_admission_controller().admit(
+            job_create.inputs, self._dag_run_client
+        )
+        conf = job_create.inputs.model_dump()
+        conf["model_class"] = admission.model_class.value
+        conf["admission"] = admission.model_dump(mode="json")
+        trigger_dag_run_post_body = TriggerDAGRunPostBody(
+            dag_run_id=dag_run_id,
+            logical_date=datetime.now(timezone.utc),
+            conf=conf,
+        )
+        dag_run = _call_airflow(
+            lambda: self._dag_run_client.trigger_dag_run(
+                INFERENCE_DAG_ID, trigger_dag_run_post_body
             )
+        )
         return _dag_run_to_job_run(dag_run, job_create.inputs)
 
     def get_dag_run_status(self, dag_run_id: str) -> InferenceJobRun:
-        with self._airflow_client as api_client:
-            dag_run_api = DagRunApi(api_client)
-            dag_run = dag_run_api.get_dag_run(
-                dag_id=INFERENCE_DAG_ID, dag_run_id=dag_run_id
-            )
-        # Reconstruct inputs from DAG run conf
-        conf = dag_run.conf or {}
-        inputs = InferenceJobRunInputs(
-            data_path=conf.get("data_path", ""),
-            model=conf.get("model", "geneformer"),
-            results_path=conf.get("results_path"),
-            parameters=conf.get("parameters", {}),
+        read = _call_airflow(
+            lambda: self._dag_run_client.get_dag_run(INFERENCE_DAG_ID, dag_run_id)
+        )
+        dag_run = read.value
+        job_run = _dag_run_to_job_run(
+            dag_run, _conf_to_inputs(dag_run.conf or {}), read.stale_since
         )
-        return _dag_run_to_job_run(dag_run, inputs)
+        return self._with_artifacts(job_run)
 
     def list_dag_runs(self, status: str | None = None) -> list[InferenceJobRun]:
-        with self._airflow_client as api_client:
-            dag_run_api = DagRunApi(api_client)
-            kwargs: dict[str, Any] = {}
-            if status:
-                kwargs["state"] = [status]
-            response = dag_run_api.get_dag_runs(dag_id=INFERENCE_DAG_ID, **kwargs)
-        runs = response.dag_runs or []
+        # Expired runs are successful ones for Airflow
+        state = "success" if status == JobRunStatus.EXPIRED.value else status
+        read = _call_airflow(
+            lambda: self._dag_run_client.get_dag_runs(
+                INFERENCE_DAG_ID, state=[state] if state else None
+            )
+        )
+        runs = read.value.dag_runs or []
         result = []
         for dag_run in runs:
-            conf = dag_run.conf or {}
-            inputs = InferenceJobRunInputs(
-                data_path=conf.get("data_path", ""),
-                model=conf.get("model", "geneformer"),
-                results_path=conf.get("results_path"),
-                parameters=conf.get("parameters", {}),
-            )
-            result.append(_dag_run_to_job_run(dag_run, inputs))
+            inputs = _conf_to_inputs(dag_run.conf or {})
+            job_run = _dag_run_to_job_run(dag_run, inputs, read.stale_since)
+            result.append(self._with_artifacts(job_run))
+        if status in (JobRunStatus.SUCCEEDED.value, JobRunStatus.EXPIRED.value):
+            result = [r for r in result if r.status.value == status]
         return sorted(result, key=lambda r: r.started_at, reverse=True)
 
-    def get_dag_run_results(self, dag_run_id: str) -> Path:
+    def _catalogued_result(self, job_run: InferenceJobRun) -> ResultEntry:
+        """Result of a succeeded run, located through the results catalogue"""
+        if job_run.status == JobRunStatus.EXPIRED:
+            raise HTTPException(status_code=410, detail="Results expired")
+        entry = self._results_catalogue.lookup(
+            job_run.id, job_run.result_path or job_run.inputs.results_path
+        )
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Results not available")
+        if entry.expired_at is not None:
+            raise HTTPException(status_code=410, detail="Results expired")
+        return entry
+
+    def _download(self, job_run: InferenceJobRun) -> ResultDownload:
+        entry = self._catalogued_result(job_run)
+        try:
+            return self._result_storage.download(entry.path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Results not available")
+
+    def get_dag_run_results(self, dag_run_id: str) -> ResultDownload:
+        """Result of a succeeded run: a local file, or a presigned URL or stream of
+        the object when results are in S3"""
         status = self.get_dag_run_status(dag_run_id)
-        if status.status != JobRunStatus.SUCCEEDED:
+        if status.status not in (JobRunStatus.SUCCEEDED, JobRunStatus.EXPIRED):
             raise HTTPException(status_code=404, detail="Results not available yet")
-        full_result_path = Path(self._config.results_dir) / Path(
-            status.result_path or ""
-        )
-        if full_result_path.exists() and full_result_path.is_file():
-            return full_result_path
-        else:
+        return self._download(status)
+
+    def get_dag_run_partial_results(
+        self, dag_run_id: str
+    ) -> tuple[ResultDownload, JobRunProgress | None]:
+        """Result of a succeeded or running run. For a running run, the rows the task
+        has published so far (the first ``result_bytes`` of the result), and its
+        progress."""
+        status = self.get_dag_run_status(dag_run_id)
+        if status.status in (JobRunStatus.SUCCEEDED, JobRunStatus.EXPIRED):
+            return self._download(status), None
+        if (
+            status.status != JobRunStatus.RUNNING
+            or status.progress is None
+            or status.progress.result_bytes == 0
+        ):
+            raise HTTPException(status_code=404, detail="Results not available yet")
+        key = status.inputs.results_path
+        if key is None:
+            raise HTTPException(status_code=404, detail="Results not available")
+        try:
+            download = self._result_storage.partial_download(
+                key, status.progress.result_bytes
+            )
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Results not available")
+        return download, status.progress
+
+    def _compute_summary(self, dag_run_id: str, key: str) -> EmbeddingSummary:
+        summary = self._artifacts.read_summary(dag_run_id)
+        if summary is None:
+            summary = summarize_lines(self._result_storage.iter_lines(key))
+            self._artifacts.write_summary(dag_run_id, summary)
+        return summary
+
+    def get_dag_run_summary(self, dag_run_id: str) -> EmbeddingSummary | None:
+        """Summary statistics of a succeeded run's embeddings. Results that predate
+        the ``summary.json`` the DAG writes are summarised once in the background,
+        then cached: None until that is done."""
+        status = self.get_dag_run_status(dag_run_id)
+        if status.status not in (JobRunStatus.SUCCEEDED, JobRunStatus.EXPIRED):
+            raise HTTPException(status_code=404, detail="Summary not available yet")
+        # Kept when the result is evicted
+        summary = self._artifacts.read_summary(dag_run_id)
+        if summary is not None:
+            return summary
+        key = self._catalogued_result(status).path
+        with _summary_lock:
+            future = _summary_futures.get(dag_run_id)
+            started = future is None
+            if future is None:
+                future = _summary_futures[dag_run_id] = _summary_executor.submit(
+                    self._compute_summary, dag_run_id, key
+                )
+            elif future.done():
+                del _summary_futures[dag_run_id]
+        if started:
+            future.add_done_callback(lambda done: _forget_summary(dag_run_id, done))
+            return None
+        if not future.done():
+            return None
+        try:
+            return future.result()
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Results not available")
+        except ValueError as e:
+            raise HTTPException(
+                status_code=422, detail=f"Could not summarise results: {e}"
+            )
+
+    def get_dag_run_profile(self, dag_run_id: str) -> Iterator[bytes]:
+        """Zip of the profiling artefacts of a run started with ``profile``. They are
+        written once the profiled chunks are done, or when the run fails before."""
+        status = self.get_dag_run_status(dag_run_id)
+        archive = self._artifacts.profile_archive(dag_run_id)
+        if archive is not None:
+            return archive
+        if status.status == JobRunStatus.EXPIRED:
+            raise HTTPException(status_code=410, detail="Profile expired")
+        if not status.inputs.profile:
+            raise HTTPException(status_code=404, detail="Run was not profiled")
+        raise HTTPException(status_code=404, detail="Profile not available yet")
@@ -0,0 +1,206 @@
+import logging
+from enum import Enum
+from typing import Iterable, Optional
+
+from pydantic import BaseModel
+
+from helical_workbench_backend.api.models.inference_job_run import Model
+from helical_workbench_backend.services.result_storage import ResultStorage
+
+logger = logging.getLogger(__name__)
+
+RUN_METRICS_FILENAME = "metrics.json"
+
+_GIB = 1024**3
+_KIB = 1024
+
+
+class ModelClass(str, Enum):
+    SMALL = "small"
+    MEDIUM = "medium"
+    LARGE = "large"
+
+
+MODEL_CLASSES: dict[Model, ModelClass] = {
+    Model.C2S: ModelClass.MEDIUM,
+    Model.GENEFORMER: ModelClass.MEDIUM,
+    Model.GENEPT: ModelClass.SMALL,
+    Model.HELIX_MRNA: ModelClass.MEDIUM,
+    Model.HYENA_DNA: ModelClass.SMALL,
+    Model.MAMBA2_MRNA: ModelClass.MEDIUM,
+    Model.SC_GPT: ModelClass.MEDIUM,
+    Model.TRANSCRIPTFORMER: ModelClass.LARGE,
+    Model.UCE: ModelClass.LARGE,
+}
+
+
+class CostCoefficients(BaseModel):
+    """Linear cost model: ``base + per_cell * n_cells + per_gene * n_genes``"""
+
+    base_memory_bytes: float
+    memory_bytes_per_cell: float
+    memory_bytes_per_gene: float
+    base_runtime_seconds: float
+    runtime_seconds_per_cell: float
+
+
+class ResourceEstimate(BaseModel):
+    peak_memory_bytes: int
+    runtime_seconds: float
+
+
+class RunMetrics(BaseModel):
+    """Resource usage recorded by the inference DAG next to each result"""
+
+    model: Model
+    data_path: str
+    n_cells: int
+    n_genes: int
+    peak_memory_bytes: int
+    runtime_seconds: float
+    # Rows in the split slice and genes in the dataset, before the run's selection
+    # and gene subset; not recorded by older runs
+    split: Optional[str] = None
+    source_n_cells: Optional[int] = None
+    source_n_genes: Optional[int] = None
+
+
+# Uncalibrated priors, conservative on purpose: over-estimating only delays a run,
+# under-estimating lets it OOM a worker.
+DEFAULT_COEFFICIENTS: dict[ModelClass, CostCoefficients] = {
+    ModelClass.SMALL: CostCoefficients(
+        base_memory_bytes=1.5 * _GIB,
+        memory_bytes_per_cell=32 * _KIB,
+        memory_bytes_per_gene=64,
+        base_runtime_seconds=30,
+        runtime_seconds_per_cell=0.002,
+    ),
+    ModelClass.MEDIUM: CostCoefficients(
+        base_memory_bytes=3 * _GIB,
+        memory_bytes_per_cell=64 * _KIB,
+        memory_bytes_per_gene=128,
+        base_runtime_seconds=60,
+        runtime_seconds_per_cell=0.02,
+    ),
+    ModelClass.LARGE: CostCoefficients(
+        base_memory_bytes=8 * _GIB,
+        memory_bytes_per_cell=256 * _KIB,
+        memory_bytes_per_gene=256,
+        base_runtime_seconds=120,
+        runtime_seconds_per_cell=0.1,
+    ),
+}
+
+# Calibrated estimates are padded so that a run close to its fitted line still fits.
+SAFETY_FACTOR = 1.2
+
+
+def _fit_line(
+    xs: list[float], ys: list[float], prior_slope: float
+) -> tuple[float, float]:
+    """Least-squares ``y = intercept + slope * x``, keeping the prior slope when
+    the observations do not span enough distinct ``x`` values to fit one."""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    slope = prior_slope
+    if var_x > 0:
+        fitted = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+        if fitted > 0:
+            slope = fitted
+    intercept = max(mean_y - slope * mean_x, 0.0)
+    return intercept, slope
+
+
+class CostModel:
+    def __init__(
+        self,
+        coefficients: dict[Model, CostCoefficients] | None = None,
+        dataset_shapes: dict[tuple[str, str], tuple[int, int]] | None = None,
+    ):
+        self._coefficients = coefficients or {}
+        self._dataset_shapes = dataset_shapes or {}
+
+    @classmethod
+    def calibrate(cls, history: Iterable[RunMetrics]) -> "CostModel":
+        by_model: dict[Model, list[RunMetrics]] = {}
+        dataset_shapes: dict[tuple[str, str], tuple[int, int]] = {}
+        for metrics in history:
+            by_model.setdefault(metrics.model, []).append(metrics)
+            if (
+                metrics.split is not None
+                and metrics.source_n_cells is not None
+                and metrics.source_n_genes is not None
+            ):
+                dataset_shapes[(metrics.data_path, metrics.split)] = (
+                    metrics.source_n_cells,
+                    metrics.source_n_genes,
+                )
+
+        coefficients = {}
+        for model, runs in by_model.items():
+            prior = DEFAULT_COEFFICIENTS[MODEL_CLASSES[model]]
+            cells = [float(run.n_cells) for run in runs]
+            # Gene count is not fitted: it barely varies across runs of one model.
+            memory = [
+                run.peak_memory_bytes - prior.memory_bytes_per_gene * run.n_genes
+                for run in runs
+            ]
+            runtime = [run.runtime_seconds for run in runs]
+            base_memory, memory_per_cell = _fit_line(
+                cells, memory, prior.memory_bytes_per_cell
+            )
+            base_runtime, runtime_per_cell = _fit_line(
+                cells, runtime, prior.runtime_seconds_per_cell
+            )
+            coefficients[model] = CostCoefficients(
+                base_memory_bytes=base_memory * SAFETY_FACTOR,
+                memory_bytes_per_cell=memory_per_cell * SAFETY_FACTOR,
+                memory_bytes_per_gene=prior.memory_bytes_per_gene,
+                base_runtime_seconds=base_runtime * SAFETY_FACTOR,
+                runtime_seconds_per_cell=runtime_per_cell * SAFETY_FACTOR,
+            )
+        return cls(coefficients=coefficients, dataset_shapes=dataset_shapes)
+
+    @classmethod
+    def from_storage(cls, storage: ResultStorage) -> "CostModel":
+        return cls.calibrate(load_run_metrics(storage))
+
+    def dataset_shape(self, data_path: str, split: str) -> tuple[int, int] | None:
+        """Cells in ``split`` and genes of ``data_path``, as the last run on them
+        recorded them before selecting cells and genes"""
+        return self._dataset_shapes.get((data_path, split))
+
+    def coefficients(self, model: Model) -> CostCoefficients:
+        return (
+            self._coefficients.get(model) or DEFAULT_COEFFICIENTS[MODEL_CLASSES[model]]
+        )
+
+    def estimate(self, model: Model, n_cells: int, n_genes: int) -> ResourceEstimate:
+        c = self.coefficients(model)
+        memory = (
+            c.base_memory_bytes
+            + c.memory_bytes_per_cell * n_cells
+            + c.memory_bytes_per_gene * n_genes
+        )
+        runtime = c.base_runtime_seconds + c.runtime_seconds_per_cell * n_cells
+        return ResourceEstimate(peak_memory_bytes=int(memory), runtime_seconds=runtime)
+
+
+def metrics_run_id(key: str) -> str | None:
+    """Run whose ``metrics.json`` is stored under ``key``, if it is one"""
+    dag_run_id, _, name = key.partition("/")
+    return dag_run_id if name == RUN_METRICS_FILENAME else None
+
+
+def load_run_metrics(storage: ResultStorage) -> list[RunMetrics]:
+    history = []
+    for stored in storage.list_objects():
+        if metrics_run_id(stored.key) is None:
+            continue
+        try:
+            history.append(RunMetrics.model_validate_json(storage.read(stored.key)))
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable run metrics file %s", stored.key)
+    return history
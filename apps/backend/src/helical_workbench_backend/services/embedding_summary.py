@@ -0,0 +1,163 @@
+"""Summary statistics of an embeddings CSV, for results the inference DAG did not
+summarise itself (it writes ``summary.json`` since it computes the statistics while
+embedding, see ``apps/airflow/dags/helical_inference/summary.py``).
+
+The file is read once, in batches of rows. Each batch's moments are computed column by
+column with C-level builtins (``math.fsum``, ``map``), then merged into the running
+ones with Chan et al.'s pairwise update, which gives the same result as a single pass
+over all rows.
+"""
+
+import math
+import operator
+from dataclasses import dataclass, field
+from itertools import islice, repeat
+from typing import Iterable, Sequence
+
+from helical_workbench_backend.api.models.inference_job_run import (
+    DimensionStats,
+    EmbeddingSummary,
+    SummaryStats,
+)
+
+BATCH_ROWS = 1024
+
+
+@dataclass
+class Moments:
+    """Count, mean, sum of squared deviations, min and max of a stream of values"""
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+
+    @classmethod
+    def of(cls, values: Sequence[float]) -> "Moments":
+        """Moments of ``values``, ignoring NaNs"""
+        if any(map(math.isnan, values)):
+            values = [v for v in values if not math.isnan(v)]
+        if not values:
+            return cls()
+        # Deviations from the first value, so that m2 does not lose precision when
+        # the mean is large compared with the spread
+        shift = values[0]
+        deviations = list(map(operator.sub, values, repeat(shift)))
+        total = math.fsum(deviations)
+        squares = math.fsum(map(operator.mul, deviations, deviations))
+        count = len(values)
+        return cls(
+            count=count,
+            mean=shift + total / count,
+            m2=max(squares - total * total / count, 0.0),
+            min=min(values),
+            max=max(values),
+        )
+
+    def merge(self, other: "Moments") -> None:
+        count = self.count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self.mean
+        weight = other.count / count
+        self.mean += delta * weight
+        self.m2 += other.m2 + delta * delta * self.count * weight
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def stats(self) -> SummaryStats:
+        if self.count == 0:
+            return SummaryStats(count=0)
+        return SummaryStats(
+            count=self.count,
+            mean=self.mean,
+            variance=self.m2 / self.count,
+            min=self.min,
+            max=self.max,
+        )
+
+
+@dataclass
+class SummaryAccumulator:
+    rows: int = 0
+    rows_with_nan: int = 0
+    dimensions: list[Moments] = field(default_factory=list)
+    norms: Moments = field(default_factory=Moments)
+
+    def update(self, batch: Sequence[Sequence[float]]) -> None:
+        """Adds a batch of rows, all of the same length"""
+        if not batch:
+            return
+        # zip() would silently drop the columns beyond the shortest row
+        width = len(batch[0])
+        for i, row in enumerate(batch):
+            if len(row) != width:
+                raise ValueError(
+                    f"Row {self.rows + i} has {len(row)} values, "
+                    f"row {self.rows} has {width}"
+                )
+        columns = [Moments.of(column) for column in zip(*batch)]
+        if any(column.count < len(batch) for column in columns):
+            complete = [row for row in batch if not any(map(math.isnan, row))]
+        else:
+            complete = list(batch)
+        other = SummaryAccumulator(
+            rows=len(batch),
+            rows_with_nan=len(batch) - len(complete),
+            dimensions=columns,
+            norms=Moments.of([math.hypot(*row) for row in complete]),
+        )
+        self.merge(other)
+
+    def merge(self, other: "SummaryAccumulator") -> None:
+        if not self.dimensions:
+            self.dimensions = [Moments() for _ in other.dimensions]
+        elif other.dimensions and len(other.dimensions) != len(self.dimensions):
+            raise ValueError(
+                f"Cannot merge summaries of {len(self.dimensions)} and "
+                f"{len(other.dimensions)} dimensions"
+            )
+        for moments, other_moments in zip(self.dimensions, other.dimensions):
+            moments.merge(other_moments)
+        self.norms.merge(other.norms)
+        self.rows += other.rows
+        self.rows_with_nan += other.rows_with_nan
+
+    def summary(self) -> EmbeddingSummary:
+        dimensions = [moments.stats() for moments in self.dimensions]
+        nan_counts = [self.rows - moments.count for moments in self.dimensions]
+        return EmbeddingSummary(
+            rows=self.rows,
+            dims=len(dimensions),
+            nan_count=sum(nan_counts),
+            rows_with_nan=self.rows_with_nan,
+            norm=self.norms.stats(),
+            dimensions=DimensionStats(
+                count=[s.count for s in dimensions],
+                mean=[s.mean for s in dimensions],
+                variance=[s.variance for s in dimensions],
+                min=[s.min for s in dimensions],
+                max=[s.max for s in dimensions],
+                nan_count=nan_counts,
+            ),
+        )
+
+
+def _parse_rows(lines: Iterable[str]) -> Iterable[list[float]]:
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield list(map(float, line.split(",")))
+
+
+def summarize_lines(
+    lines: Iterable[str], batch_rows: int = BATCH_ROWS
+) -> EmbeddingSummary:
+    """Summary of CSV rows, e.g. a result streamed from the storage"""
+    accumulator = SummaryAccumulator()
+    rows = _parse_rows(lines)
+    while batch := list(islice(rows, batch_rows)):
+        accumulator.update(batch)
+    return accumulator.summary()
@@ -0,0 +1,357 @@
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Literal, Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+CHUNK_BYTES = 1 << 20
+
+# Parts of a running job's result the task has published so far, under
+# ``<key>.parts/``; each is named after its offset in the result
+PARTS_SUFFIX = ".parts/"
+
+
+class ResultStorageConfig(BaseSettings):
+    """Shared with the inference DAG, which reads the same variables"""
+
+    backend: Literal["local", "s3"] = Field(
+        default="local", validation_alias="RESULTS_STORAGE"
+    )
+    s3_bucket: Optional[str] = Field(default=None, validation_alias="RESULTS_S3_BUCKET")
+    s3_prefix: str = Field(default="", validation_alias="RESULTS_S3_PREFIX")
+    # For S3-compatible stores such as MinIO; unset means AWS
+    s3_endpoint_url: Optional[str] = Field(
+        default=None, validation_alias="RESULTS_S3_ENDPOINT_URL"
+    )
+    # Endpoint clients reach the store at, when it differs from the backend's (e.g.
+    # MinIO inside docker compose); presigned URLs are signed for this host
+    s3_public_endpoint_url: Optional[str] = Field(
+        default=None, validation_alias="RESULTS_S3_PUBLIC_ENDPOINT_URL"
+    )
+    download: Literal["redirect", "stream"] = Field(
+        default="redirect", validation_alias="RESULTS_DOWNLOAD"
+    )
+    presigned_url_ttl_seconds: int = Field(
+        default=3600, gt=0, validation_alias="RESULTS_PRESIGNED_URL_TTL_SECONDS"
+    )
+    model_config = {"populate_by_name": True}
+
+
+@dataclass(frozen=True)
+class ResultDownload:
+    """How a result is served: one of a local file, a URL to redirect the client to,
+    or chunks streamed through the backend"""
+
+    path: Optional[Path] = None
+    url: Optional[str] = None
+    chunks: Optional[Iterator[bytes]] = None
+    size_bytes: Optional[int] = None
+
+
+@dataclass(frozen=True, order=True)
+class StoredObject:
+    key: str
+    size_bytes: int
+
+
+def _iter_prefix(chunks: Iterator[bytes], length: int) -> Iterator[bytes]:
+    for chunk in chunks:
+        if length <= 0:
+            return
+        yield chunk[:length]
+        length -= len(chunk)
+
+
+class ResultStorage(ABC):
+    """Where the inference DAG stores result files and the artefacts of each run
+    (``metrics.json``, ``progress.json``, ``summary.json``, the profile), and the
+    backend its results catalogue. Objects are addressed by key: their path relative
+    to the results directory (``<dag_run_id>/embeddings.csv``)."""
+
+    @abstractmethod
+    def size(self, key: str) -> int | None:
+        """Size of the result in bytes, or None if it does not exist"""
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def iter_bytes(self, key: str, chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+        """Raises FileNotFoundError if the result does not exist"""
+        ...
+
+    @abstractmethod
+    def download(self, key: str) -> ResultDownload: ...
+
+    @abstractmethod
+    def list_objects(self, prefix: str = "") -> Iterator[StoredObject]:
+        """Objects whose key starts with ``prefix``, in one listing"""
+        ...
+
+    @abstractmethod
+    def read(self, key: str) -> bytes:
+        """Raises FileNotFoundError if the object does not exist"""
+        ...
+
+    @abstractmethod
+    def write(self, key: str, data: bytes) -> None:
+        """Replaces the object; readers never see a partial write"""
+        ...
+
+    @abstractmethod
+    def partial_download(self, key: str, length: int) -> ResultDownload:
+        """The first ``length`` bytes of the result of a running job, as far as the
+        task has published it. Raises FileNotFoundError if it has published none."""
+        ...
+
+    def iter_lines(self, key: str) -> Iterator[str]:
+        rest = b""
+        for chunk in self.iter_bytes(key):
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            for line in lines:
+                yield line.decode()
+        if rest:
+            yield rest.decode()
+
+
+class LocalResultStorage(ResultStorage):
+    """Results in a directory shared with the Airflow workers"""
+
+    def __init__(self, results_dir: str | Path):
+        self._results_dir = Path(results_dir)
+
+    def path(self, key: str) -> Path:
+        return self._results_dir / key
+
+    def size(self, key: str) -> int | None:
+        path = self.path(key)
+        if not path.is_file():
+            return None
+        return path.stat().st_size
+
+    def delete(self, key: str) -> None:
+        path = self.path(key)
+        path.unlink(missing_ok=True)
+        # Like object stores, no empty directories are left behind (e.g. profile/)
+        for directory in path.parents:
+            if directory == self._results_dir:
+                break
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+
+    def iter_bytes(self, key: str, chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+        f = open(self.path(key), "rb")
+
+        def chunks() -> Iterator[bytes]:
+            with f:
+                while chunk := f.read(chunk_size):
+                    yield chunk
+
+        return chunks()
+
+    def iter_lines(self, key: str) -> Iterator[str]:
+        with open(self.path(key)) as f:
+            yield from f
+
+    def download(self, key: str) -> ResultDownload:
+        path = self.path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        return ResultDownload(path=path, size_bytes=path.stat().st_size)
+
+    def list_objects(self, prefix: str = "") -> Iterator[StoredObject]:
+        directory = self.path(prefix.rpartition("/")[0])
+        if not directory.is_dir():
+            return
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = Path(root) / name
+                key = path.relative_to(self._results_dir).as_posix()
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    size_bytes = path.stat().st_size
+                except FileNotFoundError:
+                    continue
+                yield StoredObject(key, size_bytes)
+
+    def read(self, key: str) -> bytes:
+        return self.path(key).read_bytes()
+
+    def write(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as f:
+            f.write(data)
+        Path(f.name).replace(path)
+
+    def partial_download(self, key: str, length: int) -> ResultDownload:
+        # The task writes the result in place: its first ``length`` bytes are
+        # complete rows
+        return ResultDownload(
+            chunks=_iter_prefix(self.iter_bytes(key), length), size_bytes=length
+        )
+
+
+def _is_not_found(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    code = str(response.get("Error", {}).get("Code", ""))
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+class S3ResultStorage(ResultStorage):
+    """Results in an S3-compatible bucket, under ``prefix``.
+
+    Downloads are redirected to presigned URLs, so that large results go straight
+    from the store to the client, or streamed through the backend when the store
+    is not reachable by clients. boto3 is an optional dependency (the ``s3`` extra)
+    and is imported on first use.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str | None = None,
+        public_endpoint_url: str | None = None,
+        redirect: bool = True,
+        presigned_url_ttl_seconds: int = 3600,
+        client: Any = None,
+        presign_client: Any = None,
+    ):
+        self._bucket = bucket
+        self._prefix = prefix.strip("/")
+        self._endpoint_url = endpoint_url
+        self._public_endpoint_url = public_endpoint_url
+        self._redirect = redirect
+        self._presigned_url_ttl_seconds = presigned_url_ttl_seconds
+        self._client = client
+        self._presign_client = presign_client
+
+    def _make_client(self, endpoint_url: str | None) -> Any:
+        import boto3
+        from botocore.config import Config
+
+        return boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = self._make_client(self._endpoint_url)
+        return self._client
+
+    @property
+    def presign_client(self) -> Any:
+        if self._presign_client is None:
+            self._presign_client = (
+                self._make_client(self._public_endpoint_url)
+                if self._public_endpoint_url
+                else self.client
+            )
+        return self._presign_client
+
+    def object_key(self, key: str) -> str:
+        return f"{self._prefix}/{key}" if self._prefix else key
+
+    def size(self, key: str) -> int | None:
+        try:
+            head = self.client.head_object(
+                Bucket=self._bucket, Key=self.object_key(key)
+            )
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        return int(head["ContentLength"])
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self._bucket, Key=self.object_key(key))
+
+    def list_objects(self, prefix: str = "") -> Iterator[StoredObject]:
+        root = self.object_key("")
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self._bucket, Prefix=self.object_key(prefix)
+        )
+        for page in pages:
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"][len(root) :], int(item["Size"]))
+
+    def read(self, key: str) -> bytes:
+        data: bytes = self._get_object(key)["Body"].read()
+        return data
+
+    def write(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self._bucket, Key=self.object_key(key), Body=data)
+
+    def partial_download(self, key: str, length: int) -> ResultDownload:
+        parts = sorted(self.list_objects(f"{key}{PARTS_SUFFIX}"))
+        if not parts:
+            raise FileNotFoundError(key)
+
+        def chunks() -> Iterator[bytes]:
+            for part in parts:
+                yield from self.iter_bytes(part.key)
+
+        available = sum(part.size_bytes for part in parts)
+        length = min(length, available)
+        return ResultDownload(chunks=_iter_prefix(chunks(), length), size_bytes=length)
+
+    def _get_object(self, key: str) -> Any:
+        try:
+            return self.client.get_object(Bucket=self._bucket, Key=self.object_key(key))
+        except Exception as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def iter_bytes(self, key: str, chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+        chunks: Iterator[bytes] = self._get_object(key)["Body"].iter_chunks(chunk_size)
+        return chunks
+
+    def presigned_url(self, key: str) -> str:
+        url: str = self.presign_client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self._bucket, "Key": self.object_key(key)},
+            ExpiresIn=self._presigned_url_ttl_seconds,
+        )
+        return url
+
+    def download(self, key: str) -> ResultDownload:
+        if self._redirect:
+            return ResultDownload(url=self.presigned_url(key))
+        response = self._get_object(key)
+        return ResultDownload(
+            chunks=response["Body"].iter_chunks(CHUNK_BYTES),
+            size_bytes=int(response["ContentLength"]),
+        )
+
+
+def make_result_storage(
+    config: ResultStorageConfig, results_dir: str | Path
+) -> ResultStorage:
+    if config.backend == "local":
+        return LocalResultStorage(results_dir)
+    if not config.s3_bucket:
+        raise ValueError("RESULTS_S3_BUCKET must be set when RESULTS_STORAGE=s3")
+    return S3ResultStorage(
+        config.s3_bucket,
+        prefix=config.s3_prefix,
+        endpoint_url=config.s3_endpoint_url or None,
+        public_endpoint_url=config.s3_public_endpoint_url,
+        redirect=config.download == "redirect",
+        presigned_url_ttl_seconds=config.presigned_url_ttl_seconds,
+    )
@@ -0,0 +1,402 @@
+import asyncio
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import PurePosixPath
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel, Field
+from pydantic_settings import BaseSettings
+
+from helical_workbench_backend.services.cost_model import (
+    RUN_METRICS_FILENAME,
+    metrics_run_id,
+)
+from helical_workbench_backend.services.result_storage import (
+    PARTS_SUFFIX,
+    ResultStorage,
+)
+from helical_workbench_backend.services.run_artifacts import (
+    PROGRESS_FILENAME,
+    SUMMARY_FILENAME,
+)
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_FILENAME = "catalogue.json"
+
+# Artefacts kept when a result is evicted: they are small, and the cost model
+# calibrates on the run metrics
+RETAINED_FILENAMES = {RUN_METRICS_FILENAME, SUMMARY_FILENAME}
+
+
+class ResultsRetentionConfig(BaseSettings):
+    # Unset means no limit
+    quota_bytes: Optional[int] = Field(
+        default=None, ge=0, validation_alias="RESULTS_QUOTA_BYTES"
+    )
+    ttl_seconds: Optional[float] = Field(
+        default=None, gt=0, validation_alias="RESULTS_TTL_SECONDS"
+    )
+    gc_interval_seconds: float = Field(
+        default=300, gt=0, validation_alias="RESULTS_GC_INTERVAL_SECONDS"
+    )
+    model_config = {"populate_by_name": True}
+
+
+class ResultEntry(BaseModel):
+    """A run's result file, as recorded by the inference DAG in ``metrics.json``"""
+
+    dag_run_id: str
+    # Relative to the results directory; the result's key in the storage
+    path: str
+    format: str
+    size_bytes: int
+    rows: Optional[int] = None
+    dims: Optional[int] = None
+    sha256: Optional[str] = None
+    created_at: datetime
+    last_accessed_at: datetime
+    expired_at: Optional[datetime] = None
+    # The run has no metrics.json: it failed, or is still running. ``size_bytes`` is
+    # that of everything in its directory, and ``last_accessed_at`` is when that last
+    # changed.
+    partial: bool = False
+
+
+class _CatalogueFile(BaseModel):
+    results: list[ResultEntry]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ResultsCatalogue:
+    """Index of the result files in the storage, with a retention policy.
+
+    Runs are found through their ``metrics.json`` in the storage listing. Runs with a
+    ``progress.json`` but no ``metrics.json``, which failed or are still running, are
+    catalogued as partial: what they left in their directory counts against the quota
+    and the TTL too, and they are catalogued again once they finish. Lookups are served
+    from memory: the storage is only queried the first time a result is seen. The
+    catalogue is saved to ``catalogue.json`` in the storage by each garbage collection
+    pass. A pass evicts results that were not accessed for ``ttl_seconds``, then least
+    recently accessed ones until the total size is within ``quota_bytes``. Evicted
+    results stay in the catalogue, marked expired, and their ``metrics.json`` and
+    ``summary.json`` are kept.
+
+    ``on_new_runs`` is called by each pass with the ``metrics.json`` of the runs
+    catalogued since the previous one, i.e. the runs that finished in between.
+    """
+
+    def __init__(
+        self,
+        storage: ResultStorage,
+        config: ResultsRetentionConfig | None = None,
+        clock: Callable[[], datetime] = _utcnow,
+        on_new_runs: Callable[[list[dict[str, Any]]], None] | None = None,
+    ):
+        self._storage = storage
+        self._config = config or ResultsRetentionConfig()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[str, ResultEntry] | None = None
+        self._dirty = False
+        self._on_new_runs = on_new_runs
+        # Metrics of the runs catalogued since the last pass
+        self._new_runs: list[dict[str, Any]] = []
+
+    def _load(self) -> dict[str, ResultEntry]:
+        # Called with the lock held
+        if self._entries is None:
+            self._entries = {}
+            try:
+                catalogue = _CatalogueFile.model_validate_json(
+                    self._storage.read(CATALOGUE_FILENAME)
+                )
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError):
+                logger.warning("Rebuilding unreadable results catalogue")
+            else:
+                self._entries = {entry.dag_run_id: entry for entry in catalogue.results}
+        return self._entries
+
+    def _read_metrics(self, dag_run_id: str) -> dict[str, Any]:
+        """``metrics.json`` of a finished run; empty if it has not finished"""
+        try:
+            metrics = json.loads(
+                self._storage.read(f"{dag_run_id}/{RUN_METRICS_FILENAME}")
+            )
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable run metrics of %s", dag_run_id)
+            return {}
+        return metrics if isinstance(metrics, dict) else {}
+
+    def _read_entry(
+        self,
+        dag_run_id: str,
+        result_path: str | None = None,
+        metrics: dict[str, Any] | None = None,
+        sizes: dict[str, int] | None = None,
+    ) -> ResultEntry | None:
+        """Entry of a finished run from its ``metrics.json``, or None if the run has
+        not finished or its result file does not exist. The size of the result is
+        taken from ``sizes`` (a storage listing) when it is there."""
+        if metrics is None:
+            metrics = self._read_metrics(dag_run_id)
+        result = metrics.get("result")
+        if not isinstance(result, dict):
+            result = {}
+        path = str(result.get("path") or result_path or f"{dag_run_id}/embeddings.csv")
+        # Not in the listing: the result may have been stored after its page was read
+        size_bytes = (sizes or {}).get(path)
+        if size_bytes is None:
+            size_bytes = self._storage.size(path)
+        if size_bytes is None:
+            return None
+        now = self._clock()
+        return ResultEntry(
+            dag_run_id=dag_run_id,
+            path=path,
+            format=str(result.get("format") or PurePosixPath(path).suffix.lstrip(".")),
+            size_bytes=size_bytes,
+            rows=result.get("rows"),
+            dims=result.get("dims"),
+            sha256=result.get("sha256"),
+            created_at=now,
+            last_accessed_at=now,
+        )
+
+    def is_expired(self, dag_run_id: str) -> bool:
+        with self._lock:
+            entry = self._load().get(dag_run_id)
+            return entry is not None and entry.expired_at is not None
+
+    def lookup(
+        self, dag_run_id: str, result_path: str | None = None
+    ) -> ResultEntry | None:
+        """Entry of a succeeded run's result, recorded as accessed; None if it does
+        not exist. Expired entries are returned with ``expired_at`` set."""
+        with self._lock:
+            entry = self._load().get(dag_run_id)
+            if entry is not None and (not entry.partial or entry.expired_at):
+                if entry.expired_at is None:
+                    entry.last_accessed_at = self._clock()
+                    self._dirty = True
+                return entry.model_copy()
+        # Read without the lock: the storage may be remote
+        metrics = self._read_metrics(dag_run_id)
+        found = self._read_entry(dag_run_id, result_path, metrics)
+        if found is None:
+            return None
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(dag_run_id)
+            if entry is None or (entry.partial and entry.expired_at is None):
+                entry = entries[dag_run_id] = found
+                if metrics:
+                    self._new_runs.append(metrics)
+            elif entry.expired_at is None:
+                # Catalogued by a concurrent lookup or pass in the meantime
+                entry.last_accessed_at = self._clock()
+            self._dirty = True
+            return entry.model_copy()
+
+    def _list_sizes(self) -> dict[str, int]:
+        return {
+            stored.key: stored.size_bytes for stored in self._storage.list_objects()
+        }
+
+    def scan(self, sizes: dict[str, int] | None = None) -> int:
+        """Adds runs that are not in the catalogue yet; returns how many. Runs are
+        found in ``sizes``, the size of each object in the storage, which is listed if
+        not given. A finished run whose result file is gone is added as expired; a
+        partial run is added, or its size updated, with the size of its directory."""
+        if sizes is None:
+            sizes = self._list_sizes()
+        with self._lock:
+            entries = self._load()
+            known = {
+                dag_run_id
+                for dag_run_id, entry in entries.items()
+                if not entry.partial or entry.expired_at is not None
+            }
+            partial = set(entries) - known
+        found: list[tuple[ResultEntry, dict[str, Any]]] = []
+        finished = set()
+        for key in sizes:
+            dag_run_id = metrics_run_id(key)
+            if dag_run_id is None:
+                continue
+            finished.add(dag_run_id)
+            if dag_run_id in known:
+                continue
+            metrics = self._read_metrics(dag_run_id)
+            entry = self._read_entry(dag_run_id, metrics=metrics, sizes=sizes)
+            if entry is None:
+                now = self._clock()
+                entry = ResultEntry(
+                    dag_run_id=dag_run_id,
+                    path=f"{dag_run_id}/embeddings.csv",
+                    format="csv",
+                    size_bytes=0,
+                    created_at=now,
+                    last_accessed_at=now,
+                    expired_at=now,
+                )
+            found.append((entry, metrics))
+
+        dir_sizes: dict[str, int] = {}
+        started = set()
+        for key, size_bytes in sizes.items():
+            dag_run_id, _, name = key.partition("/")
+            if name:
+                dir_sizes[dag_run_id] = dir_sizes.get(dag_run_id, 0) + size_bytes
+                if name == PROGRESS_FILENAME:
+                    started.add(dag_run_id)
+        now = self._clock()
+        for dag_run_id in started - finished - known - partial:
+            entry = ResultEntry(
+                dag_run_id=dag_run_id,
+                path=f"{dag_run_id}/embeddings.csv",
+                format="csv",
+                size_bytes=dir_sizes[dag_run_id],
+                created_at=now,
+                last_accessed_at=now,
+                partial=True,
+            )
+            found.append((entry, {}))
+
+        with self._lock:
+            entries = self._load()
+            for entry, metrics in found:
+                current = entries.get(entry.dag_run_id)
+                # A partial run is replaced once it finishes, unless a lookup was first
+                if current is None or (current.partial and current.expired_at is None):
+                    entries[entry.dag_run_id] = entry
+                    if metrics:
+                        self._new_runs.append(metrics)
+            for dag_run_id in partial - finished:
+                current = entries.get(dag_run_id)
+                if current is None or not current.partial or current.expired_at:
+                    continue
+                dir_size = dir_sizes.get(dag_run_id)
+                if dir_size is None:
+                    # Its directory was deleted
+                    current.expired_at = now
+                elif dir_size != current.size_bytes:
+                    current.size_bytes = dir_size
+                    current.last_accessed_at = now
+                else:
+                    continue
+                self._dirty = True
+            self._dirty = self._dirty or bool(found)
+        return len(found)
+
+    def _select_evictions(self) -> list[ResultEntry]:
+        # Called with the lock held
+        live = sorted(
+            (e for e in self._load().values() if e.expired_at is None),
+            key=lambda e: e.last_accessed_at,
+        )
+        now = self._clock()
+        evicted = []
+        if self._config.ttl_seconds is not None:
+            cutoff = now - timedelta(seconds=self._config.ttl_seconds)
+            while live and live[0].last_accessed_at < cutoff:
+                evicted.append(live.pop(0))
+        if self._config.quota_bytes is not None:
+            total = sum(e.size_bytes for e in live)
+            while live and total > self._config.quota_bytes:
+                entry = live.pop(0)
+                total -= entry.size_bytes
+                evicted.append(entry)
+        for entry in evicted:
+            entry.expired_at = now
+        self._dirty = self._dirty or bool(evicted)
+        return evicted
+
+    def _delete_result(self, entry: ResultEntry) -> None:
+        self._storage.delete(entry.path)
+        retained = {f"{entry.dag_run_id}/{name}" for name in RETAINED_FILENAMES}
+        # The rest of the run's artefacts, and the parts of its partial result
+        for prefix in (f"{entry.dag_run_id}/", f"{entry.path}{PARTS_SUFFIX}"):
+            for stored in list(self._storage.list_objects(prefix)):
+                if stored.key not in retained:
+                    self._storage.delete(stored.key)
+
+    def collect_garbage(self) -> list[str]:
+        """Catalogues new results, applies the retention policy and saves the
+        catalogue; returns the runs whose results were evicted"""
+        # One listing per pass, to find new runs and check the results of known ones
+        sizes = self._list_sizes()
+        self.scan(sizes)
+        with self._lock:
+            new_runs, self._new_runs = self._new_runs, []
+        if new_runs and self._on_new_runs is not None:
+            try:
+                self._on_new_runs(new_runs)
+            except Exception:
+                logger.exception("Could not process %d new runs", len(new_runs))
+        # Results removed behind the catalogue's back count as evicted, so that they
+        # are not served. Those not in the listing are checked one by one, as they may
+        # have been looked up since; without the lock, as the storage may be remote.
+        with self._lock:
+            unlisted = [
+                e
+                for e in self._load().values()
+                if e.expired_at is None and not e.partial and e.path not in sizes
+            ]
+        missing = {e.dag_run_id for e in unlisted if self._storage.size(e.path) is None}
+        with self._lock:
+            now = self._clock()
+            for entry in self._load().values():
+                if entry.expired_at is None and entry.dag_run_id in missing:
+                    entry.expired_at = now
+                    self._dirty = True
+            evicted = self._select_evictions()
+        for entry in evicted:
+            logger.info(
+                "Evicting result of %s (%d bytes, last accessed %s)",
+                entry.dag_run_id,
+                entry.size_bytes,
+                entry.last_accessed_at,
+            )
+            try:
+                self._delete_result(entry)
+            except OSError:
+                logger.exception("Could not delete result of %s", entry.dag_run_id)
+        self.save()
+        return [entry.dag_run_id for entry in evicted]
+
+    def save(self) -> None:
+        """Writes the catalogue if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            catalogue = _CatalogueFile(results=list(self._load().values()))
+            self._dirty = False
+        # Written without the lock: the storage may be remote
+        try:
+            self._storage.write(
+                CATALOGUE_FILENAME, catalogue.model_dump_json().encode()
+            )
+        except BaseException:
+            with self._lock:
+                self._dirty = True
+            raise
+
+
+async def run_retention(catalogue: ResultsCatalogue, interval_seconds: float) -> None:
+    """Garbage collection loop, run in the background for the life of the app"""
+    while True:
+        try:
+            await asyncio.to_thread(catalogue.collect_garbage)
+        except Exception:
+            logger.exception("Results garbage collection failed")
+        await asyncio.sleep(interval_seconds)
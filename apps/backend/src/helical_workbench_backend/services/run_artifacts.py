@@ -0,0 +1,84 @@
+import logging
+import tempfile
+import zipfile
+from typing import IO, Iterator
+
+from helical_workbench_backend.api.models.inference_job_run import (
+    EmbeddingSummary,
+    JobRunProgress,
+)
+from helical_workbench_backend.services.result_storage import ResultStorage
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FILENAME = "progress.json"
+SUMMARY_FILENAME = "summary.json"
+PROFILE_DIRNAME = "profile"
+# Archives up to this size are built in memory, larger ones spill to a temporary file
+ARCHIVE_SPOOL_BYTES = 8 << 20
+ARCHIVE_CHUNK_BYTES = 1 << 20
+
+
+def _iter_archive(archive: IO[bytes]) -> Iterator[bytes]:
+    with archive:
+        archive.seek(0)
+        while chunk := archive.read(ARCHIVE_CHUNK_BYTES):
+            yield chunk
+
+
+class RunArtifacts:
+    """Artefacts the inference DAG stores under ``<dag_run_id>/`` in the storage"""
+
+    def __init__(self, storage: ResultStorage):
+        self._storage = storage
+
+    def read_progress(self, dag_run_id: str) -> JobRunProgress | None:
+        key = f"{dag_run_id}/{PROGRESS_FILENAME}"
+        try:
+            return JobRunProgress.model_validate_json(self._storage.read(key))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable progress file %s", key)
+            return None
+
+    def read_summary(self, dag_run_id: str) -> EmbeddingSummary | None:
+        key = f"{dag_run_id}/{SUMMARY_FILENAME}"
+        try:
+            return EmbeddingSummary.model_validate_json(self._storage.read(key))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable summary file %s", key)
+            return None
+
+    def write_summary(self, dag_run_id: str, summary: EmbeddingSummary) -> None:
+        """Caches a summary computed by the backend"""
+        self._storage.write(
+            f"{dag_run_id}/{SUMMARY_FILENAME}", summary.model_dump_json().encode()
+        )
+
+    def profile_archive(self, dag_run_id: str) -> Iterator[bytes] | None:
+        """Zip of the profiling artefacts of a run, in chunks, or None if it has none.
+        Torch traces can be large, so the archive is spooled to disk past
+        ``ARCHIVE_SPOOL_BYTES`` rather than held in memory."""
+        prefix = f"{dag_run_id}/{PROFILE_DIRNAME}/"
+        artefacts = sorted(
+            stored.key
+            for stored in self._storage.list_objects(prefix)
+            if "/" not in stored.key[len(prefix) :]
+        )
+        if not artefacts:
+            return None
+        archive = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES)
+        try:
+            with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as f:
+                for key in artefacts:
+                    arcname = f"{dag_run_id}/{key.rpartition('/')[2]}"
+                    with f.open(arcname, "w") as member:
+                        for chunk in self._storage.iter_bytes(key):
+                            member.write(chunk)
+        except BaseException:
+            archive.close()
+            raise
+        return _iter_archive(archive)
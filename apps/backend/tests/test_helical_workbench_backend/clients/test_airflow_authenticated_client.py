@@ -4,6 +4,7 @@ import pytest
 
 from helical_workbench_backend.clients.airflow_authenticated_client import (
     AirflowApiConfig,
+    AirflowTokenError,
     AuthnAirflowClient,
 )
 
@@ -53,9 +54,12 @@ class TestAuthnAirflowClient:
         ) as mock_post:
             mock_post.return_value = make_token_response(status_code=403)
             client = AuthnAirflowClient(airflow_api_config=config)
-            with pytest.raises(RuntimeError, match="Failed to get access token"):
+            with pytest.raises(
+                AirflowTokenError, match="Failed to get access token"
+            ) as e:
                 with client:
                     pass
+        assert e.value.status == 403
 
     def test_injects_access_token_into_configuration(self, config):
         captured = {}
@@ -0,0 +1,249 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from airflow_client.client.exceptions import NotFoundException, ServiceException
+from urllib3.exceptions import MaxRetryError
+
+from helical_workbench_backend.clients.airflow_authenticated_client import (
+    AirflowApiConfig,
+    AirflowTokenError,
+)
+from helical_workbench_backend.clients.dag_run_client import (
+    AirflowUnavailableError,
+    CircuitBreaker,
+    DagRunClient,
+    SingleFlight,
+    is_transient,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def mock_dag_run_api(mocker):
+    mock_api = MagicMock()
+    mocker.patch(
+        "airflow_client.client.api.dag_run_api.DagRunApi",
+        return_value=mock_api,
+    )
+    return mock_api
+
+
+@pytest.fixture
+def config():
+    return AirflowApiConfig(
+        request_timeout_seconds=3,
+        max_retries=2,
+        circuit_failure_threshold=2,
+        circuit_reset_seconds=30,
+    )
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def sleep():
+    return MagicMock()
+
+
+@pytest.fixture
+def airflow_client():
+    return MagicMock()
+
+
+@pytest.fixture
+def client(airflow_client, config, clock, sleep):
+    return DagRunClient(airflow_client, config=config, sleep=sleep, clock=clock)
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_with_same_key_run_once(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_call():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "state"
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(single_flight.do("key", slow_call))
+        )
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(
+                target=lambda: results.append(single_flight.do("key", slow_call))
+            )
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        assert calls == [1]
+        assert results == ["state"] * 4
+
+    def test_sequential_calls_are_not_coalesced(self):
+        single_flight = SingleFlight()
+        fn = MagicMock(return_value="state")
+        single_flight.do("key", fn)
+        single_flight.do("key", fn)
+        assert fn.call_count == 2
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_allows_one_trial_after_reset(self, clock):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+
+        clock.now = 31
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.allow()
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (ServiceException(status=503), True),
+        (NotFoundException(status=404), False),
+        (AirflowTokenError("token", status=502), True),
+        (AirflowTokenError("token", status=429), True),
+        (AirflowTokenError("token", status=401), False),
+        (MaxRetryError(None, "/auth/token"), True),
+    ],
+)
+def test_is_transient(error, transient):
+    assert is_transient(error) is transient
+
+
+class TestDagRunClient:
+    def test_passes_request_timeout(self, client, mock_dag_run_api):
+        client.get_dag_run("dag", "run-1")
+        mock_dag_run_api.get_dag_run.assert_called_once_with(
+            dag_id="dag", dag_run_id="run-1", _request_timeout=3.0
+        )
+
+    def test_retries_transient_errors(self, client, mock_dag_run_api, sleep):
+        mock_dag_run_api.get_dag_run.side_effect = [
+            ServiceException(status=503),
+            ServiceException(status=502),
+            "state",
+        ]
+        read = client.get_dag_run("dag", "run-1")
+        assert read.value == "state"
+        assert read.stale_since is None
+        assert sleep.call_count == 2
+
+    def test_does_not_retry_client_errors(self, client, mock_dag_run_api, sleep):
+        mock_dag_run_api.get_dag_run.side_effect = NotFoundException(status=404)
+        with pytest.raises(NotFoundException):
+            client.get_dag_run("dag", "run-1")
+        assert mock_dag_run_api.get_dag_run.call_count == 1
+        sleep.assert_not_called()
+
+    def test_serves_stale_state_after_retries_are_exhausted(
+        self, client, mock_dag_run_api
+    ):
+        mock_dag_run_api.get_dag_run.return_value = "state"
+        client.get_dag_run("dag", "run-1")
+        mock_dag_run_api.get_dag_run.side_effect = ServiceException(status=503)
+        read = client.get_dag_run("dag", "run-1")
+        assert read.value == "state"
+        assert read.stale_since is not None
+
+    def test_raises_unavailable_without_cached_state(self, client, mock_dag_run_api):
+        mock_dag_run_api.get_dag_run.side_effect = ServiceException(status=503)
+        with pytest.raises(AirflowUnavailableError):
+            client.get_dag_run("dag", "run-1")
+        assert mock_dag_run_api.get_dag_run.call_count == 3
+
+    def test_open_circuit_skips_airflow(self, client, mock_dag_run_api, clock):
+        mock_dag_run_api.get_dag_run.return_value = "state"
+        client.get_dag_run("dag", "run-1")
+        mock_dag_run_api.get_dag_run.side_effect = ServiceException(status=503)
+        client.get_dag_run("dag", "run-1")
+        client.get_dag_run("dag", "run-1")
+        calls = mock_dag_run_api.get_dag_run.call_count
+
+        read = client.get_dag_run("dag", "run-1")
+        assert mock_dag_run_api.get_dag_run.call_count == calls
+        assert read.stale_since is not None
+
+        clock.now = 31
+        mock_dag_run_api.get_dag_run.side_effect = None
+        read = client.get_dag_run("dag", "run-1")
+        assert read.stale_since is None
+
+    def test_trigger_is_not_retried(self, client, mock_dag_run_api, sleep):
+        mock_dag_run_api.trigger_dag_run.side_effect = ServiceException(status=503)
+        with pytest.raises(AirflowUnavailableError):
+            client.trigger_dag_run("dag", MagicMock())
+        assert mock_dag_run_api.trigger_dag_run.call_count == 1
+        sleep.assert_not_called()
+
+    def test_token_outage_is_retried_and_served_stale(
+        self, client, airflow_client, mock_dag_run_api, sleep
+    ):
+        mock_dag_run_api.get_dag_run.return_value = "state"
+        client.get_dag_run("dag", "run-1")
+        airflow_client.__enter__.side_effect = AirflowTokenError("down", status=503)
+        read = client.get_dag_run("dag", "run-1")
+        assert read.value == "state"
+        assert read.stale_since is not None
+        assert sleep.call_count == 2
+
+    def test_trigger_token_failures_trip_the_breaker(
+        self, client, airflow_client, mock_dag_run_api
+    ):
+        airflow_client.__enter__.side_effect = AirflowTokenError("down", status=502)
+        for _ in range(2):
+            with pytest.raises(AirflowUnavailableError):
+                client.trigger_dag_run("dag", MagicMock())
+        assert airflow_client.__enter__.call_count == 2
+
+        # Circuit open: no token is requested
+        with pytest.raises(AirflowUnavailableError):
+            client.trigger_dag_run("dag", MagicMock())
+        assert airflow_client.__enter__.call_count == 2
+        mock_dag_run_api.trigger_dag_run.assert_not_called()
+
+    def test_pool_read_has_timeout_and_trips_breaker(self, client, mocker, sleep):
+        mock_pool_api = MagicMock()
+        mocker.patch(
+            "airflow_client.client.api.pool_api.PoolApi", return_value=mock_pool_api
+        )
+        mock_pool_api.get_pool.side_effect = MaxRetryError(None, "/pools")
+        for _ in range(2):
+            with pytest.raises(AirflowUnavailableError):
+                client.get_pool("inference_large")
+        mock_pool_api.get_pool.assert_called_with(
+            pool_name="inference_large", _request_timeout=3
+        )
+        assert mock_pool_api.get_pool.call_count == 2
+        sleep.assert_not_called()
+
+        # Circuit open: Airflow is not called
+        with pytest.raises(AirflowUnavailableError):
+            client.get_pool("inference_large")
+        assert mock_pool_api.get_pool.call_count == 2
@@ -6,12 +6,17 @@ from starlette.testclient import TestClient
 
 from helical_workbench_backend.api.dependencies.airflow import get_batch_processor
 from helical_workbench_backend.api.models.inference_job_run import (
+    DimensionStats,
+    EmbeddingSummary,
     InferenceJobRun,
     InferenceJobRunInputs,
+    JobRunProgress,
     JobRunStatus,
     Model,
+    SummaryStats,
 )
 from helical_workbench_backend.main import app
+from helical_workbench_backend.services.result_storage import ResultDownload
 
 
 @pytest.fixture
@@ -98,6 +103,82 @@ class TestCreateInferenceJobRun:
         response = client.post("/inference_job_runs", json=payload)
         assert response.status_code == 422
 
+    def test_sample_fraction_out_of_range_returns_422(self, client, mock_processor):
+        payload = {
+            "inputs": {
+                "data_path": "s3://x",
+                "model": "geneformer",
+                "sample_fraction": 2,
+            }
+        }
+        response = client.post("/inference_job_runs", json=payload)
+        assert response.status_code == 422
+
+    def test_stratify_by_without_sample_size_returns_422(self, client, mock_processor):
+        payload = {
+            "inputs": {
+                "data_path": "s3://x",
+                "model": "geneformer",
+                "stratify_by": "cell_type",
+            }
+        }
+        response = client.post("/inference_job_runs", json=payload)
+        assert response.status_code == 422
+
+    def test_cell_and_gene_selection_accepted(self, client, mock_processor):
+        mock_processor.trigger_dag_run.return_value = make_job_run()
+        payload = {
+            "inputs": {
+                "data_path": "s3://x",
+                "model": "geneformer",
+                "obs_filter": {"tissue": ["liver", "lung"], "donor": [1]},
+                "sample_size": 5000,
+                "stratify_by": "cell_type",
+                "genes": ["CD4", "CD8A"],
+            }
+        }
+        response = client.post("/inference_job_runs", json=payload)
+        assert response.status_code == 201
+        inputs = mock_processor.trigger_dag_run.call_args.args[0].inputs
+        assert inputs.obs_filter == {"tissue": ["liver", "lung"], "donor": [1]}
+        assert inputs.sample_size == 5000
+
+    def test_execution_profile_accepted(self, client, mock_processor):
+        mock_processor.trigger_dag_run.return_value = make_job_run()
+        payload = {
+            "inputs": {
+                "data_path": "s3://x",
+                "model": "geneformer",
+                "execution_profile": {"intra_op_threads": 4, "cpu_affinity": [0, 1]},
+            }
+        }
+        response = client.post("/inference_job_runs", json=payload)
+        assert response.status_code == 201
+        inputs = mock_processor.trigger_dag_run.call_args.args[0].inputs
+        assert inputs.execution_profile.cpu_affinity == [0, 1]
+
+    def test_invalid_cpu_affinity_returns_422(self, client, mock_processor):
+        payload = {
+            "inputs": {
+                "data_path": "s3://x",
+                "model": "geneformer",
+                "execution_profile": {"cpu_affinity": "everything"},
+            }
+        }
+        response = client.post("/inference_job_runs", json=payload)
+        assert response.status_code == 422
+
+    def test_unknown_inference_precision_returns_422(self, client, mock_processor):
+        payload = {
+            "inputs": {
+                "data_path": "s3://x",
+                "model": "geneformer",
+                "inference_precision": "fp16",
+            }
+        }
+        response = client.post("/inference_job_runs", json=payload)
+        assert response.status_code == 422
+
     def test_all_valid_models_accepted(self, client, mock_processor):
         mock_processor.trigger_dag_run.return_value = make_job_run()
         for model_value in ("geneformer", "scgpt", "helix_mrna"):
@@ -118,19 +199,37 @@ class TestGetInferenceJobRun:
         client.get("/inference_job_runs/my-specific-run-id")
         mock_processor.get_dag_run_status.assert_called_once_with("my-specific-run-id")
 
+    def test_stale_state_sets_header_not_body_field(self, client, mock_processor):
+        stale_since = datetime(2024, 1, 3, tzinfo=timezone.utc)
+        mock_processor.get_dag_run_status.return_value = make_job_run(
+            stale_since=stale_since
+        )
+        response = client.get("/inference_job_runs/run-123")
+        assert response.headers["X-Airflow-Stale-Since"] == stale_since.isoformat()
+        assert "stale_since" not in response.json()
+
+    def test_fresh_state_has_no_stale_header(self, client, mock_processor):
+        mock_processor.get_dag_run_status.return_value = make_job_run()
+        response = client.get("/inference_job_runs/run-123")
+        assert "X-Airflow-Stale-Since" not in response.headers
+
 
 class TestGetInferenceJobRunResults:
     def test_returns_200_with_file_contents(self, client, mock_processor, tmp_path):
         result_file = tmp_path / "embeddings.csv"
         result_file.write_text("0.1,0.2,0.3")
-        mock_processor.get_dag_run_results.return_value = result_file
+        mock_processor.get_dag_run_results.return_value = ResultDownload(
+            path=result_file
+        )
         response = client.get("/inference_job_runs/run-123/results")
         assert response.status_code == 200
 
     def test_passes_job_run_id_to_processor(self, client, mock_processor, tmp_path):
         result_file = tmp_path / "embeddings.csv"
         result_file.write_text("0.1,0.2")
-        mock_processor.get_dag_run_results.return_value = result_file
+        mock_processor.get_dag_run_results.return_value = ResultDownload(
+            path=result_file
+        )
         client.get("/inference_job_runs/run-456/results")
         mock_processor.get_dag_run_results.assert_called_once_with("run-456")
 
@@ -142,3 +241,94 @@ class TestGetInferenceJobRunResults:
         )
         response = client.get("/inference_job_runs/run-123/results")
         assert response.status_code == 404
+
+    @pytest.mark.parametrize("result_rows,header", [(None, "2"), (1, "1")])
+    def test_partial_results_stream_published_rows(
+        self, client, mock_processor, result_rows, header
+    ):
+        mock_processor.get_dag_run_partial_results.return_value = (
+            ResultDownload(chunks=iter([b"0.1,0.2\n"]), size_bytes=8),
+            JobRunProgress(
+                stage="embedding",
+                cells_done=2,
+                updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                result_bytes=8,
+                result_rows=result_rows,
+            ),
+        )
+        response = client.get("/inference_job_runs/run-123/results?partial=true")
+        assert response.status_code == 200
+        assert response.text == "0.1,0.2\n"
+        assert response.headers["Content-Length"] == "8"
+        # Rows the task had embedded when it published the bytes
+        assert response.headers["X-Partial-Result-Rows"] == header
+
+    def test_partial_results_of_finished_run_serve_whole_file(
+        self, client, mock_processor, tmp_path
+    ):
+        result_file = tmp_path / "embeddings.csv"
+        result_file.write_text("0.1,0.2\n0.3,0.4\n")
+        mock_processor.get_dag_run_partial_results.return_value = (
+            ResultDownload(path=result_file),
+            None,
+        )
+        response = client.get("/inference_job_runs/run-123/results?partial=true")
+        assert response.text == "0.1,0.2\n0.3,0.4\n"
+        assert "X-Partial-Result-Rows" not in response.headers
+
+    def test_redirects_to_presigned_url(self, client, mock_processor):
+        url = "http://minio:9000/results/run-123/embeddings.csv?X-Amz-Signature=abc"
+        mock_processor.get_dag_run_results.return_value = ResultDownload(url=url)
+        response = client.get(
+            "/inference_job_runs/run-123/results", follow_redirects=False
+        )
+        assert response.status_code == 307
+        assert response.headers["Location"] == url
+
+    def test_streams_result_from_storage(self, client, mock_processor):
+        mock_processor.get_dag_run_results.return_value = ResultDownload(
+            chunks=iter([b"0.1,0.2\n", b"0.3,0.4\n"]), size_bytes=16
+        )
+        response = client.get("/inference_job_runs/run-123/results")
+        assert response.status_code == 200
+        assert response.text == "0.1,0.2\n0.3,0.4\n"
+        assert response.headers["Content-Length"] == "16"
+
+
+class TestGetInferenceJobRunSummary:
+    def test_returns_summary(self, client, mock_processor):
+        mock_processor.get_dag_run_summary.return_value = EmbeddingSummary(
+            rows=2,
+            dims=1,
+            nan_count=0,
+            rows_with_nan=0,
+            norm=SummaryStats(count=2, mean=1.5, variance=0.25, min=1.0, max=2.0),
+            dimensions=DimensionStats(
+                count=[2],
+                mean=[1.5],
+                variance=[0.25],
+                min=[1.0],
+                max=[2.0],
+                nan_count=[0],
+            ),
+        )
+        response = client.get("/inference_job_runs/run-123/summary")
+        assert response.status_code == 200
+        assert response.json()["dimensions"]["mean"] == [1.5]
+        mock_processor.get_dag_run_summary.assert_called_once_with("run-123")
+
+    def test_returns_202_while_summary_is_computed(self, client, mock_processor):
+        mock_processor.get_dag_run_summary.return_value = None
+        response = client.get("/inference_job_runs/run-123/summary")
+        assert response.status_code == 202
+        assert response.headers["Retry-After"] == "5"
+
+
+class TestGetInferenceJobRunProfile:
+    def test_returns_zip_attachment(self, client, mock_processor):
+        mock_processor.get_dag_run_profile.return_value = iter([b"PK\x03", b"\x04"])
+        response = client.get("/inference_job_runs/run-123/profile")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+        assert "run-123-profile.zip" in response.headers["content-disposition"]
+        assert response.content == b"PK\x03\x04"
@@ -0,0 +1,62 @@
+import io
+from collections import Counter
+
+import pytest
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+
+class FakeS3Client:
+    """The calls S3ResultStorage makes, on an in-memory bucket. Listings return
+    ``page_size`` keys per page, and ``calls`` counts the requests made."""
+
+    def __init__(self, objects, page_size=2):
+        self.objects = objects
+        self.page_size = page_size
+        self.calls = Counter()
+
+    def _object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return self.objects[(Bucket, Key)]
+
+    def head_object(self, Bucket, Key):
+        self.calls["head_object"] += 1
+        return {"ContentLength": len(self._object(Bucket, Key))}
+
+    def get_object(self, Bucket, Key):
+        self.calls["get_object"] += 1
+        data = self._object(Bucket, Key)
+        return {
+            "Body": StreamingBody(io.BytesIO(data), len(data)),
+            "ContentLength": len(data),
+        }
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls["put_object"] += 1
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def delete_object(self, Bucket, Key):
+        self.calls["delete_object"] += 1
+        self.objects.pop((Bucket, Key), None)
+
+    def get_paginator(self, operation_name):
+        assert operation_name == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix=""):
+        keys = sorted(
+            k for b, k in self.objects if b == Bucket and k.startswith(Prefix)
+        )
+        for start in range(0, max(len(keys), 1), self.page_size):
+            self.calls["list_objects_v2"] += 1
+            page = keys[start : start + self.page_size]
+            contents = [
+                {"Key": k, "Size": len(self.objects[(Bucket, k)])} for k in page
+            ]
+            yield {"Contents": contents} if contents else {}
+
+
+@pytest.fixture
+def fake_s3():
+    return FakeS3Client({})
@@ -0,0 +1,186 @@
+from unittest.mock import MagicMock
+
+import pytest
+from airflow_client.client import ApiException
+from fastapi import HTTPException
+
+from helical_workbench_backend.api.models.inference_job_run import (
+    InferenceJobRunInputs,
+    Model,
+)
+from helical_workbench_backend.clients.dag_run_client import AirflowUnavailableError
+from helical_workbench_backend.services.admission_controller import (
+    AdmissionControlConfig,
+    AdmissionController,
+)
+from helical_workbench_backend.services.cost_model import CostModel, ModelClass
+
+
+def make_dag_run_client(open_slots=1, slots=2):
+    dag_run_client = MagicMock()
+    pool = dag_run_client.get_pool.return_value
+    pool.open_slots = open_slots
+    pool.slots = slots
+    pool.running_slots = slots - open_slots
+    pool.queued_slots = 0
+    return dag_run_client
+
+
+@pytest.fixture
+def controller():
+    config = AdmissionControlConfig(
+        worker_memory_bytes=64 * 1024**3, default_n_cells=1000, default_n_genes=1000
+    )
+    return AdmissionController(CostModel(), config=config)
+
+
+class TestAdmissionController:
+    def test_routes_model_to_its_class_pool(self, controller):
+        dag_run_client = make_dag_run_client()
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.UCE)
+        decision = controller.admit(inputs, dag_run_client)
+        assert decision.model_class == ModelClass.LARGE
+        assert decision.pool == "inference_large"
+        dag_run_client.get_pool.assert_called_once_with("inference_large")
+
+    def test_no_queued_reason_when_pool_has_open_slots(self, controller):
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
+        decision = controller.admit(inputs, make_dag_run_client(open_slots=1))
+        assert decision.queued_reason is None
+
+    def test_queued_reason_when_pool_is_full(self, controller):
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
+        decision = controller.admit(inputs, make_dag_run_client(open_slots=0))
+        assert decision.queued_reason is not None
+        assert "inference_medium" in decision.queued_reason
+
+    def test_rejects_runs_larger_than_a_worker(self):
+        config = AdmissionControlConfig(worker_memory_bytes=1024**3)
+        controller = AdmissionController(CostModel(), config=config)
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.UCE)
+        with pytest.raises(HTTPException) as exc_info:
+            controller.admit(inputs, make_dag_run_client())
+        assert exc_info.value.status_code == 422
+
+    def test_runs_must_fit_a_slot_of_their_pool(self):
+        config = AdmissionControlConfig(worker_memory_bytes=16 * 1024**3)
+        controller = AdmissionController(CostModel(), config=config)
+        # About 9 GiB: fits the worker alone, but not next to another run
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.UCE)
+        decision = controller.admit(inputs, make_dag_run_client(slots=1))
+        assert decision.estimate.peak_memory_bytes > 8 * 1024**3
+        with pytest.raises(HTTPException) as exc_info:
+            controller.admit(inputs, make_dag_run_client(slots=2))
+        assert exc_info.value.status_code == 422
+        assert "inference_large" in exc_info.value.detail
+
+    def test_configured_slots_when_the_pool_cannot_be_read(self):
+        dag_run_client = MagicMock()
+        dag_run_client.get_pool.side_effect = ApiException(status=404)
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.UCE)
+        config = AdmissionControlConfig(large_pool_slots=1)
+        decision = AdmissionController(CostModel(), config=config).admit(
+            inputs, dag_run_client
+        )
+        assert decision.queued_reason is None
+        config = AdmissionControlConfig(large_pool_slots=2)
+        with pytest.raises(HTTPException):
+            AdmissionController(CostModel(), config=config).admit(
+                inputs, dag_run_client
+            )
+
+    def test_sample_size_and_genes_bound_the_estimate(self):
+        config = AdmissionControlConfig(worker_memory_bytes=10 * 1024**3)
+        controller = AdmissionController(CostModel(), config=config)
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.UCE)
+        with pytest.raises(HTTPException):
+            controller.admit(inputs, make_dag_run_client(slots=1))
+        sampled = inputs.model_copy(update={"sample_size": 100, "genes": ["CD4"]})
+        decision = controller.admit(sampled, make_dag_run_client(slots=1))
+        assert decision.estimate.peak_memory_bytes <= config.worker_memory_bytes
+
+    def test_recalibrates_on_finished_runs(self):
+        controller = AdmissionController.from_history([])
+        inputs = InferenceJobRunInputs(data_path="s3://atlas", model=Model.GENEPT)
+        controller.admit(inputs, make_dag_run_client())
+        controller.record_runs(
+            [
+                {
+                    "model": "genept",
+                    "data_path": "s3://atlas",
+                    "n_cells": 1_000_000,
+                    "n_genes": 30_000,
+                    "peak_memory_bytes": 8 * 1024**3,
+                    "runtime_seconds": 3600,
+                    "split": inputs.split,
+                    "source_n_cells": 1_000_000,
+                    "source_n_genes": 30_000,
+                },
+                {"model": "not-a-model"},
+            ]
+        )
+        # The atlas is now known to have a million cells
+        with pytest.raises(HTTPException):
+            controller.admit(inputs, make_dag_run_client())
+
+    def test_calibration_keeps_runs_recorded_meanwhile(self):
+        controller = AdmissionController.from_history([])
+        inputs = InferenceJobRunInputs(data_path="s3://atlas", model=Model.GENEPT)
+        controller.record_runs(
+            [
+                {
+                    "model": "genept",
+                    "data_path": "s3://atlas",
+                    "n_cells": 1_000_000,
+                    "n_genes": 30_000,
+                    "peak_memory_bytes": 8 * 1024**3,
+                    "runtime_seconds": 3600,
+                    "split": inputs.split,
+                    "source_n_cells": 1_000_000,
+                    "source_n_genes": 30_000,
+                }
+            ]
+        )
+        # Past runs read at startup finish loading after the run above was recorded
+        controller.calibrate([])
+        with pytest.raises(HTTPException):
+            controller.admit(inputs, make_dag_run_client())
+
+    def test_past_selection_does_not_shrink_the_dataset(self):
+        controller = AdmissionController.from_history([])
+        inputs = InferenceJobRunInputs(data_path="s3://atlas", model=Model.GENEPT)
+        controller.record_runs(
+            [
+                {
+                    "model": "genept",
+                    "data_path": "s3://atlas",
+                    "n_cells": 10,
+                    "n_genes": 1,
+                    "peak_memory_bytes": 1024**3,
+                    "runtime_seconds": 60,
+                    "split": inputs.split,
+                    "source_n_cells": 1_000_000,
+                    "source_n_genes": 30_000,
+                }
+            ]
+        )
+        with pytest.raises(HTTPException):
+            controller.admit(inputs, make_dag_run_client())
+        sampled = inputs.model_copy(update={"sample_fraction": 0.0001})
+        controller.admit(sampled, make_dag_run_client())
+
+    def test_missing_pool_does_not_block_admission(self, controller):
+        dag_run_client = MagicMock()
+        dag_run_client.get_pool.side_effect = ApiException(status=404)
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
+        decision = controller.admit(inputs, dag_run_client)
+        assert decision.queued_reason is None
+
+    def test_unreachable_airflow_does_not_block_admission(self, controller):
+        dag_run_client = MagicMock()
+        dag_run_client.get_pool.side_effect = AirflowUnavailableError(
+            "Airflow is unavailable: timed out", retry_after_seconds=30
+        )
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
+        decision = controller.admit(inputs, dag_run_client)
+        assert decision.queued_reason is None
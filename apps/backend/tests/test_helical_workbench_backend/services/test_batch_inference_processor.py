@@ -1,21 +1,33 @@
+import json
+import threading
+import time
 from datetime import datetime, timezone
 from unittest.mock import MagicMock
 
 import pytest
+from airflow_client.client.exceptions import ServiceException
 from fastapi import HTTPException
 
 from helical_workbench_backend.api.models.inference_job_run import (
     InferenceJobRun,
     InferenceJobRunCreate,
     InferenceJobRunInputs,
+    InferencePrecision,
+    InferenceRuntime,
     JobRunStatus,
     Model,
 )
+from helical_workbench_backend.clients.airflow_authenticated_client import (
+    AirflowTokenError,
+)
+from helical_workbench_backend.services import batch_inference_processor
 from helical_workbench_backend.services.batch_inference_processor import (
     INFERENCE_DAG_ID,
+    BatchInferenceProcessor,
     BatchInferenceProcessorConfig,
     _dag_run_to_job_run,
 )
+from helical_workbench_backend.services.result_storage import ResultDownload
 
 
 def make_dag_run_response(
@@ -76,6 +88,34 @@ class TestDagRunToJobRun:
         assert result.status == JobRunStatus.RUNNING
         assert result.result_path is None
 
+    def test_pending_state_sets_queued_reason_from_conf(self):
+        dag_run = make_dag_run_response(
+            state="queued",
+            conf={"admission": {"queued_reason": "Waiting for capacity"}},
+        )
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
+        result = _dag_run_to_job_run(dag_run, inputs)
+        assert result.queued_reason == "Waiting for capacity"
+
+    def test_running_state_keeps_queued_reason(self):
+        # Routed to its pool, but possibly still waiting for a slot
+        dag_run = make_dag_run_response(
+            state="running",
+            conf={"admission": {"queued_reason": "Waiting for capacity"}},
+        )
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
+        result = _dag_run_to_job_run(dag_run, inputs)
+        assert result.queued_reason == "Waiting for capacity"
+
+    def test_finished_state_drops_queued_reason(self):
+        dag_run = make_dag_run_response(
+            state="success",
+            conf={"admission": {"queued_reason": "Waiting for capacity"}},
+        )
+        inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
+        result = _dag_run_to_job_run(dag_run, inputs)
+        assert result.queued_reason is None
+
     def test_returns_inference_job_run_instance(self):
         dag_run = make_dag_run_response()
         inputs = InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
@@ -88,7 +128,19 @@ class TestDagRunToJobRun:
 def mock_dag_run_api(mocker):
     mock_api = MagicMock()
     mocker.patch(
-        "helical_workbench_backend.services.batch_inference_processor.DagRunApi",
+        "airflow_client.client.api.dag_run_api.DagRunApi",
+        return_value=mock_api,
+    )
+    return mock_api
+
+
+@pytest.fixture(autouse=True)
+def mock_pool_api(mocker):
+    mock_api = MagicMock()
+    mock_api.get_pool.return_value.open_slots = 1
+    mock_api.get_pool.return_value.slots = 1
+    mocker.patch(
+        "airflow_client.client.api.pool_api.PoolApi",
         return_value=mock_api,
     )
     return mock_api
@@ -157,6 +209,48 @@ class TestTriggerDagRun:
         assert isinstance(result, InferenceJobRun)
         assert result.status == JobRunStatus.PENDING
 
+    def test_conf_contains_admission_decision(self, processor, mock_dag_run_api):
+        mock_dag_run_api.trigger_dag_run.return_value = make_dag_run_response()
+        job_create = InferenceJobRunCreate(
+            inputs=InferenceJobRunInputs(data_path="s3://x", model=Model.UCE)
+        )
+        processor.trigger_dag_run(job_create)
+        body = mock_dag_run_api.trigger_dag_run.call_args.kwargs[
+            "trigger_dag_run_post_body"
+        ]
+        assert body.conf["model_class"] == "large"
+        assert body.conf["admission"]["pool"] == "inference_large"
+        assert body.conf["admission"]["estimate"]["peak_memory_bytes"] > 0
+
+    def test_returns_queued_reason_when_pool_is_full(
+        self, processor, mock_dag_run_api, mock_pool_api
+    ):
+        mock_pool_api.get_pool.return_value.open_slots = 0
+        mock_dag_run_api.trigger_dag_run.side_effect = (
+            lambda dag_id, trigger_dag_run_post_body, **_: make_dag_run_response(
+                state="queued", conf=trigger_dag_run_post_body.conf
+            )
+        )
+        job_create = InferenceJobRunCreate(
+            inputs=InferenceJobRunInputs(data_path="s3://x", model=Model.UCE)
+        )
+        result = processor.trigger_dag_run(job_create)
+        assert result.queued_reason is not None
+        assert "inference_large" in result.queued_reason
+
+    def test_raises_503_when_no_token_is_issued(self, mock_dag_run_api):
+        airflow_client = MagicMock()
+        airflow_client.__enter__.side_effect = AirflowTokenError("down", status=503)
+        processor = BatchInferenceProcessor(airflow_client=airflow_client)
+        job_create = InferenceJobRunCreate(
+            inputs=InferenceJobRunInputs(data_path="s3://x", model=Model.GENEFORMER)
+        )
+        with pytest.raises(HTTPException) as exc_info:
+            processor.trigger_dag_run(job_create)
+        assert exc_info.value.status_code == 503
+        assert "Retry-After" in exc_info.value.headers
+        mock_dag_run_api.trigger_dag_run.assert_not_called()
+
 
 class TestGetDagRunStatus:
     def test_reconstructs_inputs_from_conf(self, processor, mock_dag_run_api):
@@ -173,8 +267,31 @@ class TestGetDagRunStatus:
         mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
         processor.get_dag_run_status("run-789")
         mock_dag_run_api.get_dag_run.assert_called_once_with(
-            dag_id=INFERENCE_DAG_ID, dag_run_id="run-789"
+            dag_id=INFERENCE_DAG_ID, dag_run_id="run-789", _request_timeout=10.0
+        )
+
+    def test_reconstructs_ingestion_inputs_from_conf(self, processor, mock_dag_run_api):
+        dag_run = make_dag_run_response(
+            conf={
+                "data_path": "s3://x",
+                "model": "geneformer",
+                "split": "test[:5000]",
+                "streaming": False,
+                "sample_fraction": 0.25,
+                "seed": 7,
+                "inference_precision": "int8",
+                "runtime": "torchscript",
+                "model_class": "medium",
+            }
         )
+        mock_dag_run_api.get_dag_run.return_value = dag_run
+        result = processor.get_dag_run_status("run-123")
+        assert result.inputs.split == "test[:5000]"
+        assert result.inputs.streaming is False
+        assert result.inputs.sample_fraction == 0.25
+        assert result.inputs.seed == 7
+        assert result.inputs.inference_precision == InferencePrecision.INT8
+        assert result.inputs.runtime == InferenceRuntime.TORCHSCRIPT
 
     def test_missing_conf_uses_empty_defaults(self, processor, mock_dag_run_api):
         dag_run = make_dag_run_response()
@@ -183,6 +300,27 @@ class TestGetDagRunStatus:
         result = processor.get_dag_run_status("run-123")
         assert result.inputs.data_path == ""
 
+    def test_serves_stale_state_when_airflow_is_down(
+        self, processor, mock_dag_run_api, mocker
+    ):
+        mocker.patch("time.sleep")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+        processor.get_dag_run_status("run-123")
+        mock_dag_run_api.get_dag_run.side_effect = ServiceException(status=503)
+        result = processor.get_dag_run_status("run-123")
+        assert result.status == JobRunStatus.SUCCEEDED
+        assert result.stale_since is not None
+
+    def test_raises_503_when_airflow_is_down_and_nothing_cached(
+        self, processor, mock_dag_run_api, mocker
+    ):
+        mocker.patch("time.sleep")
+        mock_dag_run_api.get_dag_run.side_effect = ServiceException(status=503)
+        with pytest.raises(HTTPException) as exc_info:
+            processor.get_dag_run_status("run-123")
+        assert exc_info.value.status_code == 503
+        assert "Retry-After" in exc_info.value.headers
+
 
 class TestListDagRuns:
     def test_returns_empty_list_when_no_runs(self, processor, mock_dag_run_api):
@@ -276,7 +414,26 @@ class TestGetDagRunResults:
         mock_dag_run_api.get_dag_run.return_value = dag_run
 
         result = processor.get_dag_run_results("run-123")
-        assert result == tmp_path / "run-123" / "embeddings.csv"
+        assert result.path == tmp_path / "run-123" / "embeddings.csv"
+
+    def test_serves_result_from_storage(self, mock_dag_run_api, tmp_path):
+        from helical_workbench_backend.services.batch_inference_processor import (
+            BatchInferenceProcessor,
+        )
+
+        storage = MagicMock()
+        storage.size.return_value = 7
+        # No metrics, progress or catalogue stored yet
+        storage.read.side_effect = FileNotFoundError
+        storage.download.return_value = ResultDownload(url="http://minio/presigned")
+        config = BatchInferenceProcessorConfig(results_dir=str(tmp_path))
+        processor = BatchInferenceProcessor(
+            airflow_client=MagicMock(), config=config, result_storage=storage
+        )
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+
+        assert processor.get_dag_run_results("run-123").url == "http://minio/presigned"
+        storage.download.assert_called_once_with("run-123/embeddings.csv")
 
     def test_raises_404_when_job_not_succeeded(self, mock_dag_run_api, tmp_path):
         from helical_workbench_backend.services.batch_inference_processor import (
@@ -307,3 +464,313 @@ class TestGetDagRunResults:
         with pytest.raises(HTTPException) as exc_info:
             processor.get_dag_run_results("run-123")
         assert exc_info.value.status_code == 404
+
+
+def write_progress(results_dir, dag_run_id, result_bytes=4, cells_done=1):
+    run_dir = results_dir / dag_run_id
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "progress.json").write_text(
+        json.dumps(
+            {
+                "stage": "embedding",
+                "cells_done": cells_done,
+                "cells_total": 10,
+                "cells_per_second": 2.0,
+                "eta_seconds": 4.5,
+                "result_bytes": result_bytes,
+                "updated_at": "2024-01-01T00:00:00+00:00",
+            }
+        )
+    )
+
+
+class TestProgress:
+    @pytest.fixture
+    def processor(self, tmp_path):
+        from helical_workbench_backend.services.batch_inference_processor import (
+            BatchInferenceProcessor,
+        )
+
+        config = BatchInferenceProcessorConfig(results_dir=str(tmp_path))
+        return BatchInferenceProcessor(airflow_client=MagicMock(), config=config)
+
+    def test_running_run_reports_progress(self, processor, mock_dag_run_api, tmp_path):
+        write_progress(tmp_path, "run-123")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            state="running"
+        )
+        result = processor.get_dag_run_status("run-123")
+        assert result.progress.cells_done == 1
+        assert result.progress.eta_seconds == 4.5
+
+    def test_running_run_without_progress_file(self, processor, mock_dag_run_api):
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            state="running"
+        )
+        assert processor.get_dag_run_status("run-123").progress is None
+
+    def test_queued_reason_until_the_task_reports_progress(
+        self, processor, mock_dag_run_api, tmp_path
+    ):
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            state="running",
+            conf={"admission": {"queued_reason": "Waiting for capacity"}},
+        )
+        result = processor.get_dag_run_status("run-123")
+        assert result.queued_reason == "Waiting for capacity"
+        write_progress(tmp_path, "run-123")
+        assert processor.get_dag_run_status("run-123").queued_reason is None
+
+    def test_finished_run_has_no_progress(self, processor, mock_dag_run_api, tmp_path):
+        write_progress(tmp_path, "run-123")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+        assert processor.get_dag_run_status("run-123").progress is None
+
+    def test_partial_results_of_running_run(
+        self, processor, mock_dag_run_api, tmp_path
+    ):
+        write_progress(tmp_path, "run-123", result_bytes=8, cells_done=1)
+        (tmp_path / "run-123" / "embeddings.csv").write_text("1.0,2.0\n3.0,")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            state="running",
+            conf={
+                "data_path": "s3://x",
+                "model": "geneformer",
+                "results_path": "run-123/embeddings.csv",
+            },
+        )
+        download, progress = processor.get_dag_run_partial_results("run-123")
+        assert b"".join(download.chunks) == b"1.0,2.0\n"
+        assert progress.result_bytes == 8
+
+    def test_partial_results_404_before_first_chunk(self, processor, mock_dag_run_api):
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            state="running"
+        )
+        with pytest.raises(HTTPException) as exc_info:
+            processor.get_dag_run_partial_results("run-123")
+        assert exc_info.value.status_code == 404
+
+
+class TestExpiredResults:
+    @pytest.fixture
+    def catalogue(self):
+        catalogue = MagicMock()
+        catalogue.is_expired.side_effect = lambda dag_run_id: dag_run_id == "expired"
+        return catalogue
+
+    @pytest.fixture
+    def processor(self, tmp_path, catalogue):
+        from helical_workbench_backend.services.batch_inference_processor import (
+            BatchInferenceProcessor,
+        )
+
+        config = BatchInferenceProcessorConfig(results_dir=str(tmp_path))
+        return BatchInferenceProcessor(
+            airflow_client=MagicMock(), config=config, results_catalogue=catalogue
+        )
+
+    def test_evicted_run_is_expired(self, processor, mock_dag_run_api):
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            dag_run_id="expired"
+        )
+        result = processor.get_dag_run_status("expired")
+        assert result.status == JobRunStatus.EXPIRED
+        assert result.result_path is None
+
+    def test_results_of_expired_run_are_gone(self, processor, mock_dag_run_api):
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            dag_run_id="expired"
+        )
+        with pytest.raises(HTTPException) as exc_info:
+            processor.get_dag_run_results("expired")
+        assert exc_info.value.status_code == 410
+
+    def test_results_are_located_through_the_catalogue(
+        self, processor, mock_dag_run_api, catalogue, tmp_path
+    ):
+        catalogue.lookup.return_value = MagicMock(
+            path="run-123/embeddings.csv", expired_at=None
+        )
+        (tmp_path / "run-123").mkdir()
+        (tmp_path / "run-123" / "embeddings.csv").write_text("1.0\n")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+        assert processor.get_dag_run_results("run-123").path == (
+            tmp_path / "run-123" / "embeddings.csv"
+        )
+        catalogue.lookup.assert_called_once_with("run-123", "run-123/embeddings.csv")
+
+    def test_expired_filter_lists_only_expired_runs(self, processor, mock_dag_run_api):
+        mock_dag_run_api.get_dag_runs.return_value = MagicMock(
+            dag_runs=[
+                make_dag_run_response(dag_run_id="expired"),
+                make_dag_run_response(dag_run_id="kept"),
+            ]
+        )
+        result = processor.list_dag_runs(status="expired")
+        assert [r.id for r in result] == ["expired"]
+        assert mock_dag_run_api.get_dag_runs.call_args.kwargs["state"] == ["success"]
+
+
+def wait_for_summary(processor, dag_run_id):
+    """Polls as a client would after a 202"""
+    for _ in range(500):
+        summary = processor.get_dag_run_summary(dag_run_id)
+        if summary is not None:
+            return summary
+        time.sleep(0.01)
+    raise TimeoutError(dag_run_id)
+
+
+class TestSummary:
+    @pytest.fixture(autouse=True)
+    def summary_futures(self, monkeypatch):
+        futures = {}
+        monkeypatch.setattr(batch_inference_processor, "_summary_futures", futures)
+        return futures
+
+    @pytest.fixture
+    def catalogue(self):
+        catalogue = MagicMock()
+        catalogue.is_expired.return_value = False
+        catalogue.lookup.return_value = MagicMock(
+            path="run-123/embeddings.csv", expired_at=None
+        )
+        return catalogue
+
+    @pytest.fixture
+    def processor(self, tmp_path, catalogue):
+        from helical_workbench_backend.services.batch_inference_processor import (
+            BatchInferenceProcessor,
+        )
+
+        config = BatchInferenceProcessorConfig(results_dir=str(tmp_path))
+        return BatchInferenceProcessor(
+            airflow_client=MagicMock(), config=config, results_catalogue=catalogue
+        )
+
+    def test_computes_and_caches_summary_of_older_result(
+        self, processor, mock_dag_run_api, tmp_path
+    ):
+        (tmp_path / "run-123").mkdir()
+        (tmp_path / "run-123" / "embeddings.csv").write_text("1.0,2.0\n3.0,4.0\n")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+
+        assert processor.get_dag_run_summary("run-123") is None
+        summary = wait_for_summary(processor, "run-123")
+        assert summary.rows == 2
+        assert summary.dimensions.mean == [2.0, 3.0]
+
+        (tmp_path / "run-123" / "embeddings.csv").unlink()
+        assert processor.get_dag_run_summary("run-123") == summary
+
+    def test_concurrent_requests_share_one_computation(
+        self, processor, mock_dag_run_api, tmp_path, monkeypatch
+    ):
+        (tmp_path / "run-123").mkdir()
+        (tmp_path / "run-123" / "embeddings.csv").write_text("1.0\n")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+        release = threading.Event()
+        calls = []
+        summarize_lines = batch_inference_processor.summarize_lines
+
+        def blocking_summarize(lines):
+            calls.append(1)
+            release.wait(timeout=5)
+            return summarize_lines(lines)
+
+        monkeypatch.setattr(
+            batch_inference_processor, "summarize_lines", blocking_summarize
+        )
+        assert processor.get_dag_run_summary("run-123") is None
+        assert processor.get_dag_run_summary("run-123") is None
+        release.set()
+        assert wait_for_summary(processor, "run-123").rows == 1
+        assert len(calls) == 1
+
+    def test_missing_result_is_reported_then_retried(
+        self, processor, mock_dag_run_api, tmp_path
+    ):
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+        with pytest.raises(HTTPException) as exc_info:
+            wait_for_summary(processor, "run-123")
+        assert exc_info.value.status_code == 404
+
+        (tmp_path / "run-123").mkdir()
+        (tmp_path / "run-123" / "embeddings.csv").write_text("1.0\n")
+        assert wait_for_summary(processor, "run-123").rows == 1
+
+    def test_malformed_result_is_reported(self, processor, mock_dag_run_api, tmp_path):
+        (tmp_path / "run-123").mkdir()
+        (tmp_path / "run-123" / "embeddings.csv").write_text("1.0,2.0\n3.0\n")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+        with pytest.raises(HTTPException) as exc_info:
+            wait_for_summary(processor, "run-123")
+        assert exc_info.value.status_code == 422
+        assert "Row 1 has 1 values" in exc_info.value.detail
+
+    def test_summary_of_expired_run_is_kept(
+        self, processor, mock_dag_run_api, catalogue, tmp_path
+    ):
+        (tmp_path / "run-123").mkdir()
+        (tmp_path / "run-123" / "embeddings.csv").write_text("1.0\n")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+        wait_for_summary(processor, "run-123")
+
+        catalogue.is_expired.return_value = True
+        assert processor.get_dag_run_summary("run-123").rows == 1
+
+    def test_expired_run_without_summary_is_gone(
+        self, processor, mock_dag_run_api, catalogue
+    ):
+        catalogue.is_expired.return_value = True
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response()
+        with pytest.raises(HTTPException) as exc_info:
+            processor.get_dag_run_summary("run-123")
+        assert exc_info.value.status_code == 410
+
+    def test_raises_404_while_running(self, processor, mock_dag_run_api):
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            state="running"
+        )
+        with pytest.raises(HTTPException) as exc_info:
+            processor.get_dag_run_summary("run-123")
+        assert exc_info.value.status_code == 404
+
+
+class TestProfile:
+    @pytest.fixture
+    def processor(self, tmp_path):
+        from helical_workbench_backend.services.batch_inference_processor import (
+            BatchInferenceProcessor,
+        )
+
+        config = BatchInferenceProcessorConfig(results_dir=str(tmp_path))
+        return BatchInferenceProcessor(airflow_client=MagicMock(), config=config)
+
+    def test_returns_archive_of_profile_artefacts(
+        self, processor, mock_dag_run_api, tmp_path
+    ):
+        (tmp_path / "run-123" / "profile").mkdir(parents=True)
+        (tmp_path / "run-123" / "profile" / "cprofile.txt").write_text("stats")
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(
+            state="running", conf={"profile": True}
+        )
+        archive = b"".join(processor.get_dag_run_profile("run-123"))
+        assert archive.startswith(b"PK")
+
+    @pytest.mark.parametrize(
+        "conf,detail",
+        [
+            ({}, "Run was not profiled"),
+            ({"profile": True}, "Profile not available yet"),
+        ],
+    )
+    def test_raises_404_without_artefacts(
+        self, processor, mock_dag_run_api, conf, detail
+    ):
+        mock_dag_run_api.get_dag_run.return_value = make_dag_run_response(conf=conf)
+        with pytest.raises(HTTPException) as exc_info:
+            processor.get_dag_run_profile("run-123")
+        assert exc_info.value.status_code == 404
+        assert exc_info.value.detail == detail
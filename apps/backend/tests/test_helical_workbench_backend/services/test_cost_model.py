@@ -0,0 +1,110 @@
+import json
+
+from helical_workbench_backend.api.models.inference_job_run import Model
+from helical_workbench_backend.services.cost_model import (
+    DEFAULT_COEFFICIENTS,
+    SAFETY_FACTOR,
+    CostModel,
+    ModelClass,
+    RunMetrics,
+    load_run_metrics,
+)
+from helical_workbench_backend.services.result_storage import LocalResultStorage
+
+
+def make_metrics(n_cells, peak_memory_bytes, runtime_seconds, **kwargs):
+    defaults = dict(
+        model=Model.GENEFORMER,
+        data_path="helical-ai/yolksac_human",
+        n_cells=n_cells,
+        n_genes=0,
+        peak_memory_bytes=peak_memory_bytes,
+        runtime_seconds=runtime_seconds,
+    )
+    defaults.update(kwargs)
+    return RunMetrics(**defaults)
+
+
+class TestCostModel:
+    def test_uncalibrated_model_uses_class_priors(self):
+        prior = DEFAULT_COEFFICIENTS[ModelClass.LARGE]
+        estimate = CostModel().estimate(Model.UCE, n_cells=1000, n_genes=0)
+        expected = prior.base_memory_bytes + 1000 * prior.memory_bytes_per_cell
+        assert estimate.peak_memory_bytes == int(expected)
+
+    def test_larger_datasets_cost_more(self):
+        cost_model = CostModel()
+        small = cost_model.estimate(Model.GENEFORMER, n_cells=100, n_genes=1000)
+        large = cost_model.estimate(Model.GENEFORMER, n_cells=10_000, n_genes=1000)
+        assert large.peak_memory_bytes > small.peak_memory_bytes
+        assert large.runtime_seconds > small.runtime_seconds
+
+    def test_calibrate_fits_observed_runs(self):
+        history = [
+            make_metrics(1000, peak_memory_bytes=2_000_000, runtime_seconds=20),
+            make_metrics(3000, peak_memory_bytes=4_000_000, runtime_seconds=40),
+        ]
+        cost_model = CostModel.calibrate(history)
+        coefficients = cost_model.coefficients(Model.GENEFORMER)
+        assert coefficients.memory_bytes_per_cell == 1000 * SAFETY_FACTOR
+        assert coefficients.base_memory_bytes == 1_000_000 * SAFETY_FACTOR
+        assert coefficients.runtime_seconds_per_cell == 0.01 * SAFETY_FACTOR
+
+    def test_calibrate_with_single_run_keeps_prior_slope(self):
+        prior = DEFAULT_COEFFICIENTS[ModelClass.MEDIUM]
+        history = [make_metrics(1000, peak_memory_bytes=10**9, runtime_seconds=60)]
+        coefficients = CostModel.calibrate(history).coefficients(Model.GENEFORMER)
+        assert coefficients.memory_bytes_per_cell == (
+            prior.memory_bytes_per_cell * SAFETY_FACTOR
+        )
+
+    def test_calibrate_only_affects_observed_models(self):
+        history = [make_metrics(1000, peak_memory_bytes=10**9, runtime_seconds=60)]
+        cost_model = CostModel.calibrate(history)
+        assert (
+            cost_model.coefficients(Model.UCE) == DEFAULT_COEFFICIENTS[ModelClass.LARGE]
+        )
+
+    def test_calibrate_records_source_dataset_shapes(self):
+        history = [
+            make_metrics(
+                100,
+                peak_memory_bytes=10**9,
+                runtime_seconds=60,
+                n_genes=10,
+                split="train[:10%]",
+                source_n_cells=1234,
+                source_n_genes=5678,
+            )
+        ]
+        cost_model = CostModel.calibrate(history)
+        shape = cost_model.dataset_shape("helical-ai/yolksac_human", "train[:10%]")
+        assert shape == (1234, 5678)
+        assert cost_model.dataset_shape("helical-ai/yolksac_human", "train") is None
+        assert cost_model.dataset_shape("unknown", "train[:10%]") is None
+
+    def test_calibrate_ignores_runs_without_a_source_shape(self):
+        history = [
+            make_metrics(
+                1234, peak_memory_bytes=10**9, runtime_seconds=60, split="train"
+            )
+        ]
+        cost_model = CostModel.calibrate(history)
+        assert cost_model.dataset_shape("helical-ai/yolksac_human", "train") is None
+
+
+class TestLoadRunMetrics:
+    def test_reads_metrics_files_from_run_directories(self, tmp_path):
+        metrics = make_metrics(100, peak_memory_bytes=10**9, runtime_seconds=10)
+        (tmp_path / "run-1").mkdir()
+        (tmp_path / "run-1" / "metrics.json").write_text(metrics.model_dump_json())
+        (tmp_path / "run-1" / "profile").mkdir()
+        (tmp_path / "run-1" / "profile" / "metrics.json").write_text("{}")
+        assert load_run_metrics(LocalResultStorage(tmp_path)) == [metrics]
+
+    def test_skips_malformed_files(self, tmp_path):
+        (tmp_path / "run-1").mkdir()
+        (tmp_path / "run-1" / "metrics.json").write_text("not json")
+        (tmp_path / "run-2").mkdir()
+        (tmp_path / "run-2" / "metrics.json").write_text(json.dumps({"model": "uce"}))
+        assert load_run_metrics(LocalResultStorage(tmp_path)) == []
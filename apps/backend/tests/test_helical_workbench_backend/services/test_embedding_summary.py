@@ -0,0 +1,103 @@
+import math
+import random
+
+import pytest
+
+from helical_workbench_backend.services.embedding_summary import (
+    Moments,
+    SummaryAccumulator,
+    summarize_lines,
+)
+
+
+def naive_stats(values):
+    mean = sum(values) / len(values)
+    return mean, sum((v - mean) ** 2 for v in values) / len(values)
+
+
+@pytest.fixture
+def rows():
+    rng = random.Random(0)
+    return [[rng.gauss(1000, 3) for _ in range(4)] for _ in range(257)]
+
+
+class TestMoments:
+    def test_matches_two_pass_computation(self, rows):
+        values = [row[0] for row in rows]
+        moments = Moments.of(values)
+        mean, variance = naive_stats(values)
+        assert moments.mean == pytest.approx(mean, rel=1e-12)
+        assert moments.m2 / moments.count == pytest.approx(variance, rel=1e-9)
+
+    def test_merge_matches_single_pass(self, rows):
+        values = [row[0] for row in rows]
+        merged = Moments()
+        for chunk in (values[:1], values[1:100], values[100:]):
+            merged.merge(Moments.of(chunk))
+        single = Moments.of(values)
+        assert merged.count == single.count
+        assert merged.mean == pytest.approx(single.mean, rel=1e-12)
+        assert merged.m2 == pytest.approx(single.m2, rel=1e-9)
+        assert (merged.min, merged.max) == (single.min, single.max)
+
+    def test_ignores_nans(self):
+        moments = Moments.of([1.0, math.nan, 3.0])
+        assert (moments.count, moments.mean, moments.m2) == (2, 2.0, 2.0)
+
+    def test_empty_has_no_stats(self):
+        stats = Moments.of([math.nan]).stats()
+        assert stats.count == 0
+        assert stats.mean is None
+
+
+class TestSummaryAccumulator:
+    def test_batches_combine_exactly(self, rows):
+        batched = SummaryAccumulator()
+        for start in range(0, len(rows), 100):
+            batched.update(rows[start : start + 100])
+        whole = SummaryAccumulator()
+        whole.update(rows)
+
+        a, b = batched.summary(), whole.summary()
+        assert a.rows == b.rows == 257
+        assert a.dimensions.mean == pytest.approx(b.dimensions.mean, rel=1e-12)
+        assert a.dimensions.variance == pytest.approx(b.dimensions.variance, rel=1e-9)
+        assert a.norm.mean == pytest.approx(b.norm.mean, rel=1e-12)
+
+    def test_counts_nans_and_excludes_their_rows_from_norms(self):
+        accumulator = SummaryAccumulator()
+        accumulator.update([[3.0, 4.0], [math.nan, 1.0], [0.0, 0.0]])
+        summary = accumulator.summary()
+        assert (summary.rows, summary.dims) == (3, 2)
+        assert (summary.nan_count, summary.rows_with_nan) == (1, 1)
+        assert summary.dimensions.nan_count == [1, 0]
+        assert summary.norm.count == 2
+        assert summary.norm.max == 5.0
+
+    def test_rejects_summaries_of_different_dimensions(self):
+        accumulator = SummaryAccumulator()
+        accumulator.update([[1.0, 2.0]])
+        with pytest.raises(ValueError):
+            accumulator.update([[1.0, 2.0, 3.0]])
+
+    @pytest.mark.parametrize("batch", [[[1.0, 2.0], [3.0]], [[1.0], [2.0, 3.0]]])
+    def test_rejects_rows_of_different_lengths(self, batch):
+        accumulator = SummaryAccumulator()
+        accumulator.update([[0.0, 0.0]])
+        with pytest.raises(ValueError, match="Row 2 has"):
+            accumulator.update(batch)
+
+
+def test_summarize_lines():
+    lines = [
+        "1.000000000000000000e+00,2.000000000000000000e+00\n",
+        "3.0,nan\n",
+        "\n",
+        "5.0,6.0\n",
+    ]
+    summary = summarize_lines(lines, batch_rows=2)
+    assert summary.rows == 3
+    assert summary.dimensions.mean == [3.0, 4.0]
+    assert summary.dimensions.variance == pytest.approx([8 / 3, 4.0])
+    assert summary.dimensions.min == [1.0, 2.0]
+    assert summary.rows_with_nan == 1
@@ -0,0 +1,171 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from helical_workbench_backend.services.result_storage import (
+    LocalResultStorage,
+    ResultStorage,
+    ResultStorageConfig,
+    S3ResultStorage,
+    StoredObject,
+    make_result_storage,
+)
+
+
+@pytest.fixture
+def s3_client(fake_s3):
+    fake_s3.objects[("results", "prod/run-1/embeddings.csv")] = b"1.0,2.0\n3.0,4.0"
+    return fake_s3
+
+
+def make_s3_storage(client, **kwargs):
+    return S3ResultStorage("results", prefix="prod/", client=client, **kwargs)
+
+
+class TestLocalResultStorage:
+    def test_serves_local_file(self, tmp_path):
+        (tmp_path / "run-1").mkdir()
+        (tmp_path / "run-1" / "embeddings.csv").write_text("1.0\n")
+        storage = LocalResultStorage(tmp_path)
+        download = storage.download("run-1/embeddings.csv")
+        assert download.path == tmp_path / "run-1" / "embeddings.csv"
+        assert storage.size("run-1/embeddings.csv") == 4
+
+    def test_missing_result(self, tmp_path):
+        storage = LocalResultStorage(tmp_path)
+        assert storage.size("run-1/embeddings.csv") is None
+        with pytest.raises(FileNotFoundError):
+            storage.download("run-1/embeddings.csv")
+        with pytest.raises(FileNotFoundError):
+            storage.iter_bytes("run-1/embeddings.csv")
+
+    def test_lists_reads_and_writes_objects(self, tmp_path):
+        storage = LocalResultStorage(tmp_path)
+        storage.write("run-1/metrics.json", b"{}")
+        storage.write("run-1/profile/cprofile.txt", b"stats")
+        storage.write("run-10/metrics.json", b"{}")
+        storage.write("run-1/metrics.json", b'{"model": "uce"}')
+
+        assert sorted(storage.list_objects("run-1/")) == [
+            StoredObject("run-1/metrics.json", 16),
+            StoredObject("run-1/profile/cprofile.txt", 5),
+        ]
+        assert len(list(storage.list_objects())) == 3
+        assert list(storage.list_objects("run-2/")) == []
+        assert storage.read("run-1/metrics.json") == b'{"model": "uce"}'
+        with pytest.raises(FileNotFoundError):
+            storage.read("run-2/metrics.json")
+
+    def test_delete_removes_emptied_directories(self, tmp_path):
+        storage = LocalResultStorage(tmp_path)
+        storage.write("run-1/metrics.json", b"{}")
+        storage.write("run-1/profile/cprofile.txt", b"stats")
+        storage.delete("run-1/profile/cprofile.txt")
+        assert not (tmp_path / "run-1" / "profile").exists()
+        assert (tmp_path / "run-1" / "metrics.json").exists()
+
+    def test_partial_download_serves_prefix_of_result(self, tmp_path):
+        (tmp_path / "run-1").mkdir()
+        (tmp_path / "run-1" / "embeddings.csv").write_text("0.1,0.2\n0.3,")
+        storage = LocalResultStorage(tmp_path)
+        download = storage.partial_download("run-1/embeddings.csv", 8)
+        assert download.size_bytes == 8
+        assert b"".join(download.chunks) == b"0.1,0.2\n"
+        with pytest.raises(FileNotFoundError):
+            storage.partial_download("run-2/embeddings.csv", 8)
+
+
+class TestS3ResultStorage:
+    def test_size_and_delete(self, s3_client):
+        storage = make_s3_storage(s3_client)
+        assert storage.size("run-1/embeddings.csv") == 15
+        storage.delete("run-1/embeddings.csv")
+        assert storage.size("run-1/embeddings.csv") is None
+
+    def test_streams_object(self, s3_client):
+        storage = make_s3_storage(s3_client, redirect=False)
+        download = storage.download("run-1/embeddings.csv")
+        assert download.url is None
+        assert download.size_bytes == 15
+        assert b"".join(download.chunks) == b"1.0,2.0\n3.0,4.0"
+
+    def test_lines_span_chunks(self, s3_client):
+        storage = make_s3_storage(s3_client)
+        storage.iter_bytes = lambda key: iter([b"1.0,2", b".0\n3.0,", b"4.0"])
+        assert list(storage.iter_lines("run-1/embeddings.csv")) == [
+            "1.0,2.0",
+            "3.0,4.0",
+        ]
+
+    def test_missing_object(self, s3_client):
+        storage = make_s3_storage(s3_client, redirect=False)
+        with pytest.raises(FileNotFoundError):
+            storage.download("run-2/embeddings.csv")
+
+    def test_presigns_for_public_endpoint(self, s3_client, monkeypatch):
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "minio")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "minio-secret")
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        storage = make_s3_storage(
+            s3_client,
+            public_endpoint_url="http://localhost:9000",
+            presigned_url_ttl_seconds=60,
+        )
+        url = urlparse(storage.download("run-1/embeddings.csv").url)
+        assert url.netloc == "localhost:9000"
+        assert url.path == "/results/prod/run-1/embeddings.csv"
+        assert parse_qs(url.query)["X-Amz-Expires"] == ["60"]
+
+    def test_lists_every_page_under_prefix(self, s3_client):
+        s3_client.objects[("results", "prod/run-1/metrics.json")] = b"{}"
+        s3_client.objects[("results", "prod/run-2/metrics.json")] = b"{}"
+        s3_client.objects[("results", "other/run-3/metrics.json")] = b"{}"
+        storage = make_s3_storage(s3_client)
+        assert sorted(storage.list_objects()) == [
+            StoredObject("run-1/embeddings.csv", 15),
+            StoredObject("run-1/metrics.json", 2),
+            StoredObject("run-2/metrics.json", 2),
+        ]
+        assert s3_client.calls["list_objects_v2"] == 2
+        assert [o.key for o in storage.list_objects("run-2/")] == ["run-2/metrics.json"]
+
+    def test_reads_and_writes_objects(self, s3_client):
+        storage = make_s3_storage(s3_client)
+        storage.write("catalogue.json", b"[]")
+        assert s3_client.objects[("results", "prod/catalogue.json")] == b"[]"
+        assert storage.read("catalogue.json") == b"[]"
+        with pytest.raises(FileNotFoundError):
+            storage.read("run-2/metrics.json")
+
+    def test_partial_download_streams_published_parts(self, s3_client):
+        parts = {"000000000000000": b"0.1,0.2\n", "000000000000008": b"0.3,0.4\n0.5"}
+        for offset, data in parts.items():
+            key = f"prod/run-2/embeddings.csv.parts/{offset}"
+            s3_client.objects[("results", key)] = data
+        storage = make_s3_storage(s3_client)
+
+        download = storage.partial_download("run-2/embeddings.csv", 16)
+        assert download.size_bytes == 16
+        assert b"".join(download.chunks) == b"0.1,0.2\n0.3,0.4\n"
+        # Never more than was published
+        download = storage.partial_download("run-2/embeddings.csv", 100)
+        assert download.size_bytes == 19
+        with pytest.raises(FileNotFoundError):
+            storage.partial_download("run-1/embeddings.csv", 8)
+
+
+def test_s3_storage_requires_bucket(tmp_path):
+    with pytest.raises(ValueError):
+        make_result_storage(ResultStorageConfig(backend="s3"), tmp_path)
+
+
+def test_storage_backends_implement_every_operation():
+    with pytest.raises(TypeError):
+        ResultStorage()
+
+    class Partial(ResultStorage):
+        def size(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
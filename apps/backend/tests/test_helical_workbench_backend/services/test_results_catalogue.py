@@ -0,0 +1,330 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from helical_workbench_backend.services.result_storage import (
+    LocalResultStorage,
+    S3ResultStorage,
+)
+from helical_workbench_backend.services.results_catalogue import (
+    CATALOGUE_FILENAME,
+    ResultsCatalogue,
+    ResultsRetentionConfig,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+def write_result(results_dir, dag_run_id, size=10, with_metrics=True):
+    run_dir = results_dir / dag_run_id
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "embeddings.csv").write_bytes(b"x" * size)
+    (run_dir / "progress.json").write_text("{}")
+    if with_metrics:
+        (run_dir / "metrics.json").write_text(
+            json.dumps(
+                {
+                    "model": "geneformer",
+                    "result": {
+                        "path": f"{dag_run_id}/embeddings.csv",
+                        "format": "csv",
+                        "bytes": size,
+                        "rows": 2,
+                        "dims": 512,
+                        "sha256": "abc",
+                    },
+                }
+            )
+        )
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_catalogue(tmp_path, clock, **config):
+    return ResultsCatalogue(
+        LocalResultStorage(tmp_path),
+        config=ResultsRetentionConfig(**config),
+        clock=clock,
+    )
+
+
+class TestLookup:
+    def test_reads_result_recorded_in_metrics(self, tmp_path, clock):
+        write_result(tmp_path, "run-1", size=10)
+        entry = make_catalogue(tmp_path, clock).lookup("run-1")
+        assert entry.path == "run-1/embeddings.csv"
+        assert entry.size_bytes == 10
+        assert (entry.format, entry.rows, entry.dims, entry.sha256) == (
+            "csv",
+            2,
+            512,
+            "abc",
+        )
+
+    def test_falls_back_to_result_path_without_metrics(self, tmp_path, clock):
+        (tmp_path / "custom").mkdir()
+        (tmp_path / "custom" / "out.csv").write_text("1.0")
+        entry = make_catalogue(tmp_path, clock).lookup("run-1", "custom/out.csv")
+        assert entry.path == "custom/out.csv"
+        assert entry.format == "csv"
+        assert entry.rows is None
+
+    def test_missing_result_returns_none(self, tmp_path, clock):
+        assert make_catalogue(tmp_path, clock).lookup("run-1") is None
+
+    def test_second_lookup_does_not_read_the_filesystem(self, tmp_path, clock):
+        write_result(tmp_path, "run-1")
+        catalogue = make_catalogue(tmp_path, clock)
+        catalogue.lookup("run-1")
+        (tmp_path / "run-1" / "embeddings.csv").unlink()
+        assert catalogue.lookup("run-1") is not None
+
+    def test_records_last_access(self, tmp_path, clock):
+        write_result(tmp_path, "run-1")
+        catalogue = make_catalogue(tmp_path, clock)
+        catalogue.lookup("run-1")
+        clock.advance(60)
+        assert catalogue.lookup("run-1").last_accessed_at == clock.now
+
+    def test_reads_the_storage_without_the_lock(self, tmp_path, clock):
+        write_result(tmp_path, "run-1")
+        catalogue = make_catalogue(tmp_path, clock)
+        storage = catalogue._storage
+        reads = []
+
+        class CheckedStorage(LocalResultStorage):
+            def read(self, key):
+                reads.append(catalogue._lock.locked())
+                return storage.read(key)
+
+            def size(self, key):
+                reads.append(catalogue._lock.locked())
+                return storage.size(key)
+
+        catalogue._storage = CheckedStorage(tmp_path)
+        catalogue.is_expired("run-1")
+        reads.clear()
+        assert catalogue.lookup("run-1") is not None
+        assert reads and not any(reads)
+
+    def test_finished_partial_run_is_read_again(self, tmp_path, clock):
+        write_result(tmp_path, "run-1", with_metrics=False)
+        (tmp_path / "run-1" / "embeddings.csv").unlink()
+        catalogue = make_catalogue(tmp_path, clock)
+        catalogue.scan()
+        assert catalogue.lookup("run-1") is None
+        write_result(tmp_path, "run-1", size=10)
+        entry = catalogue.lookup("run-1")
+        assert (entry.partial, entry.size_bytes, entry.rows) == (False, 10, 2)
+
+
+class TestCollectGarbage:
+    def test_catalogues_finished_and_partial_runs(self, tmp_path, clock):
+        write_result(tmp_path, "run-1")
+        write_result(tmp_path, "running", with_metrics=False)
+        (tmp_path / "custom").mkdir()
+        (tmp_path / "custom" / "out.csv").write_text("1.0")
+        catalogue = make_catalogue(tmp_path, clock)
+        assert catalogue.scan() == 2
+        assert catalogue.scan() == 0
+        entries = {e.dag_run_id: e for e in catalogue._load().values()}
+        assert sorted(entries) == ["run-1", "running"]
+        assert entries["running"].partial
+        # The partial result and the progress file
+        assert entries["running"].size_bytes == 12
+
+    def test_partial_run_counts_against_the_quota(self, tmp_path, clock):
+        write_result(tmp_path, "failed", size=10, with_metrics=False)
+        (tmp_path / "failed" / "embeddings.csv.parts").mkdir()
+        (tmp_path / "failed" / "embeddings.csv.parts" / "0").write_bytes(b"x" * 8)
+        clock.advance(1)
+        write_result(tmp_path, "run-1", size=10)
+        catalogue = make_catalogue(tmp_path, clock, quota_bytes=20)
+        catalogue.scan()
+        clock.advance(1)
+        catalogue.lookup("run-1")
+
+        assert catalogue.collect_garbage() == ["failed"]
+        assert not (tmp_path / "failed").exists()
+        assert catalogue.is_expired("failed")
+        assert not catalogue.is_expired("run-1")
+
+    def test_partial_run_ttl_counts_from_its_last_write(self, tmp_path, clock):
+        write_result(tmp_path, "running", size=10, with_metrics=False)
+        catalogue = make_catalogue(tmp_path, clock, ttl_seconds=3600)
+        catalogue.collect_garbage()
+        clock.advance(1800)
+        write_result(tmp_path, "running", size=20, with_metrics=False)
+        assert catalogue.collect_garbage() == []
+        clock.advance(1801)
+        assert catalogue.collect_garbage() == []
+        clock.advance(1800)
+        assert catalogue.collect_garbage() == ["running"]
+
+    def test_partial_run_is_catalogued_again_once_finished(self, tmp_path, clock):
+        new_runs = []
+        catalogue = ResultsCatalogue(
+            LocalResultStorage(tmp_path), clock=clock, on_new_runs=new_runs.extend
+        )
+        write_result(tmp_path, "run-1", size=4, with_metrics=False)
+        catalogue.collect_garbage()
+        write_result(tmp_path, "run-1", size=10)
+        catalogue.collect_garbage()
+        entry = catalogue.lookup("run-1")
+        assert (entry.partial, entry.size_bytes, entry.sha256) == (False, 10, "abc")
+        assert [m["result"]["path"] for m in new_runs] == ["run-1/embeddings.csv"]
+
+    def test_deleted_partial_run_is_expired(self, tmp_path, clock):
+        write_result(tmp_path, "failed", with_metrics=False)
+        catalogue = make_catalogue(tmp_path, clock)
+        catalogue.collect_garbage()
+        for path in (tmp_path / "failed").iterdir():
+            path.unlink()
+        catalogue.collect_garbage()
+        assert catalogue.is_expired("failed")
+
+    def test_reports_runs_finished_since_last_pass(self, tmp_path, clock):
+        new_runs = []
+        catalogue = ResultsCatalogue(
+            LocalResultStorage(tmp_path), clock=clock, on_new_runs=new_runs.append
+        )
+        write_result(tmp_path, "run-1")
+        write_result(tmp_path, "run-2")
+        catalogue.lookup("run-2")
+        catalogue.collect_garbage()
+        write_result(tmp_path, "run-3")
+        catalogue.collect_garbage()
+        catalogue.collect_garbage()
+
+        paths = [[m["result"]["path"] for m in metrics] for metrics in new_runs]
+        assert [sorted(p) for p in paths] == [
+            ["run-1/embeddings.csv", "run-2/embeddings.csv"],
+            ["run-3/embeddings.csv"],
+        ]
+
+    def test_evicts_results_not_accessed_within_ttl(self, tmp_path, clock):
+        write_result(tmp_path, "old")
+        catalogue = make_catalogue(tmp_path, clock, ttl_seconds=3600)
+        catalogue.scan()
+        clock.advance(1800)
+        write_result(tmp_path, "new")
+        clock.advance(1801)
+
+        assert catalogue.collect_garbage() == ["old"]
+        assert catalogue.is_expired("old")
+        assert not catalogue.is_expired("new")
+
+    def test_evicts_least_recently_accessed_over_quota(self, tmp_path, clock):
+        for dag_run_id in ("run-1", "run-2", "run-3"):
+            write_result(tmp_path, dag_run_id, size=10)
+        catalogue = make_catalogue(tmp_path, clock, quota_bytes=20)
+        catalogue.lookup("run-1")
+        clock.advance(1)
+        catalogue.lookup("run-2")
+        clock.advance(1)
+        catalogue.lookup("run-3")
+        clock.advance(1)
+        catalogue.lookup("run-1")
+
+        assert catalogue.collect_garbage() == ["run-2"]
+
+    def test_deletes_evicted_artefacts_but_keeps_metrics(self, tmp_path, clock):
+        write_result(tmp_path, "run-1")
+        (tmp_path / "run-1" / "summary.json").write_text("{}")
+        (tmp_path / "run-1" / "profile").mkdir()
+        (tmp_path / "run-1" / "profile" / "cprofile.txt").write_text("stats")
+        catalogue = make_catalogue(tmp_path, clock, quota_bytes=0)
+        catalogue.collect_garbage()
+
+        assert sorted(p.name for p in (tmp_path / "run-1").iterdir()) == [
+            "metrics.json",
+            "summary.json",
+        ]
+        assert catalogue.lookup("run-1").expired_at == clock.now
+
+    def test_result_deleted_externally_is_expired(self, tmp_path, clock):
+        write_result(tmp_path, "run-1")
+        catalogue = make_catalogue(tmp_path, clock)
+        catalogue.lookup("run-1")
+        (tmp_path / "run-1" / "embeddings.csv").unlink()
+        catalogue.collect_garbage()
+        assert catalogue.is_expired("run-1")
+
+    def test_catalogues_and_evicts_results_in_s3(self, fake_s3, clock):
+        results = {
+            "run-1/embeddings.csv": b"x" * 10,
+            "run-1/embeddings.csv.parts/000000000000000": b"x" * 8,
+            "run-1/progress.json": b"{}",
+            "run-1/summary.json": b"{}",
+            "run-1/profile/cprofile.txt": b"stats",
+            "run-1/metrics.json": json.dumps(
+                {"result": {"path": "run-1/embeddings.csv", "rows": 2}}
+            ).encode(),
+        }
+        for key, data in results.items():
+            fake_s3.objects[("results", f"prod/{key}")] = data
+        storage = S3ResultStorage("results", prefix="prod", client=fake_s3)
+        catalogue = ResultsCatalogue(
+            storage, config=ResultsRetentionConfig(quota_bytes=0), clock=clock
+        )
+        assert catalogue.scan() == 1
+        assert catalogue.lookup("run-1").size_bytes == 10
+
+        assert catalogue.collect_garbage() == ["run-1"]
+        assert sorted(key for _, key in fake_s3.objects) == [
+            "prod/catalogue.json",
+            "prod/run-1/metrics.json",
+            "prod/run-1/summary.json",
+        ]
+        restarted = ResultsCatalogue(storage, clock=clock)
+        assert restarted.is_expired("run-1")
+
+    def test_pass_lists_the_storage_once(self, fake_s3, clock):
+        for i in range(10):
+            fake_s3.objects[("results", f"run-{i}/embeddings.csv")] = b"x" * 10
+            fake_s3.objects[("results", f"run-{i}/metrics.json")] = b"{}"
+        catalogue = ResultsCatalogue(S3ResultStorage("results", client=fake_s3))
+        catalogue.collect_garbage()
+        assert fake_s3.calls["head_object"] == 0
+
+        fake_s3.calls.clear()
+        del fake_s3.objects[("results", "run-3/embeddings.csv")]
+        catalogue.collect_garbage()
+        # 19 objects and the catalogue, 2 per page
+        assert fake_s3.calls["list_objects_v2"] == 10
+        # Only the result missing from the listing is checked
+        assert fake_s3.calls["head_object"] == 1
+        assert catalogue.is_expired("run-3")
+        assert not catalogue.is_expired("run-4")
+
+    def test_catalogue_survives_restart(self, tmp_path, clock):
+        write_result(tmp_path, "run-1")
+        write_result(tmp_path, "run-2")
+        catalogue = make_catalogue(tmp_path, clock, quota_bytes=10)
+        catalogue.lookup("run-2")
+        clock.advance(1)
+        catalogue.lookup("run-1")
+        catalogue.collect_garbage()
+
+        assert (tmp_path / CATALOGUE_FILENAME).exists()
+        restarted = make_catalogue(tmp_path, clock)
+        assert restarted.is_expired("run-2")
+        assert restarted.lookup("run-1").last_accessed_at == clock.now
+
+    def test_missing_results_dir_is_a_no_op(self, tmp_path, clock):
+        catalogue = make_catalogue(tmp_path / "missing", clock, quota_bytes=0)
+        assert catalogue.collect_garbage() == []
+        assert not (tmp_path / "missing").exists()
@@ -0,0 +1,106 @@
+import io
+import os
+import zipfile
+
+from helical_workbench_backend.api.models.inference_job_run import (
+    DimensionStats,
+    EmbeddingSummary,
+    SummaryStats,
+)
+from helical_workbench_backend.services import run_artifacts
+from helical_workbench_backend.services.result_storage import LocalResultStorage
+from helical_workbench_backend.services.run_artifacts import RunArtifacts
+
+
+class TestReadProgress:
+    def test_reads_progress_file(self, tmp_path):
+        (tmp_path / "run-1").mkdir()
+        (tmp_path / "run-1" / "progress.json").write_text(
+            '{"stage": "embedding", "cells_done": 5, "cells_total": null,'
+            ' "result_bytes": 40, "updated_at": "2024-01-01T00:00:00+00:00"}'
+        )
+        progress = RunArtifacts(LocalResultStorage(tmp_path)).read_progress("run-1")
+        assert progress.stage == "embedding"
+        assert progress.cells_total is None
+        assert progress.cells_total_estimated is False
+        assert progress.result_bytes == 40
+
+    def test_reads_estimated_total(self, tmp_path):
+        (tmp_path / "run-1").mkdir()
+        (tmp_path / "run-1" / "progress.json").write_text(
+            '{"stage": "embedding", "cells_done": 5, "cells_total": 100,'
+            ' "cells_total_estimated": true, "updated_at": "2024-01-01T00:00:00+00:00"}'
+        )
+        progress = RunArtifacts(LocalResultStorage(tmp_path)).read_progress("run-1")
+        assert (progress.cells_total, progress.cells_total_estimated) == (100, True)
+
+    def test_missing_file_returns_none(self, tmp_path):
+        assert RunArtifacts(LocalResultStorage(tmp_path)).read_progress("run-1") is None
+
+    def test_unreadable_file_returns_none(self, tmp_path):
+        (tmp_path / "run-1").mkdir()
+        (tmp_path / "run-1" / "progress.json").write_text("{not json")
+        assert RunArtifacts(LocalResultStorage(tmp_path)).read_progress("run-1") is None
+
+
+class TestSummary:
+    def test_written_summary_reads_back(self, tmp_path):
+        (tmp_path / "run-1").mkdir()
+        summary = EmbeddingSummary(
+            rows=0,
+            dims=0,
+            nan_count=0,
+            rows_with_nan=0,
+            norm=SummaryStats(count=0),
+            dimensions=DimensionStats(
+                count=[], mean=[], variance=[], min=[], max=[], nan_count=[]
+            ),
+        )
+        artifacts = RunArtifacts(LocalResultStorage(tmp_path))
+        artifacts.write_summary("run-1", summary)
+        assert artifacts.read_summary("run-1") == summary
+
+    def test_missing_summary_returns_none(self, tmp_path):
+        assert RunArtifacts(LocalResultStorage(tmp_path)).read_summary("run-1") is None
+
+
+class TestProfileArchive:
+    def test_zips_profile_artefacts(self, tmp_path):
+        profile_dir = tmp_path / "run-1" / "profile"
+        profile_dir.mkdir(parents=True)
+        (profile_dir / "cprofile.txt").write_text("stats")
+        (profile_dir / "memory.json").write_text("{}")
+
+        archive = b"".join(
+            RunArtifacts(LocalResultStorage(tmp_path)).profile_archive("run-1")
+        )
+        with zipfile.ZipFile(io.BytesIO(archive)) as f:
+            assert f.namelist() == ["run-1/cprofile.txt", "run-1/memory.json"]
+            assert f.read("run-1/cprofile.txt") == b"stats"
+
+    def test_large_archive_spills_to_disk_and_streams_in_chunks(
+        self, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(run_artifacts, "ARCHIVE_SPOOL_BYTES", 1024)
+        monkeypatch.setattr(run_artifacts, "ARCHIVE_CHUNK_BYTES", 1024)
+        profile_dir = tmp_path / "run-1" / "profile"
+        profile_dir.mkdir(parents=True)
+        trace = os.urandom(10_000)
+        (profile_dir / "torch_trace.json").write_bytes(trace)
+
+        chunks = list(
+            RunArtifacts(LocalResultStorage(tmp_path)).profile_archive("run-1")
+        )
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 1024 for chunk in chunks)
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as f:
+            assert f.read("run-1/torch_trace.json") == trace
+
+    def test_no_profile_returns_none(self, tmp_path):
+        (tmp_path / "run-1" / "profile").mkdir(parents=True)
+        assert (
+            RunArtifacts(LocalResultStorage(tmp_path)).profile_archive("run-1") is None
+        )
+        assert (
+            RunArtifacts(LocalResultStorage(tmp_path)).profile_archive("run-2") is None
+        )
@@ -0,0 +1,45 @@
+import pytest
+
+from benchmarks.load import generate_results, run_load_test
+
+
+def test_generate_results(tmp_path):
+    runs = generate_results(tmp_path, runs=50, rows=1500, dims=4)
+
+    succeeded = [run for run in runs if run.state == "success"]
+    assert 0 < len(succeeded) < len(runs)
+    result = tmp_path / succeeded[0].dag_run_id / "embeddings.csv"
+    lines = result.read_text().splitlines()
+    assert len(lines) == 1500
+    assert len(lines[-1].split(",")) == 4
+    # Results are hard links to one file
+    assert result.stat().st_nlink == len(succeeded) + 1
+
+
+# Starts uvicorn and a fake Airflow; run with `pytest -m benchmark`
+@pytest.fixture(scope="module")
+def report(tmp_path_factory):
+    return run_load_test(
+        tmp_path_factory.mktemp("load"),
+        runs=200,
+        rows=100,
+        dims=8,
+        clients=4,
+        duration_seconds=2,
+    )
+
+
+@pytest.mark.benchmark
+class TestLoad:
+    def test_serves_every_endpoint_without_errors(self, report):
+        assert set(report.endpoints) == {"list", "status", "results"}
+        for endpoint in report.endpoints.values():
+            assert endpoint.requests > 0
+            assert endpoint.errors == 0
+
+    def test_serves_whole_results(self, report):
+        results = report.endpoints["results"]
+        assert results.bytes_served == results.requests * report.result_bytes
+
+    def test_measures_backend_rss(self, report):
+        assert report.backend_peak_rss_bytes >= report.backend_final_rss_bytes > 0
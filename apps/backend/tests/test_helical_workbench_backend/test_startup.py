@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+from benchmarks.startup import (
+    IMPORT_TIME_BUDGET_SECONDS,
+    LIFESPAN_BUDGET_SECONDS,
+    MAX_RSS_BUDGET_BYTES,
+    measure_startup,
+)
+from helical_workbench_backend.api.dependencies import airflow as dependencies
+from helical_workbench_backend.main import app
+
+
+@pytest.fixture(scope="module")
+def measurement():
+    return measure_startup()
+
+
+class TestStartup:
+    def test_airflow_client_is_not_imported_at_startup(self, measurement):
+        assert measurement.eagerly_imported == []
+
+    def test_does_not_wait_for_calibration(self, monkeypatch):
+        release = threading.Event()
+        calibrated = threading.Event()
+
+        def load_run_metrics(storage):
+            release.wait(timeout=5)
+            calibrated.set()
+            return []
+
+        monkeypatch.setattr(dependencies, "load_run_metrics", load_run_metrics)
+        with TestClient(app) as client:
+            assert client.get("/ping").status_code == 200
+            assert not calibrated.is_set()
+            release.set()
+
+    @pytest.mark.benchmark
+    def test_import_time_within_budget(self, measurement):
+        assert measurement.import_seconds < IMPORT_TIME_BUDGET_SECONDS
+
+    @pytest.mark.benchmark
+    def test_lifespan_within_budget(self, measurement):
+        assert measurement.lifespan_seconds is not None
+        assert measurement.lifespan_seconds < LIFESPAN_BUDGET_SECONDS
+
+    @pytest.mark.benchmark
+    def test_peak_rss_within_budget(self, measurement):
+        assert measurement.max_rss_bytes < MAX_RSS_BUDGET_BYTES
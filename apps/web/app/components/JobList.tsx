@@ -8,6 +8,7 @@ const STATUS_COLORS: Record<JobRunStatus, string> = {
   running: "blue",
   succeeded: "green",
   failed: "red",
+  expired: "yellow",
 };
 
 interface JobListProps {
@@ -1,4 +1,4 @@
 // This file is auto-generated by @hey-api/openapi-ts
 
-export { createInferenceJobRunInferenceJobRunsPost, getInferenceJobRunInferenceJobRunsJobRunIdGet, getInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGet, listInferenceJobRunsInferenceJobRunsGet, type Options, readRootPingGet } from './sdk.gen';
-export type { ClientOptions, CreateInferenceJobRunInferenceJobRunsPostData, CreateInferenceJobRunInferenceJobRunsPostError, CreateInferenceJobRunInferenceJobRunsPostErrors, CreateInferenceJobRunInferenceJobRunsPostResponse, CreateInferenceJobRunInferenceJobRunsPostResponses, GetInferenceJobRunInferenceJobRunsJobRunIdGetData, GetInferenceJobRunInferenceJobRunsJobRunIdGetError, GetInferenceJobRunInferenceJobRunsJobRunIdGetErrors, GetInferenceJobRunInferenceJobRunsJobRunIdGetResponse, GetInferenceJobRunInferenceJobRunsJobRunIdGetResponses, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetData, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetError, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetErrors, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponse, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponses, HttpValidationError, InferenceJobRun, InferenceJobRunCreate, InferenceJobRunInputs, JobRunStatus, ListInferenceJobRunsInferenceJobRunsGetData, ListInferenceJobRunsInferenceJobRunsGetError, ListInferenceJobRunsInferenceJobRunsGetErrors, ListInferenceJobRunsInferenceJobRunsGetResponse, ListInferenceJobRunsInferenceJobRunsGetResponses, Model, ReadRootPingGetData, ReadRootPingGetResponse, ReadRootPingGetResponses, ValidationError } from './types.gen';
+export { createInferenceJobRunInferenceJobRunsPost, getInferenceJobRunInferenceJobRunsJobRunIdGet, getInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGet, getInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGet, getInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGet, listInferenceJobRunsInferenceJobRunsGet, type Options, readRootPingGet } from './sdk.gen';
+export type { ClientOptions, CreateInferenceJobRunInferenceJobRunsPostData, CreateInferenceJobRunInferenceJobRunsPostError, CreateInferenceJobRunInferenceJobRunsPostErrors, CreateInferenceJobRunInferenceJobRunsPostResponse, CreateInferenceJobRunInferenceJobRunsPostResponses, DimensionStats, EmbeddingSummary, ExecutionProfile, GetInferenceJobRunInferenceJobRunsJobRunIdGetData, GetInferenceJobRunInferenceJobRunsJobRunIdGetError, GetInferenceJobRunInferenceJobRunsJobRunIdGetErrors, GetInferenceJobRunInferenceJobRunsJobRunIdGetResponse, GetInferenceJobRunInferenceJobRunsJobRunIdGetResponses, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetData, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetError, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetErrors, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetResponse, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetResponses, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetData, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetError, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetErrors, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponse, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponses, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetData, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetError, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetErrors, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetResponse, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetResponses, HttpValidationError, InferenceJobRun, InferenceJobRunCreate, InferenceJobRunInputs, InferencePrecision, InferenceRuntime, JobRunProgress, JobRunStatus, ListInferenceJobRunsInferenceJobRunsGetData, ListInferenceJobRunsInferenceJobRunsGetError, ListInferenceJobRunsInferenceJobRunsGetErrors, ListInferenceJobRunsInferenceJobRunsGetResponse, ListInferenceJobRunsInferenceJobRunsGetResponses, Model, ReadRootPingGetData, ReadRootPingGetResponse, ReadRootPingGetResponses, SummaryStats, ValidationError } from './types.gen';
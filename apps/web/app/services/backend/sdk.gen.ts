@@ -2,7 +2,7 @@
 
 import type { Client, Options as Options2, TDataShape } from './client';
 import { client } from './client.gen';
-import type { CreateInferenceJobRunInferenceJobRunsPostData, CreateInferenceJobRunInferenceJobRunsPostErrors, CreateInferenceJobRunInferenceJobRunsPostResponses, GetInferenceJobRunInferenceJobRunsJobRunIdGetData, GetInferenceJobRunInferenceJobRunsJobRunIdGetErrors, GetInferenceJobRunInferenceJobRunsJobRunIdGetResponses, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetData, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetErrors, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponses, ListInferenceJobRunsInferenceJobRunsGetData, ListInferenceJobRunsInferenceJobRunsGetErrors, ListInferenceJobRunsInferenceJobRunsGetResponses, ReadRootPingGetData, ReadRootPingGetResponses } from './types.gen';
+import type { CreateInferenceJobRunInferenceJobRunsPostData, CreateInferenceJobRunInferenceJobRunsPostErrors, CreateInferenceJobRunInferenceJobRunsPostResponses, GetInferenceJobRunInferenceJobRunsJobRunIdGetData, GetInferenceJobRunInferenceJobRunsJobRunIdGetErrors, GetInferenceJobRunInferenceJobRunsJobRunIdGetResponses, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetData, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetErrors, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponses, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetData, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetErrors, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetResponses, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetData, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetErrors, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetResponses, ListInferenceJobRunsInferenceJobRunsGetData, ListInferenceJobRunsInferenceJobRunsGetErrors, ListInferenceJobRunsInferenceJobRunsGetResponses, ReadRootPingGetData, ReadRootPingGetResponses } from './types.gen';
 
 export type Options<TData extends TDataShape = TDataShape, ThrowOnError extends boolean = boolean> = Options2<TData, ThrowOnError> & {
     /**
@@ -45,6 +45,16 @@ export const getInferenceJobRunInferenceJobRunsJobRunIdGet = <ThrowOnError exten
  */
 export const getInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGet = <ThrowOnError extends boolean = false>(options: Options<GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetData, ThrowOnError>) => (options.client ?? client).get<GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponses, GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetErrors, ThrowOnError>({ url: '/inference_job_runs/{job_run_id}/results', ...options });
 
+/**
+ * Get Inference Job Run Summary
+ */
+export const getInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGet = <ThrowOnError extends boolean = false>(options: Options<GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetData, ThrowOnError>) => (options.client ?? client).get<GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetResponses, GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetErrors, ThrowOnError>({ url: '/inference_job_runs/{job_run_id}/summary', ...options });
+
+/**
+ * Get Inference Job Run Profile
+ */
+export const getInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGet = <ThrowOnError extends boolean = false>(options: Options<GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetData, ThrowOnError>) => (options.client ?? client).get<GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetResponses, GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetErrors, ThrowOnError>({ url: '/inference_job_runs/{job_run_id}/profile', ...options });
+
 /**
  * Read Root
  */
@@ -4,6 +4,89 @@ export type ClientOptions = {
     baseUrl: `${string}://${string}` | (string & {});
 };
 
+/**
+ * DimensionStats
+ *
+ * Statistics of each embedding dimension, NaNs excluded; one entry per dimension
+ */
+export type DimensionStats = {
+    /**
+     * Count
+     */
+    count: Array<number>;
+    /**
+     * Mean
+     */
+    mean: Array<number | null>;
+    /**
+     * Variance
+     */
+    variance: Array<number | null>;
+    /**
+     * Min
+     */
+    min: Array<number | null>;
+    /**
+     * Max
+     */
+    max: Array<number | null>;
+    /**
+     * Nan Count
+     */
+    nan_count: Array<number>;
+};
+
+/**
+ * EmbeddingSummary
+ *
+ * Summary statistics of a run's embeddings
+ */
+export type EmbeddingSummary = {
+    /**
+     * Rows
+     */
+    rows: number;
+    /**
+     * Dims
+     */
+    dims: number;
+    /**
+     * Nan Count
+     */
+    nan_count: number;
+    /**
+     * Rows With Nan
+     */
+    rows_with_nan: number;
+    norm: SummaryStats;
+    dimensions: DimensionStats;
+};
+
+/**
+ * ExecutionProfile
+ *
+ * CPU threads and cores of a run; unset values default to the run's share of
+ * the worker's cores
+ */
+export type ExecutionProfile = {
+    /**
+     * Intra Op Threads
+     */
+    intra_op_threads?: number | null;
+    /**
+     * Inter Op Threads
+     */
+    inter_op_threads?: number | null;
+    /**
+     * Blas Threads
+     */
+    blas_threads?: number | null;
+    /**
+     * Cpu Affinity
+     */
+    cpu_affinity?: 'auto' | 'none' | Array<number>;
+};
+
 /**
  * HTTPValidationError
  */
@@ -42,6 +125,11 @@ export type InferenceJobRun = {
      * Error
      */
     error?: string | null;
+    /**
+     * Queued Reason
+     */
+    queued_reason?: string | null;
+    progress?: JobRunProgress | null;
 };
 
 /**
@@ -72,18 +160,127 @@ export type InferenceJobRunInputs = {
     parameters?: {
         [key: string]: unknown;
     };
+    /**
+     * Split
+     */
+    split?: string;
+    /**
+     * Streaming
+     */
+    streaming?: boolean;
+    /**
+     * Sample Fraction
+     */
+    sample_fraction?: number | null;
+    /**
+     * Seed
+     */
+    seed?: number;
+    /**
+     * Obs Filter
+     */
+    obs_filter?: {
+        [key: string]: Array<string | number | boolean>;
+    } | null;
+    /**
+     * Sample Size
+     */
+    sample_size?: number | null;
+    /**
+     * Stratify By
+     */
+    stratify_by?: string | null;
+    /**
+     * Genes
+     */
+    genes?: Array<string> | null;
+    execution_profile?: ExecutionProfile | null;
+    inference_precision?: InferencePrecision;
+    runtime?: InferenceRuntime;
+    /**
+     * Profile
+     */
+    profile?: boolean;
+};
+
+/**
+ * InferencePrecision
+ */
+export type InferencePrecision = 'fp32' | 'int8';
+
+/**
+ * InferenceRuntime
+ */
+export type InferenceRuntime = 'eager' | 'torchscript';
+
+/**
+ * JobRunProgress
+ *
+ * Progress the inference task publishes after each chunk of cells
+ */
+export type JobRunProgress = {
+    /**
+     * Stage
+     */
+    stage: string;
+    /**
+     * Cells Done
+     */
+    cells_done: number;
+    /**
+     * Cells Total
+     */
+    cells_total?: number | null;
+    /**
+     * Cells Per Second
+     */
+    cells_per_second?: number | null;
+    /**
+     * Eta Seconds
+     */
+    eta_seconds?: number | null;
+    /**
+     * Updated At
+     */
+    updated_at: string;
 };
 
 /**
  * JobRunStatus
  */
-export type JobRunStatus = 'pending' | 'running' | 'succeeded' | 'failed';
+export type JobRunStatus = 'pending' | 'running' | 'succeeded' | 'failed' | 'expired';
 
 /**
  * Model
  */
 export type Model = 'c2s' | 'geneformer' | 'genept' | 'helix_mrna' | 'hyena_dna' | 'mamba2_mrna' | 'scgpt' | 'transcriptformer' | 'uce';
 
+/**
+ * SummaryStats
+ */
+export type SummaryStats = {
+    /**
+     * Count
+     */
+    count: number;
+    /**
+     * Mean
+     */
+    mean?: number | null;
+    /**
+     * Variance
+     */
+    variance?: number | null;
+    /**
+     * Min
+     */
+    min?: number | null;
+    /**
+     * Max
+     */
+    max?: number | null;
+};
+
 /**
  * ValidationError
  */
@@ -207,7 +404,12 @@ export type GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetData = {
          */
         job_run_id: string;
     };
-    query?: never;
+    query?: {
+        /**
+         * Partial
+         */
+        partial?: boolean;
+    };
     url: '/inference_job_runs/{job_run_id}/results';
 };
 
@@ -231,6 +433,70 @@ export type GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponses
 
 export type GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponse = GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponses[keyof GetInferenceJobRunResultsInferenceJobRunsJobRunIdResultsGetResponses];
 
+export type GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetData = {
+    body?: never;
+    path: {
+        /**
+         * Job Run Id
+         */
+        job_run_id: string;
+    };
+    query?: never;
+    url: '/inference_job_runs/{job_run_id}/summary';
+};
+
+export type GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetErrors = {
+    /**
+     * Validation Error
+     */
+    422: HttpValidationError;
+};
+
+export type GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetError = GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetErrors[keyof GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetErrors];
+
+export type GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetResponses = {
+    /**
+     * Successful Response
+     */
+    200: EmbeddingSummary;
+    /**
+     * Summary being computed, retry later
+     */
+    202: unknown;
+};
+
+export type GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetResponse = GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetResponses[keyof GetInferenceJobRunSummaryInferenceJobRunsJobRunIdSummaryGetResponses];
+
+export type GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetData = {
+    body?: never;
+    path: {
+        /**
+         * Job Run Id
+         */
+        job_run_id: string;
+    };
+    query?: never;
+    url: '/inference_job_runs/{job_run_id}/profile';
+};
+
+export type GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetErrors = {
+    /**
+     * Validation Error
+     */
+    422: HttpValidationError;
+};
+
+export type GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetError = GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetErrors[keyof GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetErrors];
+
+export type GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetResponses = {
+    /**
+     * Successful Response
+     */
+    200: Blob | File;
+};
+
+export type GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetResponse = GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetResponses[keyof GetInferenceJobRunProfileInferenceJobRunsJobRunIdProfileGetResponses];
+
 export type ReadRootPingGetData = {
     body?: never;
     path?: never;